@@ -0,0 +1,122 @@
+"""Benchmarks the JSONC reader on large settings files.
+
+Generates settings.json files in the style of long-lived VS Code profiles (line and block
+comments, URLs and '//' inside strings, trailing commas) and measures
+  - json.loads on the same content without comments, as the baseline,
+  - jsonc.loads on plain JSON (fast path) and on JSONC (single-pass strip, then parse),
+  - jsonc.read of a file, first read and memoized repeat reads,
+  - repeated reads of files/keybindings.json, as done by the keybinding steps.
+
+Run from the repository root: python benchmarks/bench_jsonc.py [--sizes KB ...] [--repeat N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lib.utils import jsonc
+
+def generate(size_kb):
+    """Returns (jsonc text, plain json text) of a settings file of about size_kb kilobytes."""
+    lines, plain = ["{"], {}
+    # Running byte count, summing all lines on every iteration would be quadratic
+    size = 2
+    i = 0
+
+    def add(line):
+        nonlocal size
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+
+    while size < size_kb * 1024:
+        key = f"extension{i // 40}.option{i}"
+        kind = i % 5
+        if kind == 0:
+            add(f"    // Setting {i}, see https://example.com/docs/{i}")
+            value = i
+        elif kind == 1:
+            add(f"    /* Block comment for {i},\n       spanning two lines */")
+            value = f"https://example.com/{i}//path /* not a comment */"
+        elif kind == 2:
+            value = {"enabled": i % 2 == 0, "paths": [f"/opt/tool{i}/bin", f"C:\\\\Tools\\\\{i}"]}
+        elif kind == 3:
+            value = [f"item{j}" for j in range(5)]
+        else:
+            value = i % 3 == 0
+        plain[key] = value
+        add(f"    {json.dumps(key)}: {json.dumps(value)},")
+        i += 1
+    # VS Code keeps the trailing comma after the last entry
+    lines.append("}")
+    return "\n".join(lines), json.dumps(plain, indent=4)
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def report(name, duration, size):
+    print(f"  {name:<28} {duration * 1000:9.2f} ms  {size / duration / 1e6:8.1f} MB/s")
+
+def bench_size(size_kb, repeat, directory):
+    text, plain = generate(size_kb)
+    assert jsonc.loads(text) == json.loads(plain)
+    size = len(text.encode("utf-8"))
+    print(f"{size / 1024:,.0f} KB settings.json (median of {repeat}):")
+
+    report("json.loads, no comments", timed(lambda: json.loads(plain), repeat), size)
+    report("jsonc.loads, no comments", timed(lambda: jsonc.loads(plain), repeat), size)
+    report("jsonc.loads, JSONC", timed(lambda: jsonc.loads(text), repeat), size)
+
+    path = os.path.join(directory, f"settings-{size_kb}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    def first_read():
+        jsonc.forget(path)
+        jsonc.read(path)
+
+    report("jsonc.read, first read", timed(first_read, repeat), size)
+    report("jsonc.read, memoized", timed(lambda: jsonc.read(path), repeat), size)
+
+def bench_keybindings(repeat):
+    path = os.path.join(ROOT, "files", "keybindings.json")
+    size = os.path.getsize(path)
+    reads = 4  # Check and run of the default and the neovim keybinding steps
+
+    def uncached():
+        for _ in range(reads):
+            jsonc.forget(path)
+            jsonc.read(path)
+
+    def memoized():
+        jsonc.forget(path)
+        for _ in range(reads):
+            jsonc.read(path)
+
+    print(f"files/keybindings.json, {reads} reads per run (median of {repeat}):")
+    report("parsed every time", timed(uncached, repeat), size * reads)
+    report("memoized", timed(memoized, repeat), size * reads)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="File sizes in KB (default: 100 1000 10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="devessentials-bench-") as directory:
+        for size_kb in args.sizes:
+            bench_size(size_kb, args.repeat, directory)
+    bench_keybindings(args.repeat * 100)
+
+if __name__ == "__main__":
+    main()
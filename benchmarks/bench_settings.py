@@ -0,0 +1,109 @@
+"""Benchmarks VS Code settings.json updates on a large settings file.
+
+Compares, for the settings the components apply in a run,
+  - one load/save cycle per key (add_vscode_setting),
+  - one settings session for all keys (vscode_settings),
+  - a session whose keys are already set, which must not write at all.
+
+The settings file lives in the temporary home directory of a RecordingPlatform.
+
+Run from the repository root: python benchmarks/bench_settings.py [--keys N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lib.modules.default import Default
+from lib.systems.recording import RecordingPlatform
+
+def write_settings(path, keys):
+    """Writes a settings.json with the given number of unrelated keys, like a long-lived user profile."""
+    settings = {}
+    for i in range(keys):
+        kind = i % 4
+        if kind == 0:
+            settings[f"extension{i // 50}.option{i}"] = i
+        elif kind == 1:
+            settings[f"extension{i // 50}.flag{i}"] = i % 3 == 0
+        elif kind == 2:
+            settings[f"extension{i // 50}.path{i}"] = f"/opt/tools/extension{i}/bin"
+        else:
+            settings[f"[language{i}]"] = {"editor.tabSize": 4, "editor.defaultFormatter": f"publisher.formatter{i}"}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=4)
+
+class WriteCounter:
+    """Counts replacements of the settings file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._replace = os.replace
+
+    def __enter__(self):
+        def replace(src, dst):
+            if os.path.abspath(dst) == os.path.abspath(self.path):
+                self.count += 1
+            return self._replace(src, dst)
+        os.replace = replace
+        return self
+
+    def __exit__(self, *exc):
+        os.replace = self._replace
+
+def measure(platform, keys, repeat, updates, function, prepare=None):
+    """Returns the median time and number of writes of function on a fresh settings file.
+    prepare is applied to the file before the measurement."""
+    path = platform.get_vscode_settings_path()
+    timings, writes = [], 0
+    for _ in range(repeat):
+        write_settings(path, keys)
+        if prepare:
+            prepare(updates)
+        with WriteCounter(path) as counter:
+            start = time.perf_counter()
+            function(updates)
+            timings.append(time.perf_counter() - start)
+        writes = counter.count
+    return statistics.median(timings), writes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, nargs="+", default=[1000, 5000, 20000], help="Sizes of settings.json (default: 1000 5000 20000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="devessentials-bench-") as home_dir:
+        platform = RecordingPlatform(home_dir=home_dir)
+        updates = dict(Default.VSCODE_SETTINGS)
+
+        def per_key(updates):
+            for key, value in updates.items():
+                platform.add_vscode_setting(key, value)
+
+        def session(updates):
+            with platform.vscode_settings() as settings:
+                settings.update(updates)
+
+        print(f"Applying {len(updates)} settings (median of {args.repeat}, w = writes of settings.json):")
+        print(f"  {'keys':>6}  {'per key':>18}  {'session':>18}  {'unchanged':>18}")
+        for keys in args.keys:
+            per_key_time, per_key_writes = measure(platform, keys, args.repeat, updates, per_key)
+            session_time, session_writes = measure(platform, keys, args.repeat, updates, session)
+            unchanged_time, unchanged_writes = measure(platform, keys, args.repeat, updates, session, prepare=session)
+            print(
+                f"  {keys:>6}  {per_key_time * 1000:8.1f} ms {per_key_writes:2} w  "
+                f"{session_time * 1000:8.1f} ms {session_writes:2} w  "
+                f"{unchanged_time * 1000:8.1f} ms {unchanged_writes:2} w"
+            )
+
+if __name__ == "__main__":
+    main()
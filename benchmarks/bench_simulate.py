@@ -0,0 +1,118 @@
+"""Benchmarks the orchestration on top of RecordingPlatform, without installing anything.
+
+Measures
+  - orchestration overhead: building, planning and running all steps with zero latency,
+  - settings/keybinding merge throughput against the simulated home directory,
+  - simulated end-to-end time for different numbers of jobs with the default latencies.
+
+Run from the repository root: python benchmarks/bench_simulate.py [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lib.core.scheduler import Scheduler
+from lib.modules.base import build_steps
+from lib.systems.recording import RecordingPlatform
+
+ZERO_LATENCY = {kind: 0.0 for kind in RecordingPlatform.DEFAULT_LATENCY}
+
+@contextlib.contextmanager
+def quiet():
+    """Drops the log output of the steps, which would dominate the timings."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+def get_components(platform):
+    from lib.modules.default import Default
+    from lib.modules.terminal import Terminal
+    from lib.modules.neovim import Neovim
+    from lib.modules.build_tools import BuildTools
+    from lib.modules.utils import Utils
+    return [Default(platform), Terminal(platform), Neovim(platform), BuildTools(platform), Utils(platform)]
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def bench_orchestration(repeat):
+    def build(platform):
+        return build_steps(platform, get_components(platform))
+
+    def plan():
+        with RecordingPlatform(latency=ZERO_LATENCY) as platform, quiet():
+            Scheduler(build(platform)).plan()
+
+    def run():
+        with RecordingPlatform(latency=ZERO_LATENCY) as platform, quiet():
+            Scheduler(build(platform), jobs=4).run()
+
+    def build_only():
+        with RecordingPlatform(latency=ZERO_LATENCY) as platform:
+            return build(platform)
+
+    steps = len(build_only())
+    print("Orchestration overhead (zero latency, median):")
+    for name, function in [("build steps", build_only), ("plan", plan), ("run, 4 jobs", run)]:
+        duration = timed(function, repeat)
+        print(f"  {name:<12} {duration * 1000:8.1f} ms  ({duration * 1000 / steps:.2f} ms per step, {steps} steps)")
+
+def bench_merge(repeat, keys=2000, keybindings=1000):
+    with RecordingPlatform(latency=ZERO_LATENCY) as platform:
+        settings = {f"bench.setting{i}": {"value": i, "enabled": i % 2 == 0} for i in range(keys)}
+        bindings = [{"key": f"ctrl+alt+{i}", "command": f"bench.command{i}", "when": "editorTextFocus"} for i in range(keybindings)]
+
+        def merge_settings():
+            with platform.vscode_settings() as document:
+                document.update(settings)
+
+        def merge_keybindings():
+            with quiet():
+                platform.add_vscode_keybindings(bindings)
+
+        print("Merge throughput (median):")
+        for name, function, count in [
+            ("settings, first write", merge_settings, keys),
+            ("settings, unchanged", merge_settings, keys),
+            ("keybindings, first write", merge_keybindings, keybindings),
+            ("keybindings, unchanged", merge_keybindings, keybindings),
+        ]:
+            # The first write only happens once, the unchanged merges are repeated
+            duration = timed(function, 1 if "first" in name else repeat)
+            print(f"  {name:<25} {duration * 1000:8.1f} ms  ({count / duration:,.0f} entries/s)")
+
+def bench_scheduling(jobs_list):
+    print("Simulated end-to-end time (default latencies):")
+    for jobs in jobs_list:
+        with RecordingPlatform() as platform:
+            steps = build_steps(platform, get_components(platform))
+            start = time.perf_counter()
+            with quiet():
+                Scheduler(steps, jobs=jobs).run()
+        print(f"  {jobs} job(s): {time.perf_counter() - start:6.2f} s  ({len(platform.calls)} platform calls)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of the fast benchmarks (default: 5)")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8], help="Job counts to simulate (default: 1 2 4 8)")
+    args = parser.parse_args()
+
+    # Components read files/ relative to the working directory
+    os.chdir(ROOT)
+    bench_orchestration(args.repeat)
+    bench_merge(args.repeat)
+    bench_scheduling(args.jobs)
+
+if __name__ == "__main__":
+    main()
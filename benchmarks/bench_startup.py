@@ -0,0 +1,95 @@
+"""Benchmarks the startup of main.py with -X importtime.
+
+For each command line, reports the median wall time, the number of imported modules and
+the time spent importing them, followed by the most expensive imports of the last run.
+-X importtime doesn't list modules loaded through importlib.import_module() (the selected
+components), so the loaded modules are taken from sys.modules of a separate run.
+--plan only inspects the machine, it doesn't change anything.
+
+Run from the repository root: python benchmarks/bench_startup.py [--repeat N] [--top N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ["--help"],
+    ["--plan"],
+    ["--plan", "--full"],
+]
+
+# Modules startup should only load when a run needs them
+WATCHED = ["rich", "urllib.request", "http.client", "concurrent.futures", "lib.systems.windows", "lib.modules.terminal"]
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Returns {module: (self us, cumulative us)} from the -X importtime output."""
+    imports = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        imports[name.strip()] = (int(own), int(cumulative))
+    return imports
+
+# Runs main.py like the interpreter would and prints sys.modules to stderr on exit
+LIST_MODULES = """
+import atexit, runpy, sys
+atexit.register(lambda: sys.stderr.write("modules: " + " ".join(sys.modules) + "\\n"))
+sys.argv = ["main.py"] + sys.argv[1:]
+runpy.run_path("main.py", run_name="__main__")
+"""
+
+def loaded_modules(args: List[str]) -> List[str]:
+    result = subprocess.run([sys.executable, "-c", LIST_MODULES] + args, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    for line in result.stderr.splitlines():
+        if line.startswith("modules: "):
+            return line[len("modules: "):].split()
+    return []
+
+def measure(args: List[str], repeat: int) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Returns the median wall time of main.py args and the imports of the last run."""
+    timings = []
+    imports = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "main.py"] + args, cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        timings.append(time.perf_counter() - start)
+        imports = parse_importtime(result.stderr)
+    return statistics.median(timings), imports
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command line (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="Number of most expensive imports to list (default: 10)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter = (time.perf_counter() - start) / args.repeat
+    print(f"Interpreter startup without main.py: {interpreter * 1000:.0f} ms")
+
+    for command in COMMANDS:
+        wall, imports = measure(command, args.repeat)
+        total = sum(own for own, _ in imports.values())
+        modules = loaded_modules(command)
+        loaded = [name for name in WATCHED if name in modules]
+        print(f"\nmain.py {' '.join(command)}")
+        print(f"  wall time (median of {args.repeat}): {wall * 1000:6.0f} ms")
+        print(f"  imports: {len(modules)} modules loaded, {total / 1000:.0f} ms reported by -X importtime")
+        print(f"  loaded: {', '.join(loaded) if loaded else 'none of ' + ', '.join(WATCHED)}")
+        print("  most expensive (cumulative):")
+        for name, (_, cumulative) in sorted(imports.items(), key=lambda item: -item[1][1])[:args.top]:
+            print(f"    {cumulative / 1000:7.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+from lib.core.state import StateCache
+from lib.utils.file_watcher import fingerprint
+from lib.utils.json_document import JsonDocument
+
+def _hash_inputs(name: str, inputs: Any) -> str:
+    encoded = json.dumps([name, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class RunJournal:
+    """Persistent record of the steps that completed, so an interrupted run can be resumed.
+
+    Every record holds a hash of the step's declared inputs and fingerprints of its declared
+    outputs. A step counts as complete as long as both are unchanged. Every change is written
+    to disk immediately, so the journal survives a crash of the run.
+    """
+
+    _shared: Optional["RunJournal"] = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._document = JsonDocument(path, default={})
+        except ValueError:
+            # A corrupt journal only costs the resume
+            os.remove(path)
+            self._document = JsonDocument(path, default={})
+
+    @classmethod
+    def shared(cls) -> "RunJournal":
+        if cls._shared is None:
+            cls._shared = cls(os.path.join(StateCache.get_default_dir(), "journal.json"))
+        return cls._shared
+
+    def clear(self) -> None:
+        """Forgets all records, so the next run starts from scratch."""
+        with self._lock:
+            self._document.data.clear()
+            self._document.save()
+
+    def record(self, name: str, inputs: Any, outputs: List[str]) -> None:
+        """Marks a step as completed with the current state of its outputs."""
+        with self._lock:
+            self._document.data[name] = {
+                "inputs": _hash_inputs(name, inputs),
+                "outputs": {path: fingerprint(path) for path in outputs},
+            }
+            self._document.save()
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            if self._document.data.pop(name, None) is not None:
+                self._document.save()
+
+    def is_complete(self, name: str, inputs: Any, outputs: List[str]) -> bool:
+        """Checks whether the step completed earlier and neither its inputs nor its outputs changed since."""
+        with self._lock:
+            entry: Optional[Dict[str, Any]] = self._document.data.get(name)
+        if entry is None or entry.get("inputs") != _hash_inputs(name, inputs):
+            return False
+        recorded = entry.get("outputs", {})
+        if sorted(recorded) != sorted(outputs):
+            return False
+        return all(recorded[path] == fingerprint(path) for path in outputs)
@@ -0,0 +1,246 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+from lib.core.journal import RunJournal
+from lib.utils.logger import Logger
+from lib.utils.trace import span
+
+# Shared resources a step can claim. Steps claiming the same resource never run at the same time.
+PACKAGE_MANAGER = "package-manager"      # apt/dpkg, pacman or winget lock
+VSCODE_CLI = "vscode-cli"                # `code --install-extension`
+VSCODE_SETTINGS = "vscode-settings"      # VS Code settings.json
+VSCODE_KEYBINDINGS = "vscode-keybindings"  # VS Code keybindings.json
+SHELL_RC = "shell-rc"                    # ~/.zshrc, ~/.bashrc, PowerShell profile
+ENVIRONMENT = "environment"              # PATH of this process and the user registry
+
+@dataclass
+class Step:
+    name: str
+    action: Callable[[], None]
+    deps: List[str] = field(default_factory=list)
+    resources: List[str] = field(default_factory=list)
+    # Read-only probe for --plan, returns the changes the action would make (empty if satisfied)
+    check: Optional[Callable[[], List[str]]] = None
+    # JSON serializable description of what the step installs, e.g. URLs or package names
+    inputs: Any = None
+    # Files and directories the step creates. A resumed run skips the step if they are unchanged.
+    outputs: List[str] = field(default_factory=list)
+    # Files the step keeps in shape. --watch re-applies the step when one of them changes.
+    watch: List[str] = field(default_factory=list)
+
+@dataclass
+class StepResult:
+    name: str
+    status: str  # "ok", "resumed" (completed in an earlier run), "failed" or "skipped"
+    error: Optional[BaseException] = None
+    duration: float = 0.0
+    logs: list = field(default_factory=list)
+
+@dataclass
+class StepPlan:
+    name: str
+    status: str  # "satisfied", "pending", "unknown" (no probe) or "failed"
+    changes: List[str] = field(default_factory=list)
+    error: Optional[BaseException] = None
+    logs: list = field(default_factory=list)
+
+class Scheduler:
+    """Runs steps concurrently while honouring their dependencies and resource locks.
+
+    Dependencies on steps that are not part of the run are ignored, so components
+    can be scheduled on their own. With more than one job, the log output of every
+    step is buffered and printed in declaration order once the step finished.
+
+    With a journal, completed steps are recorded, and steps the journal reports as
+    complete are not run again, unless one of their dependencies ran in this run.
+    """
+
+    def __init__(self, steps: List[Step], jobs: int = 1, journal: Optional[RunJournal] = None):
+        self.steps = steps
+        self.jobs = max(1, jobs)
+        self.journal = journal
+        self._index = {step.name: step for step in steps}
+        if len(self._index) != len(steps):
+            raise ValueError("Step names must be unique.")
+        self._check_cycles()
+
+    def _deps(self, step: Step) -> List[str]:
+        return [dep for dep in step.deps if dep in self._index]
+
+    def _check_cycles(self) -> None:
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str, chain: List[str]) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle: {' -> '.join(chain + [name])}")
+            visiting.add(name)
+            for dep in self._deps(self._index[name]):
+                visit(dep, chain + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for step in self.steps:
+            visit(step.name, [])
+
+    def _execute(self, step: Step) -> StepResult:
+        start = time.perf_counter()
+        if self.jobs > 1:
+            with Logger.capture() as logs:
+                result = self._call(step)
+            result.logs = logs
+        else:
+            result = self._call(step)
+        result.duration = time.perf_counter() - start
+        return result
+
+    def _call(self, step: Step) -> StepResult:
+        try:
+            with span(step.name, "step"):
+                step.action()
+            return StepResult(step.name, "ok")
+        except Exception as e:
+            return StepResult(step.name, "failed", error=e)
+
+    def _report(self, result: StepResult) -> None:
+        Logger.replay(result.logs)
+        if result.status == "failed":
+            Logger.err(f"Step '{result.name}' failed: {result.error}")
+        elif result.status == "skipped":
+            Logger.warn(f"Skipped step '{result.name}': {result.error}")
+        elif result.status == "resumed":
+            Logger.info(f"Step '{result.name}' completed in an earlier run. Skipping.")
+
+    def _can_resume(self, step: Step, deps: List[str], results: Dict[str, StepResult]) -> bool:
+        if self.journal is None or any(results[dep].status != "resumed" for dep in deps):
+            return False
+        return self.journal.is_complete(step.name, step.inputs, step.outputs)
+
+    def _record(self, step: Step, result: StepResult) -> None:
+        if self.journal is None:
+            return
+        if result.status == "ok":
+            self.journal.record(step.name, step.inputs, step.outputs)
+        else:
+            self.journal.forget(step.name)
+
+    def run(self) -> List[StepResult]:
+        """Runs all steps and returns their results in declaration order."""
+        results: Dict[str, StepResult] = {}
+        pending = list(self.steps)
+        running: Dict[Future, Step] = {}
+        busy: Set[str] = set()
+        reported = 0
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while pending or running:
+                for step in list(pending):
+                    deps = self._deps(step)
+                    blocked = [dep for dep in deps if dep in results and results[dep].status not in ("ok", "resumed")]
+                    if blocked:
+                        pending.remove(step)
+                        results[step.name] = StepResult(
+                            step.name, "skipped",
+                            error=RuntimeError(f"dependency '{blocked[0]}' did not complete"))
+                        continue
+                    if any(dep not in results for dep in deps):
+                        continue
+                    if self._can_resume(step, deps, results):
+                        pending.remove(step)
+                        results[step.name] = StepResult(step.name, "resumed")
+                        continue
+                    if len(running) >= self.jobs or busy.intersection(step.resources):
+                        continue
+                    pending.remove(step)
+                    busy.update(step.resources)
+                    running[executor.submit(self._execute, step)] = step
+
+                # Print finished steps strictly in declaration order
+                while reported < len(self.steps) and self.steps[reported].name in results:
+                    self._report(results[self.steps[reported].name])
+                    reported += 1
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    busy.difference_update(step.resources)
+                    results[step.name] = future.result()
+                    self._record(step, results[step.name])
+
+        while reported < len(self.steps):
+            self._report(results[self.steps[reported].name])
+            reported += 1
+
+        return [results[step.name] for step in self.steps]
+
+    def _probe(self, step: Step) -> StepPlan:
+        with Logger.capture() as logs:
+            try:
+                if step.check is None:
+                    plan = StepPlan(step.name, "unknown")
+                else:
+                    with span(step.name, "check"):
+                        changes = step.check()
+                    plan = StepPlan(step.name, "pending" if changes else "satisfied", changes)
+            except Exception as e:
+                plan = StepPlan(step.name, "failed", error=e)
+        plan.logs = logs
+        return plan
+
+    def plan(self) -> List[StepPlan]:
+        """Runs the checks of all steps concurrently without changing anything.
+        Checks probe the current state, so they ignore dependencies and resource locks."""
+        if not self.steps:
+            return []
+        with ThreadPoolExecutor(max_workers=len(self.steps), thread_name_prefix="probe") as executor:
+            return list(executor.map(self._probe, self.steps))
+
+    @staticmethod
+    def summarize_plan(plans: List[StepPlan]) -> int:
+        """Logs what a run would change. Returns 0 if everything is satisfied, 2 if there are changes and 1 if a probe failed."""
+        for plan in plans:
+            Logger.replay(plan.logs)
+            if plan.status == "satisfied":
+                Logger.ok(f"{plan.name}: up to date")
+            elif plan.status == "pending":
+                Logger.warn(f"{plan.name}: {len(plan.changes)} change(s)")
+                for change in plan.changes:
+                    Logger.info(f"    {change}")
+            elif plan.status == "unknown":
+                Logger.warn(f"{plan.name}: would run (no check available)")
+            else:
+                Logger.err(f"{plan.name}: check failed ({plan.error})")
+
+        failed = [p for p in plans if p.status == "failed"]
+        todo = [p for p in plans if p.status in ("pending", "unknown")]
+        if failed:
+            Logger.err(f"{len(failed)} of {len(plans)} checks failed.")
+            return 1
+        if todo:
+            Logger.warn(f"{len(todo)} of {len(plans)} steps would make changes.")
+            return 2
+        Logger.ok(f"All {len(plans)} steps are up to date.")
+        return 0
+
+    @staticmethod
+    def summarize(results: List[StepResult]) -> bool:
+        """Logs a summary of the run. Returns True if every step completed."""
+        failed = [r for r in results if r.status == "failed"]
+        skipped = [r for r in results if r.status == "skipped"]
+        resumed = [r for r in results if r.status == "resumed"]
+        if not failed and not skipped:
+            Logger.ok(f"All {len(results)} steps completed successfully" + (f" ({len(resumed)} in an earlier run)." if resumed else "."))
+            return True
+
+        Logger.err(f"{len(results) - len(failed) - len(skipped)}/{len(results)} steps completed.")
+        for r in failed:
+            Logger.err(f"  failed:  {r.name} ({r.error})")
+        for r in skipped:
+            Logger.err(f"  skipped: {r.name} ({r.error})")
+        return False
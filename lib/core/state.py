@@ -0,0 +1,59 @@
+import os
+import sys
+import threading
+from typing import Any, Optional
+from lib.utils.json_document import JsonDocument
+
+class StateCache:
+    """Small persistent key/value store that lets later runs skip expensive probes.
+    Values must be JSON serializable. Every set() is written to disk immediately, unless the
+    store is read-only: then set() only updates the values seen by the current run."""
+
+    _shared: Optional["StateCache"] = None
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._document: Optional[JsonDocument] = None
+        try:
+            self._document = JsonDocument(path, default={})
+        except ValueError:
+            # A corrupt state file only costs the cached probes, a read-only store leaves it to the next run
+            if not read_only:
+                os.remove(path)
+                self._document = JsonDocument(path, default={})
+
+    @staticmethod
+    def get_default_dir() -> str:
+        if sys.platform == "win32":
+            base_dir = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+            return os.path.join(base_dir, "devessentials", "state")
+        base_dir = os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state"))
+        return os.path.join(base_dir, "devessentials")
+
+    @classmethod
+    def configure(cls, state_dir: Optional[str] = None, read_only: bool = False) -> "StateCache":
+        """Sets the store used by all components."""
+        cls._shared = cls(os.path.join(state_dir or cls.get_default_dir(), "state.json"), read_only)
+        return cls._shared
+
+    @classmethod
+    def shared(cls) -> "StateCache":
+        if cls._shared is None:
+            cls.configure()
+        return cls._shared
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if self._document is None:
+                return default
+            return self._document.data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            if self._document is None:
+                return
+            self._document.data[key] = value
+            if not self.read_only:
+                self._document.save()
@@ -0,0 +1,48 @@
+import os
+from typing import Dict, List, Optional
+from lib.core.scheduler import Scheduler, Step
+from lib.systems.platform import Platform
+from lib.utils.file_watcher import FileWatcher, fingerprint
+from lib.utils.logger import Logger
+
+# Editors often write a file in several steps, changes within this time are applied together
+DEBOUNCE = 0.3
+
+def watch(steps: List[Step], platform: Platform, jobs: int = 1, poll_interval: float = 2.0) -> int:
+    """Re-applies steps whenever one of the files they manage changes, until interrupted.
+
+    Only steps declaring watched files take part. Changes the steps make themselves are
+    recognized by the size and modification time they leave behind and don't trigger again.
+    """
+    owners: Dict[str, List[Step]] = {}
+    for step in steps:
+        for path in step.watch:
+            owners.setdefault(os.path.abspath(path), []).append(step)
+    if not owners:
+        Logger.warn("No step manages files that could be watched.")
+        return 0
+
+    # State of the files after our own last write
+    applied: Dict[str, Optional[List[int]]] = {path: fingerprint(path) for path in owners}
+
+    Logger.info(f"Watching {len(owners)} files for changes (Ctrl+C to stop)...")
+    with FileWatcher(owners, poll_interval) as watcher:
+        try:
+            while True:
+                changed = watcher.wait()
+                changed += watcher.wait(DEBOUNCE)
+                drifted = sorted({path for path in changed if fingerprint(path) != applied[path]})
+                if not drifted:
+                    continue
+
+                affected = [step for step in steps if any(step in owners[path] for path in drifted)]
+                Logger.warn(f"Changed: {', '.join(drifted)}. Re-applying {', '.join(step.name for step in affected)}...")
+                try:
+                    Scheduler.summarize(Scheduler(affected, jobs=jobs).run())
+                finally:
+                    # Re-applied steps may add PATH entries, e.g. a reinstalled Neovim
+                    platform.commit_environment()
+                applied.update({path: fingerprint(path) for path in owners})
+        except KeyboardInterrupt:
+            Logger.info("Stopped watching.")
+    return 0
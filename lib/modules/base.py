@@ -1,11 +1,130 @@
 from abc import ABC, abstractmethod
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from lib.systems.platform import Platform
+from lib.core.packages import KnownPackage
+from lib.core.scheduler import Scheduler, Step, PACKAGE_MANAGER, VSCODE_CLI, ENVIRONMENT
+from lib.utils.logger import Logger
+from lib.utils.trace import span
+
+# Name of the step that installs the packages of all components in one transaction.
+# Every component also gets a step '<PACKAGES_STEP>:<component>' that only fails if one of its own packages failed.
+PACKAGES_STEP = "packages"
+# Name of the step that installs the VS Code extensions of all components in one CLI call
+VSCODE_EXTENSIONS_STEP = "vscode-extensions"
 
 class Component(ABC):
+    name: str = ""
+
     def __init__(self, platform: Platform):
         self.platform = platform
 
+    def packages(self) -> List[KnownPackage]:
+        """Declares the system packages this component needs on the current platform."""
+        return []
+
+    def vscode_extensions(self) -> List[str]:
+        """Declares the VS Code extensions this component needs."""
+        return []
+
+    def downloads(self) -> List[Tuple[str, str]]:
+        """Declares the (url, filename) pairs this component will fetch, so they can be prefetched."""
+        return []
+
+    @property
+    def packages_step(self) -> str:
+        """Name of the step its steps depend on for the packages of this component."""
+        return f"{PACKAGES_STEP}:{self.name}"
+
     @abstractmethod
-    def install(self) -> None:
-        """Performs the installation logic."""
+    def steps(self) -> List[Step]:
+        """Declares the installation steps of this component."""
         pass
+
+    def step(self, name: str, action: Callable[[], None], deps: Optional[List[str]] = None, resources: Optional[List[str]] = None,
+             check: Optional[Callable[[], List[str]]] = None, inputs: Any = None, outputs: Optional[List[str]] = None,
+             watch: Optional[List[str]] = None) -> Step:
+        """Creates a step named '<component>.<name>'. Dependencies use fully qualified names.
+        check is a read-only probe returning the changes the action would make.
+        inputs and outputs let a resumed run skip the step, see RunJournal. watch lists the files --watch keeps in shape."""
+        return Step(f"{self.name}.{name}", action, deps or [], resources or [], check, inputs, outputs or [], watch or [])
+
+    def install(self) -> None:
+        """Runs all steps of this component one after another."""
+        with span(f"{self.name}.install", "component"):
+            try:
+                for result in Scheduler(build_steps(self.platform, [self])).run():
+                    if result.error is not None:
+                        raise result.error
+            finally:
+                # PATH changes are written once, also when a step failed
+                self.platform.commit_environment()
+
+def build_steps(platform: Platform, components: List[Component]) -> List[Step]:
+    """Returns the steps of all components, preceded by shared steps installing all their packages and VS Code extensions at once."""
+    # Error of every package the shared transaction attempted in this run, None if it was installed
+    package_errors: Dict[str, Optional[Exception]] = {}
+
+    def install_packages() -> None:
+        for component in components:
+            for package in component.packages():
+                platform.queue_package(package)
+
+        errors = platform.flush_packages()
+        package_errors.update(errors)
+        # Failures are reported by the steps of the components that need the packages
+        failed = [name for name, error in errors.items() if error is not None]
+        if failed:
+            Logger.warn(f"Failed to install {', '.join(failed)}.")
+        if len(errors) > len(failed):
+            Logger.ok(f"Installed {len(errors) - len(failed)} packages.")
+
+    def check_packages() -> List[str]:
+        names = [platform.get_package_name(p) for component in components for p in component.packages()]
+        missing = platform.get_missing_packages(names)
+        return [f"install {len(missing)} packages in one transaction"] if missing else []
+
+    def component_packages(component: Component) -> List[str]:
+        return [platform.get_package_name(p) for p in component.packages()]
+
+    def finish_packages(component: Component) -> None:
+        errors = {name: package_errors[name] for name in component_packages(component) if name in package_errors}
+        # Not attempted by the shared transaction in this run, e.g. because --resume skipped it
+        remaining = [name for name in component_packages(component) if name not in package_errors]
+        for name in remaining:
+            platform.queue_package(name)
+        errors.update(platform.flush_packages())
+
+        failed = [name for name, error in errors.items() if error is not None]
+        if failed:
+            raise RuntimeError(f"Failed to install {', '.join(failed)}")
+
+    def check_component_packages(component: Component) -> List[str]:
+        return [f"install package {name}" for name in platform.get_missing_packages(component_packages(component))]
+
+    def check_vscode_extensions() -> List[str]:
+        extensions = [e for component in components for e in component.vscode_extensions()]
+        return [f"install extension {e}" for e in platform.get_missing_vscode_extensions(extensions)]
+
+    def install_vscode_extensions() -> None:
+        extensions = [e for component in components for e in component.vscode_extensions()]
+        if extensions:
+            Logger.info("Installing VS-Code Extensions...")
+            platform.install_vscode_extensions(extensions)
+            Logger.ok("Successfully installed VS-Code extensions")
+
+    package_names = sorted(platform.get_package_name(p) for component in components for p in component.packages())
+    extensions = sorted(e for component in components for e in component.vscode_extensions())
+    steps = [Step(PACKAGES_STEP, install_packages, resources=[PACKAGE_MANAGER, ENVIRONMENT], check=check_packages, inputs=package_names)]
+    for component in components:
+        names = component_packages(component)
+        # Components without packages don't wait for the shared transaction
+        steps.append(Step(component.packages_step, partial(finish_packages, component), deps=[PACKAGES_STEP] if names else [],
+                          resources=[PACKAGE_MANAGER, ENVIRONMENT] if names else [], check=partial(check_component_packages, component),
+                          inputs=sorted(names)))
+    # 'code' is installed by the package step on Windows and by the .deb step on Linux
+    steps.append(Step(VSCODE_EXTENSIONS_STEP, install_vscode_extensions, deps=[f"{PACKAGES_STEP}:default", "default.vscode"], resources=[VSCODE_CLI],
+                      check=check_vscode_extensions, inputs=extensions))
+    for component in components:
+        steps.extend(component.steps())
+    return steps
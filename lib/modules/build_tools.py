@@ -1,27 +1,27 @@
 import sys
+from typing import List
 from lib.modules.base import Component
 from lib.core.packages import KnownPackage
-from lib.utils.logger import Logger
+from lib.core.scheduler import Step
 
 class BuildTools(Component):
-    def install(self) -> None:
-        try:
-            Logger.info("Installing Build Tools (Compiler, CMake, Ninja)...")
-            
-            # 1. Compiler Toolchain
-            # Windows: WinLibs (MinGW-w64 + GCC + LLVM/Clang + UCRT)
-            # Linux: build-essential (GCC + Make)
-            self.platform.install_package(KnownPackage.GCC_TOOLCHAIN)
-            
-            if sys.platform != "win32":
-                # 2. CMake
-                self.platform.install_package(KnownPackage.CMAKE)
-                
-                # 3. Ninja
-                self.platform.install_package(KnownPackage.NINJA)
-            
-            Logger.ok("Successfully installed build tools.")
-            
-        except Exception as e:
-            Logger.err(f"Failed to install build tools: {e}")
-            raise
+    name = "build-tools"
+
+    def packages(self) -> List[KnownPackage]:
+        # 1. Compiler Toolchain
+        # Windows: WinLibs (MinGW-w64 + GCC + LLVM/Clang + UCRT)
+        # Linux: build-essential (GCC + Make)
+        packages = [KnownPackage.GCC_TOOLCHAIN]
+
+        if sys.platform != "win32":
+            # 2. CMake
+            packages.append(KnownPackage.CMAKE)
+
+            # 3. Ninja
+            packages.append(KnownPackage.NINJA)
+
+        return packages
+
+    def steps(self) -> List[Step]:
+        # Everything is installed by the shared package transaction
+        return []
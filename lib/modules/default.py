@@ -1,15 +1,16 @@
 import sys
-import shutil
-import subprocess
 import os
 import json
-import urllib.request
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from lib.modules.base import Component
 from lib.core.packages import KnownPackage
+from lib.core.scheduler import Step, PACKAGE_MANAGER, VSCODE_SETTINGS, VSCODE_KEYBINDINGS
+from lib.utils import jsonc
 from lib.utils.logger import Logger
 
 class Default(Component):
+    name = "default"
+
     VSCODE_SETTINGS: Dict[str, Any] = {
         "editor.fontFamily": "Cascadia Code",
         "terminal.integrated.stickyScroll.enabled": False,
@@ -33,110 +34,109 @@ class Default(Component):
 
     VSCODE_DEB_URL = "https://code.visualstudio.com/sha/download?build=stable&os=linux-deb-x64"
 
-    def install(self) -> None:
-        try:
-            self._install_git()
-            self._install_vscode()
-            self._configure_vscode()
-            Logger.ok("Default setup completed successfully.")
-        except Exception as e:
-            Logger.err(f"Default installation failed: {e}")
-            raise
+    def packages(self) -> List[KnownPackage]:
+        if sys.platform == "win32":
+            return [KnownPackage.GIT, KnownPackage.VS_CODE]
+
+        if not self.platform.which("code") and not self.platform.which("apt"):
+            # Fallback for non-apt systems (e.g. Arch, Fedora), though this script seems apt-centric for Linux setup.
+            # Assuming Arch/Pacman might have 'code' in community or AUR, so we try standard install if apt is missing.
+            return [KnownPackage.GIT, KnownPackage.VS_CODE]
+        return [KnownPackage.GIT]
 
-    def _install_git(self) -> None:
-        Logger.info("Installing Git...")
-        self.platform.install_package(KnownPackage.GIT)
+    def downloads(self) -> List[Tuple[str, str]]:
+        if sys.platform != "win32" and self.platform.which("apt") and not self.platform.which("code"):
+            return [(self.VSCODE_DEB_URL, "vscode.deb")]
+        return []
 
-    def _install_vscode(self) -> None:
-        Logger.info("Installing VS-Code...")
+    def vscode_extensions(self) -> List[str]:
+        return self.VSCODE_EXTENSIONS
+
+    def steps(self) -> List[Step]:
+        steps = []
         if sys.platform != "win32":
-            self._install_vscode_deb_linux()
-        else:
-            self.platform.install_package(KnownPackage.VS_CODE)
+            steps.append(self.step("vscode", self._install_vscode_deb_linux, deps=[self.packages_step], resources=[PACKAGE_MANAGER],
+                                   check=self._check_vscode_deb_linux, inputs=self.VSCODE_DEB_URL))
+        return steps + [
+            self.step("vscode-settings", self._apply_settings, resources=[VSCODE_SETTINGS], check=self._check_settings,
+                      inputs=self.VSCODE_SETTINGS, watch=[self.platform.get_vscode_settings_path()]),
+            # The source is listed as an output, so editing files/keybindings.json invalidates the journal record without parsing it here
+            self.step("vscode-keybindings", self._configure_keybindings, resources=[VSCODE_KEYBINDINGS], check=self._check_keybindings,
+                      outputs=[os.path.join(os.getcwd(), "files", "keybindings.json")], watch=[self.platform.get_vscode_keybindings_path()]),
+        ]
 
-            if hasattr(self.platform, "refresh_windows_path"):
-                self.platform.refresh_windows_path()
+    def _check_vscode_deb_linux(self) -> List[str]:
+        if self.platform.which("code") or not self.platform.which("apt"):
+            return []
+        return ["install VS Code from the .deb package"]
 
     def _install_vscode_deb_linux(self) -> None:
         """Downloads and installs the VS Code .deb package directly."""
-        if shutil.which("code"):
+        if self.platform.which("code"):
             Logger.info("VS Code is already installed. Skipping download.")
             return
 
-        if not shutil.which("apt"):
-            # Fallback for non-apt systems (e.g. Arch, Fedora), though this script seems apt-centric for Linux setup.
-            # Assuming Arch/Pacman might have 'code' in community or AUR, so we try standard install if apt is missing.
-            self.platform.install_package(KnownPackage.VS_CODE)
+        if not self.platform.which("apt"):
+            # Installed through the package manager, see packages()
             return
 
-        deb_path = os.path.join(os.getcwd(), "tmp", "vscode.deb")
-        os.makedirs(os.path.dirname(deb_path), exist_ok=True)
-        
         try:
             Logger.info(f"Downloading VS Code .deb from {self.VSCODE_DEB_URL}...")
-            # Headers required sometimes to avoid 403 Forbidden or redirect issues
-            req = urllib.request.Request(
-                self.VSCODE_DEB_URL, 
-                headers={'User-Agent': 'Mozilla/5.0'}
-            )
-            with urllib.request.urlopen(req) as response, open(deb_path, 'wb') as out_file:
-                shutil.copyfileobj(response, out_file)
+            deb_path = self.platform.download(self.VSCODE_DEB_URL, "vscode.deb")
             
             Logger.info("Installing VS Code .deb...")
             # 'apt install ./file.deb' resolves dependencies automatically
-            subprocess.run(["sudo", "apt", "install", "-y", f"./{os.path.basename(deb_path)}"], cwd=os.path.dirname(deb_path), check=True)
+            self.platform.run(["sudo", "apt", "install", "-y", f"./{os.path.basename(deb_path)}"], cwd=os.path.dirname(deb_path))
             
             Logger.ok("Successfully installed VS Code via .deb")
             
         except Exception as e:
             Logger.err(f"Failed to install VS Code .deb: {e}")
             raise
-        finally:
-            if os.path.exists(deb_path):
-                os.remove(deb_path)
-
-    def _configure_vscode(self) -> None:
-        Logger.info("Configuring VS-Code...")
-        
-        Logger.info("Installing Extensions...")
-        for extension in self.VSCODE_EXTENSIONS:
-            self.platform.install_vscode_extension(extension)
-
-        Logger.info("Applying Settings...")
-        for key, value in self.VSCODE_SETTINGS.items():
-            self.platform.add_vscode_setting(key, value)
-            
-        self._configure_keybindings()
-            
-        Logger.ok("Successfully configured VS-Code")
 
-    def _configure_keybindings(self) -> None:
-        """Installs default keybindings from files/keybindings.json (excluding neovim specific ones)."""
+    def _apply_settings(self) -> None:
+        Logger.info("Applying VS-Code Settings...")
+        with self.platform.vscode_settings() as settings:
+            settings.update(self.VSCODE_SETTINGS)
+        Logger.ok("Successfully applied VS-Code settings")
+
+    def _check_settings(self) -> List[str]:
+        return [f"set {key}" for key in self.platform.get_pending_vscode_settings(self.VSCODE_SETTINGS)]
+
+    def _load_keybindings(self) -> Optional[List[Dict[str, Any]]]:
+        """Reads the default keybindings from files/keybindings.json (excluding neovim specific ones).
+        Returns None if the file doesn't exist."""
         keybindings_source = os.path.join(os.getcwd(), "files", "keybindings.json")
         if not os.path.exists(keybindings_source):
-            Logger.warn(f"Keybindings file not found at {keybindings_source}")
-            return
+            return None
+
+        keybindings = jsonc.read(keybindings_source)
 
+        # Filter out neovim specific bindings
+        return [
+            kb for kb in keybindings 
+            if "neovim" not in kb.get("when", "") and "neovim" not in kb.get("command", "")
+        ]
+
+    def _check_keybindings(self) -> List[str]:
+        keybindings = self._load_keybindings() or []
+        return [f"add keybinding {kb.get('key')} -> {kb.get('command')}" for kb in self.platform.get_missing_vscode_keybindings(keybindings)]
+
+    def _configure_keybindings(self) -> None:
+        """Installs default keybindings from files/keybindings.json (excluding neovim specific ones)."""
         try:
-            with open(keybindings_source, "r", encoding="utf-8") as f:
-                # Basic comment stripping since standard json doesn't support comments
-                content = f.read()
-                # Very simple comment removal (single line //)
-                lines = [line for line in content.splitlines() if not line.strip().startswith("//")]
-                keybindings = json.loads("\n".join(lines))
-            
-            # Filter out neovim specific bindings
-            default_bindings = [
-                kb for kb in keybindings 
-                if "neovim" not in kb.get("when", "") and "neovim" not in kb.get("command", "")
-            ]
-            
-            for binding in default_bindings:
-                self.platform.add_vscode_keybinding(binding)
+            default_bindings = self._load_keybindings()
+            if default_bindings is None:
+                Logger.warn(f"Keybindings file not found at {os.path.join(os.getcwd(), 'files', 'keybindings.json')}")
+                return
+
+            added = self.platform.add_vscode_keybindings(default_bindings)
                 
-            Logger.ok("Default VS Code keybindings configured.")
+            Logger.ok(f"Default VS Code keybindings configured ({added} added).")
             
         except json.JSONDecodeError as e:
             Logger.warn(f"Failed to parse keybindings.json: {e}")
+            raise
         except Exception as e:
             Logger.warn(f"Failed to configure keybindings: {e}")
+            raise
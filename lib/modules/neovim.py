@@ -1,27 +1,87 @@
 import os
 import shutil
-import urllib.request
-import zipfile
 import sys
 import json
+import filecmp
 import subprocess
+from typing import Any, Dict, List, Optional, Tuple
 from lib.modules.base import Component
-from lib.core.packages import KnownPackage
+from lib.core.scheduler import Step, VSCODE_SETTINGS, VSCODE_KEYBINDINGS, ENVIRONMENT
+from lib.utils import jsonc
 from lib.utils.logger import Logger
 
 class Neovim(Component):
-    def install(self) -> None:
-        try:
-            self._install_neovim()
-            self._install_vscode_extension()
-            self._configure_neovim()
-            self._configure_vscode_keybindings()
-            Logger.ok("Neovim setup completed successfully.")
-        except Exception as e:
-            Logger.err(f"Failed to install Neovim: {e}")
-            raise
+    name = "neovim"
+
+    BOB_INSTALL_SCRIPT_URL_LINUX = "https://raw.githubusercontent.com/MordechaiHadad/bob/master/scripts/install.sh"
+    BOB_INSTALL_SCRIPT_URL_WIN = "https://raw.githubusercontent.com/MordechaiHadad/bob/master/scripts/install.ps1"
+
+    def _get_bob_install_script(self) -> Tuple[str, str]:
+        if sys.platform == "win32":
+            return self.BOB_INSTALL_SCRIPT_URL_WIN, "bob-install.ps1"
+        return self.BOB_INSTALL_SCRIPT_URL_LINUX, "bob-install.sh"
+
+    def downloads(self) -> List[Tuple[str, str]]:
+        # Missing PATH entries alone are restored without the install script
+        if os.path.exists(self._get_nvim_executable()):
+            return []
+        return [self._get_bob_install_script()]
+
+    def vscode_extensions(self) -> List[str]:
+        # Path configuration is handled by the vscode-settings step
+        return ["asvetliakov.vscode-neovim"]
+
+    def steps(self) -> List[Step]:
+        return [
+            # PATH entries only reach the shell rc files when the platform commits the environment after the run
+            self.step("install", self._install_neovim, deps=[self.packages_step], resources=[ENVIRONMENT],
+                      check=self._check_neovim, inputs=self._get_bob_install_script(), outputs=[self._get_nvim_executable()]),
+            self.step("vscode-settings", self._configure_vscode_settings, resources=[VSCODE_SETTINGS], check=self._check_vscode_settings,
+                      inputs=self._get_vscode_settings(), watch=[self.platform.get_vscode_settings_path()]),
+            # The source is listed as well, so editing files/init.lua invalidates the journal record
+            self.step("config", self._configure_neovim, check=self._check_config,
+                      outputs=[os.path.join(os.getcwd(), "files", "init.lua"), os.path.join(self._get_config_dir(), "init.lua")],
+                      watch=[os.path.join(self._get_config_dir(), "init.lua")]),
+            self.step("vscode-keybindings", self._configure_vscode_keybindings, deps=["default.vscode-keybindings"], resources=[VSCODE_KEYBINDINGS],
+                      check=self._check_vscode_keybindings, outputs=[os.path.join(os.getcwd(), "files", "keybindings.json")],
+                      watch=[self.platform.get_vscode_keybindings_path()]),
+        ]
+
+    def _get_bob_nvim_bin(self) -> str:
+        """Returns the directory where bob links the active nvim."""
+        if sys.platform == "win32":
+            return os.path.join(self.platform.get_local_app_data_dir(), "bob", "nvim-bin")
+        return os.path.join(self.platform.get_home_dir(), ".local", "share", "bob", "nvim-bin")
+
+    def _get_nvim_executable(self) -> str:
+        return os.path.join(self._get_bob_nvim_bin(), "nvim.exe" if sys.platform == "win32" else "nvim")
+
+    def _get_path_entries(self) -> List[str]:
+        """Returns the folders the install step adds to PATH."""
+        if sys.platform == "win32":
+            return [self._get_bob_nvim_bin()]
+        return [os.path.join(self.platform.get_home_dir(), ".local", "bin"), self._get_bob_nvim_bin()]
+
+    def _check_neovim(self) -> List[str]:
+        changes = []
+        if not os.path.exists(self._get_nvim_executable()):
+            changes.append("install Neovim via bob")
+        changes += [f"add {folder} to PATH" for folder in self._get_path_entries() if not self.platform.is_in_path(folder)]
+        return changes
 
     def _install_neovim(self) -> None:
+        if not self._check_neovim():
+            Logger.info("Neovim is already installed via bob. Skipping.")
+            return
+
+        if os.path.exists(self._get_nvim_executable()):
+            # Only the PATH entries are missing, e.g. after the env file or a registry entry was removed
+            for folder in self._get_path_entries():
+                if not self.platform.is_in_path(folder):
+                    self.platform.add_to_path(folder)
+            Logger.ok("Neovim is already installed via bob. Restored its PATH entries.")
+            return
+
         Logger.info("Installing Neovim...")
         
         if sys.platform == "win32":
@@ -35,29 +95,24 @@ class Neovim(Component):
     def _install_neovim_windows_bob(self) -> None:
         Logger.info("Installing Neovim via Bob (version manager)...")
         
-        # Command for Powershell installation as recommended by Bob readme
-        install_cmd = 'powershell -c "irm https://raw.githubusercontent.com/MordechaiHadad/bob/master/scripts/install.ps1 | iex"'
-        
         try:
+            # Powershell installation script as recommended by Bob readme
+            install_script = self.platform.download(self.BOB_INSTALL_SCRIPT_URL_WIN, "bob-install.ps1")
+
             Logger.info("Running bob install script...")
-            subprocess.run(install_cmd, shell=True, check=True)
+            self.platform.run(["powershell", "-ExecutionPolicy", "Bypass", "-File", install_script], shell=True)
 
             if hasattr(self.platform, "refresh_windows_path"):
                 self.platform.refresh_windows_path()
                 
             # Usually: %USERPROFILE%\.local\share\bob\nvim-bin on Linux
             # On Windows: %USERPROFILE%\AppData\Local\bob\nvim-bin
-            local_app_data = os.environ.get("LOCALAPPDATA")
-            bob_nvim_bin = os.path.join(local_app_data, "bob", "nvim-bin")
+            bob_nvim_bin = self._get_bob_nvim_bin()
             self.platform.add_to_path(bob_nvim_bin)
             
             Logger.info("Installing latest stable Neovim via Bob...")
-            subprocess.run(["bob", "install", "latest"], check=True)
-            subprocess.run(["bob", "use", "latest"], check=True)
-            
-            # Update VS Code setting
-            nvim_exe = os.path.join(bob_nvim_bin, "nvim.exe")
-            self.platform.add_vscode_setting("vscode-neovim.neovimExecutablePaths.win32", nvim_exe)
+            self.platform.run(["bob", "install", "latest"])
+            self.platform.run(["bob", "use", "latest"])
             
             Logger.ok("Neovim installed and configured via Bob.")
 
@@ -71,37 +126,34 @@ class Neovim(Component):
     def _install_neovim_linux_bob(self) -> None:
         Logger.info("Installing Neovim via Bob (version manager)...")
         
-        install_cmd = "curl -fsSL https://raw.githubusercontent.com/MordechaiHadad/bob/master/scripts/install.sh | bash"
-        
         try:
             # Install bob
+            install_script = self.platform.download(self.BOB_INSTALL_SCRIPT_URL_LINUX, "bob-install.sh")
+
             Logger.info("Running bob install script...")
-            subprocess.run(install_cmd, shell=True, check=True)
+            self.platform.run(["bash", install_script])
             
             # Bob is installed to ~/.local/bin by default
-            bob_path = os.path.expanduser("~/.local/bin/bob")
+            bob_path = os.path.join(self.platform.get_home_dir(), ".local", "bin", "bob")
             
             if not os.path.exists(bob_path):
                 # Fallback check or maybe it's in PATH already?
-                if shutil.which("bob"):
+                if self.platform.which("bob"):
                     bob_path = "bob"
                 else:
                     raise FileNotFoundError("Could not find 'bob' executable after installation.")
 
             # Ensure ~/.local/bin is in PATH for future sessions
-            self.platform.add_to_path(os.path.dirname(bob_path) if os.path.isabs(bob_path) else os.path.expanduser("~/.local/bin"))
+            self.platform.add_to_path(os.path.dirname(bob_path) if os.path.isabs(bob_path) else os.path.join(self.platform.get_home_dir(), ".local", "bin"))
 
             Logger.info("Installing latest stable Neovim via Bob...")
-            subprocess.run([bob_path, "install", "latest"], check=True)
-            subprocess.run([bob_path, "use", "latest"], check=True)
+            self.platform.run([bob_path, "install", "latest"])
+            self.platform.run([bob_path, "use", "latest"])
             
             # Add ~/.local/share/bob/nvim-bin to PATH (this is where bob links the active nvim)
-            bob_nvim_bin = os.path.expanduser("~/.local/share/bob/nvim-bin")
+            bob_nvim_bin = self._get_bob_nvim_bin()
             self.platform.add_to_path(bob_nvim_bin)
             
-            # We also need to tell VS Code where it is
-            self.platform.add_vscode_setting("vscode-neovim.neovimExecutablePaths.linux", os.path.join(bob_nvim_bin, "nvim"))
-            
             Logger.ok("Neovim installed and configured via Bob.")
 
         except subprocess.CalledProcessError as e:
@@ -111,22 +163,37 @@ class Neovim(Component):
             Logger.err(f"Failed to install Neovim via Bob: {e}")
             raise
 
-    def _install_vscode_extension(self) -> None:
-        Logger.info("Installing VSCode Neovim extension...")
-        self.platform.install_vscode_extension("asvetliakov.vscode-neovim")
-        # Path configuration is now handled in the install methods because paths differ by method
-        Logger.ok("Successfully installed VSCode Neovim extension")
+    def _get_vscode_settings(self) -> Dict[str, str]:
+        """Tells VS Code where bob links the active nvim."""
+        key = "vscode-neovim.neovimExecutablePaths.win32" if sys.platform == "win32" else "vscode-neovim.neovimExecutablePaths.linux"
+        return {key: self._get_nvim_executable()}
+
+    def _check_vscode_settings(self) -> List[str]:
+        return [f"set {key}" for key in self.platform.get_pending_vscode_settings(self._get_vscode_settings())]
+
+    def _configure_vscode_settings(self) -> None:
+        with self.platform.vscode_settings() as settings:
+            settings.update(self._get_vscode_settings())
+
+    def _get_config_dir(self) -> str:
+        if sys.platform == "win32":
+            # LOCALAPPDATA is standard for Windows config
+            return os.path.join(self.platform.get_local_app_data_dir(), "nvim")
+        return os.path.join(self.platform.get_home_dir(), ".config", "nvim")
+
+    def _check_config(self) -> List[str]:
+        init_lua_source = os.path.join(os.getcwd(), "files", "init.lua")
+        init_lua_target = os.path.join(self._get_config_dir(), "init.lua")
+        if not os.path.exists(init_lua_source):
+            return []
+        if os.path.exists(init_lua_target) and filecmp.cmp(init_lua_source, init_lua_target, shallow=False):
+            return []
+        return [f"copy init.lua to {init_lua_target}"]
 
     def _configure_neovim(self) -> None:
         Logger.info("Configuring Neovim...")
         
-        if sys.platform == "win32":
-            # LOCALAPPDATA is standard for Windows config
-            base_dir = os.environ.get("LOCALAPPDATA", os.path.join(self.platform.get_home_dir(), "AppData", "Local"))
-            config_dir = os.path.join(base_dir, "nvim")
-        else:
-            config_dir = os.path.join(self.platform.get_home_dir(), ".config", "nvim")
-            
+        config_dir = self._get_config_dir()
         os.makedirs(config_dir, exist_ok=True)
         init_lua_target = os.path.join(config_dir, "init.lua")
         
@@ -138,39 +205,45 @@ class Neovim(Component):
                 Logger.ok(f"Copied init.lua to {init_lua_target}")
             except Exception as e:
                 Logger.warn(f"Failed to copy init.lua: {e}")
+                raise
         else:
             Logger.warn(f"Source init.lua not found at {init_lua_source}")
 
+    def _load_vscode_keybindings(self) -> Optional[List[Dict[str, Any]]]:
+        """Reads the Neovim-specific keybindings from files/keybindings.json. Returns None if the file doesn't exist."""
+        keybindings_source = os.path.join(os.getcwd(), "files", "keybindings.json")
+        if not os.path.exists(keybindings_source):
+            return None
+
+        keybindings = jsonc.read(keybindings_source)
+
+        # Filter for neovim specific bindings
+        return [
+            kb for kb in keybindings 
+            if "neovim" in kb.get("when", "") or "neovim" in kb.get("command", "")
+        ]
+
+    def _check_vscode_keybindings(self) -> List[str]:
+        keybindings = self._load_vscode_keybindings() or []
+        return [f"add keybinding {kb.get('key')} -> {kb.get('command')}" for kb in self.platform.get_missing_vscode_keybindings(keybindings)]
+
     def _configure_vscode_keybindings(self) -> None:
         """Installs Neovim-specific keybindings from files/keybindings.json."""
         Logger.info("Configuring VS Code Neovim keybindings...")
-        keybindings_source = os.path.join(os.getcwd(), "files", "keybindings.json")
-        
-        if not os.path.exists(keybindings_source):
-            Logger.warn(f"Keybindings file not found at {keybindings_source}")
-            return
 
         try:
-            with open(keybindings_source, "r", encoding="utf-8") as f:
-                content = f.read()
-                # Basic comment stripping
-                lines = [line for line in content.splitlines() if not line.strip().startswith("//")]
-                keybindings = json.loads("\n".join(lines))
-            
-            # Filter for neovim specific bindings
-            neovim_bindings = [
-                kb for kb in keybindings 
-                if "neovim" in kb.get("when", "") or "neovim" in kb.get("command", "")
-            ]
-            
-            count = 0
-            for binding in neovim_bindings:
-                self.platform.add_vscode_keybinding(binding)
-                count += 1
+            neovim_bindings = self._load_vscode_keybindings()
+            if neovim_bindings is None:
+                Logger.warn(f"Keybindings file not found at {os.path.join(os.getcwd(), 'files', 'keybindings.json')}")
+                return
+
+            added = self.platform.add_vscode_keybindings(neovim_bindings)
                 
-            Logger.ok(f"Configured {count} Neovim keybindings for VS Code.")
+            Logger.ok(f"Configured {len(neovim_bindings)} Neovim keybindings for VS Code ({added} added).")
             
         except json.JSONDecodeError as e:
             Logger.warn(f"Failed to parse keybindings.json: {e}")
+            raise
         except Exception as e:
             Logger.warn(f"Failed to configure keybindings: {e}")
+            raise
@@ -2,14 +2,18 @@ import os
 import sys
 import shutil
 import subprocess
-import urllib.request
-import zipfile
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 from lib.modules.base import Component
 from lib.core.packages import KnownPackage
+from lib.core.scheduler import Step, VSCODE_SETTINGS, SHELL_RC
+from lib.utils.git import GitMirrorCache, clone_repository, is_clean_checkout, update_checkout
 from lib.utils.logger import Logger
 
 class Terminal(Component):
+    name = "terminal"
+
     FONT_URL = "https://github.com/microsoft/cascadia-code/releases/download/v2407.24/CascadiaCode-2407.24.zip"
     FONT_NAME = "Cascadia Mono NF"
     
@@ -48,6 +52,8 @@ VI_MODE_SET_CURSOR=true
 
 # --- POWERLEVEL10K CACHE ---
 [[ ! -f ~/.p10k.zsh ]] || source ~/.p10k.zsh
+
+# --- PATH ---
 """
 
     GRUVBOX_THEME_WIN = {
@@ -74,36 +80,57 @@ VI_MODE_SET_CURSOR=true
         "cursorColor": "#ebdbb2"
     }
 
+    WINDOWS_TERMINAL_PROFILES = {
+        "PowerShell": {"opacity": 95}
+    }
+
     GRUVBOX_PALETTE_LINUX = [
         '#282828', '#CC241D', '#98971A', '#D79921', '#458588', '#B16286', '#689D6A', '#A89984',
         '#928374', '#FB4934', '#B8BB26', '#FABD2F', '#83A598', '#D3869B', '#8EC07C', '#EBDBB2'
     ]
 
-    def install(self) -> None:
+    def packages(self) -> List[KnownPackage]:
+        """Platform-specific shell and prompt."""
+        if sys.platform == "win32":
+            return [KnownPackage.POWERSHELL, KnownPackage.OHMYPOSH]
+        return [KnownPackage.ZSH, KnownPackage.TMUX]
+
+    def downloads(self) -> List[Tuple[str, str]]:
+        downloads = []
+        if sys.platform != "win32" and not is_clean_checkout(self._get_oh_my_zsh_dir(), self.platform.run):
+            downloads.append((self.OMZ_INSTALL_SCRIPT_URL, "omz-install.sh"))
+        if not self._check_font_installed():
+            downloads.append((self.FONT_URL, "CascadiaCode.zip"))
+        return downloads
+
+    def steps(self) -> List[Step]:
         """Orchestrates the terminal environment setup."""
-        try:
-            self._install_shell()
-            self._setup_prompts()
-            self._install_font()
-            self._configure_terminal_settings()
-            Logger.ok("Terminal setup completed successfully.")
-        except Exception as e:
-            Logger.err(f"Terminal setup failed: {e}")
-            raise
-
-    def _install_shell(self) -> None:
-        """Installs the platform-specific shell."""
+        steps = [
+            # The Oh-My-Zsh installer rewrites ~/.zshrc, Oh-My-Posh extends the PowerShell profile
+            self.step("prompt", self._setup_prompts, deps=[self.packages_step], resources=[SHELL_RC], check=self._check_prompts,
+                      inputs=[self.OMP_CONFIG_URL, self.ZSH_PLUGINS], outputs=self._get_prompt_outputs()),
+        ]
+        if sys.platform != "win32":
+            # Separate from the prompt step, so --watch can restore ~/.zshrc without updating Oh-My-Zsh
+            steps.append(self.step("zshrc", self._write_zshrc, deps=[f"{self.name}.prompt"], resources=[SHELL_RC], check=self._check_zshrc,
+                                   inputs=self._get_zshrc_content(), outputs=[self._get_zshrc_path()], watch=[self._get_zshrc_path()]))
+        return steps + [
+            self.step("font", self._install_font, check=self._check_font, inputs=self.FONT_URL),
+            self.step("vscode-settings", self._configure_vscode, resources=[VSCODE_SETTINGS], check=self._check_vscode,
+                      inputs=self._get_vscode_settings(), watch=[self.platform.get_vscode_settings_path()]),
+            self.step("system-terminal", self._configure_system_terminal, deps=[self.packages_step], check=self._check_system_terminal,
+                      inputs=[self._get_windows_terminal_updates(), self.WINDOWS_TERMINAL_PROFILES, self._get_gnome_terminal_theme()]),
+        ]
+
+    def _get_prompt_outputs(self) -> List[str]:
         if sys.platform == "win32":
-            Logger.info("Installing Pwsh...")
-            self.platform.install_package(KnownPackage.POWERSHELL)
+            return []
+        return [self._get_oh_my_zsh_dir()]
 
-            if hasattr(self.platform, "refresh_windows_path"):
-                self.platform.refresh_windows_path()
-        else:
-            Logger.info("Installing Zsh...")
-            self.platform.install_package(KnownPackage.ZSH)
-            Logger.info("Installing tmux...")
-            self.platform.install_package(KnownPackage.TMUX)
+    def _check_prompts(self) -> List[str]:
+        if sys.platform == "win32":
+            return self._check_oh_my_posh()
+        return self._check_oh_my_zsh()
 
     def _setup_prompts(self) -> None:
         """Configures the shell prompt (Oh-My-Posh for Windows, Oh-My-Zsh for Linux)."""
@@ -112,19 +139,29 @@ VI_MODE_SET_CURSOR=true
         else:
             self._setup_oh_my_zsh()
 
-    def _setup_oh_my_posh(self) -> None:
-        """Installs and configures Oh-My-Posh on Windows."""
-        Logger.info("Installing Oh-My-Posh...")
-        self.platform.install_package(KnownPackage.OHMYPOSH)
+    def _get_powershell_profile_path(self) -> str:
+        result = self.platform.run(["pwsh", "-NoProfile", "-Command", "echo $PROFILE"], shell=True, stdout=subprocess.PIPE, text=True)
+        return result.stdout.strip()
 
+    def _check_oh_my_posh(self) -> List[str]:
+        if not self.platform.which("pwsh"):
+            return []
+        profile_path = self._get_powershell_profile_path()
+        if os.path.exists(profile_path):
+            with open(profile_path, "r", encoding="utf-8") as f:
+                if "oh-my-posh init pwsh" in f.read():
+                    return []
+        return [f"add Oh-My-Posh init to {profile_path}"]
+
+    def _setup_oh_my_posh(self) -> None:
+        """Configures Oh-My-Posh on Windows."""
         # PowerShell Profile Configuration
         try:
-            if not shutil.which("pwsh"):
+            if not self.platform.which("pwsh"):
                 Logger.warn("pwsh not found in PATH. Skipping profile configuration.")
                 return
 
-            result = subprocess.check_output(["pwsh", "-NoProfile", "-Command", "echo $PROFILE"], shell=True)
-            profile_path = result.decode().strip()
+            profile_path = self._get_powershell_profile_path()
             
             os.makedirs(os.path.dirname(profile_path), exist_ok=True)
             
@@ -145,67 +182,125 @@ VI_MODE_SET_CURSOR=true
                 
         except Exception as e:
             Logger.err(f"Failed to configure PowerShell profile: {e}")
+            raise
 
         Logger.ok("Successfully configured Oh-My-Posh")
 
+    def _get_oh_my_zsh_dir(self) -> str:
+        return os.path.join(self.platform.get_home_dir(), ".oh-my-zsh")
+
+    def _update_checkout(self, path: str, source: Optional[str] = None) -> bool:
+        """Updates a clean git checkout in place. Returns False if it has to be installed from scratch."""
+        if not is_clean_checkout(path, self.platform.run):
+            if os.path.exists(path):
+                Logger.warn(f"{path} is not an intact git checkout, reinstalling it.")
+                shutil.rmtree(path)
+            return False
+
+        try:
+            if update_checkout(path, source, self.platform.run):
+                Logger.info(f"Updated {path}")
+            else:
+                Logger.info(f"{path} is up to date.")
+        except subprocess.CalledProcessError as e:
+            # Most likely a network problem, the existing checkout is still usable
+            Logger.warn(f"Failed to update {path}: {e.stderr.strip() if e.stderr else e}")
+        return True
+
+    def _sync_repository(self, url: str, path: str) -> None:
+        """Updates or clones a plugin repository, copying objects from the git mirror cache if one is configured."""
+        mirrors = GitMirrorCache.shared()
+        source = mirrors.mirror(url) if mirrors else None
+        if not self._update_checkout(path, source):
+            clone_repository(url, path, source, self.platform.run)
+            Logger.info(f"Cloned {url}")
+
+    def _sync_plugins(self, custom_dir: str) -> None:
+        """Clones or updates all plugins and themes concurrently. Logs are printed in declaration order."""
+        def sync(repo_url: str, relative_path: str) -> list:
+            with Logger.capture() as logs:
+                self._sync_repository(repo_url, os.path.join(custom_dir, relative_path))
+            return logs
+
+        with ThreadPoolExecutor(max_workers=len(self.ZSH_PLUGINS), thread_name_prefix="zsh-plugins") as executor:
+            futures = [executor.submit(sync, repo_url, relative_path) for repo_url, relative_path in self.ZSH_PLUGINS]
+
+        errors = []
+        for (repo_url, _), future in zip(self.ZSH_PLUGINS, futures):
+            try:
+                Logger.replay(future.result())
+            except subprocess.CalledProcessError as e:
+                Logger.err(f"Failed to clone {repo_url}: {e.stderr.strip() if e.stderr else e}")
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def _get_zshrc_path(self) -> str:
+        return os.path.join(self.platform.get_home_dir(), ".zshrc")
+
+    def _read_zshrc(self) -> Optional[str]:
+        zshrc_path = self._get_zshrc_path()
+        if not os.path.exists(zshrc_path):
+            return None
+        with open(zshrc_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _check_oh_my_zsh(self) -> List[str]:
+        """Reports missing or modified checkouts. Updates of intact checkouts are only fetched by the step itself."""
+        changes = []
+        config_path = self._get_oh_my_zsh_dir()
+        if not is_clean_checkout(config_path, self.platform.run):
+            changes.append(f"install Oh-My-Zsh to {config_path}")
+        for repo_url, relative_path in self.ZSH_PLUGINS:
+            if not is_clean_checkout(os.path.join(config_path, "custom", relative_path), self.platform.run):
+                changes.append(f"clone {repo_url}")
+        return changes
+
     def _setup_oh_my_zsh(self) -> None:
-        """Installs and configures Oh-My-Zsh on Linux."""
+        """Installs or updates Oh-My-Zsh on Linux and configures it."""
         Logger.info("Installing Oh-My-Zsh...")
 
-        config_path = os.path.join(self.platform.get_home_dir(), ".oh-my-zsh")
-        if os.path.exists(config_path):
-            shutil.rmtree(config_path)
-
-        Logger.info("Downloading and installing Oh-My-Zsh via script...")
-        cmd = f'sh -c "$(curl -fsSL {self.OMZ_INSTALL_SCRIPT_URL})" "" --unattended'
-        subprocess.run(cmd, shell=True, check=True)
+        config_path = self._get_oh_my_zsh_dir()
+        if not self._update_checkout(config_path):
+            Logger.info("Downloading and installing Oh-My-Zsh via script...")
+            install_script = self.platform.download(self.OMZ_INSTALL_SCRIPT_URL, "omz-install.sh")
+            self.platform.run(["sh", install_script, "--unattended"])
 
         # Plugins and Themes
-        custom_dir = os.path.join(config_path, "custom")
-        
-        for repo_url, relative_path in self.ZSH_PLUGINS:
-            target_path = os.path.join(custom_dir, relative_path)
-            cmd = f"git clone --depth=1 {repo_url} {target_path}"
-            subprocess.run(cmd, shell=True, check=True)
+        self._sync_plugins(os.path.join(config_path, "custom"))
+
+        Logger.ok("Successfully configured Oh-My-Zsh")
+
+    def _get_zshrc_content(self) -> str:
+        """Returns ZSHRC_TEMPLATE followed by the line that loads the PATH entries of the platform."""
+        return self.ZSHRC_TEMPLATE + self.platform.get_environment_source_line() + "\n"
+
+    def _check_zshrc(self) -> List[str]:
+        if self._read_zshrc() != self._get_zshrc_content():
+            return ["write ~/.zshrc"]
+        return []
 
-        zshrc_path = os.path.join(self.platform.get_home_dir(), ".zshrc")
+    def _write_zshrc(self) -> None:
+        """Replaces ~/.zshrc with the Oh-My-Zsh configuration, including the one written by the installer."""
+        zshrc_path = self._get_zshrc_path()
         try:
-            with open(zshrc_path, "w", encoding="utf-8") as f:
-                f.write(self.ZSHRC_TEMPLATE)
-            Logger.ok(f"Created default .zshrc at {zshrc_path}")
+            content = self._get_zshrc_content()
+            if self._read_zshrc() != content:
+                with open(zshrc_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                Logger.ok(f"Created default .zshrc at {zshrc_path}")
         except Exception as e:
             Logger.warn(f"Failed to create .zshrc: {e}")
-
-        Logger.ok("Successfully configured Oh-My-Zsh")
+            raise
 
     def _check_font_installed(self) -> bool:
         """Checks if Cascadia Mono NF is already installed."""
-        if sys.platform == "win32":
-            # Check standard Windows Fonts directory
-            # Windows fonts can be installed in %WINDIR%\Fonts or %LOCALAPPDATA%\Microsoft\Windows\Fonts
-            fonts_dirs = [
-                os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
-                os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts")
-            ]
-            
-            # Simple check for filename existence as a proxy
-            # CascadiaCode usually installs as 'CascadiaCode*.ttf'
-            for directory in fonts_dirs:
-                if os.path.exists(directory):
-                    for f in os.listdir(directory):
-                        if "CascadiaMonoNF" in f or "CascadiaCodeNF" in f:
-                            return True
-            return False
-            
-        else:
-            # Linux: Use fc-list
-            if not shutil.which("fc-list"):
-                return False
-            try:
-                output = subprocess.check_output(["fc-list", ":family"], text=True)
-                return self.FONT_NAME in output
-            except Exception:
-                return False
+        return self.platform.is_font_family_installed(self.FONT_NAME)
+
+    def _check_font(self) -> List[str]:
+        if self._check_font_installed():
+            return []
+        return [f"install font {self.FONT_NAME}"]
 
     def _install_font(self) -> None:
         """Downloads and installs Cascadia Mono NF font."""
@@ -215,77 +310,72 @@ VI_MODE_SET_CURSOR=true
 
         Logger.info(f"Installing Font ({self.FONT_NAME})...")
         
-        zip_name = "CascadiaCode.zip"
-        download_dir = os.path.join(os.getcwd(), "tmp")
-        os.makedirs(download_dir, exist_ok=True)
-        download_file = os.path.join(download_dir, zip_name)
-
         try:
             Logger.info(f"Downloading font from {self.FONT_URL}...")
-            urllib.request.urlretrieve(self.FONT_URL, download_file)
-            
-            if sys.platform == "win32":
-                self._install_font_windows(download_dir, download_file)
-            else:
-                self._install_font_linux(download_file)
+            download_file = self.platform.download(self.FONT_URL, "CascadiaCode.zip")
+            self.platform.install_font_family(download_file, self.FONT_NAME)
 
         except Exception as e:
             Logger.err(f"Failed to install font: {e}")
             Logger.info(f"Skipping automatic font installation. Please install '{self.FONT_NAME}' manually.")
+            raise
 
-        finally:
-            if os.path.exists(download_file):
-                os.remove(download_file)
-
-    def _install_font_windows(self, download_dir: str, download_file: str) -> None:
-        extract_dir = os.path.join(download_dir, "CascadiaCode")
-        with zipfile.ZipFile(download_file, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        Logger.info("Font downloaded. Installing on Windows is complex via script.")
-        Logger.info(f"Please install the fonts in '{extract_dir}' manually (Select all -> Right Click -> Install).")
-        os.startfile(extract_dir)
-
-    def _install_font_linux(self, download_file: str) -> None:
-        font_dir = os.path.expanduser("~/.local/share/fonts")
-        os.makedirs(font_dir, exist_ok=True)
-        
-        Logger.info(f"Extracting to {font_dir}...")
-        with zipfile.ZipFile(download_file, 'r') as zip_ref:
-            for member in zip_ref.namelist():
-                if member.lower().endswith((".ttf", ".otf")):
-                    filename = os.path.basename(member)
-                    source = zip_ref.open(member)
-                    target = open(os.path.join(font_dir, filename), "wb")
-                    with source, target:
-                        shutil.copyfileobj(source, target)
-
-        Logger.info("Updating font cache...")
-        subprocess.run(["fc-cache", "-fv"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        Logger.ok("Successfully installed Nerd Font on Linux.")
-
-    def _configure_terminal_settings(self) -> None:
-        """Configures settings for VS Code and System Terminal."""
-        Logger.info("Configuring Shell...")
-        self._configure_vscode()
-        
+    def _configure_system_terminal(self) -> None:
+        """Configures the system terminal emulator."""
         if sys.platform == "win32":
             self._configure_windows_terminal()
         else:
             self._configure_gnome_terminal()
 
+    def _check_system_terminal(self) -> List[str]:
+        if sys.platform == "win32":
+            changes = []
+            if hasattr(self.platform, "get_windows_terminal_changes"):
+                changes += self.platform.get_windows_terminal_changes(self._get_windows_terminal_updates(), self.WINDOWS_TERMINAL_PROFILES)
+            if not os.path.exists(self._get_windows_terminal_shortcut_path()):
+                changes.append("create Windows Terminal shortcut")
+            return changes
+        if hasattr(self.platform, "get_gnome_terminal_changes"):
+            return self.platform.get_gnome_terminal_changes(self._get_gnome_terminal_theme())
+        return []
+
+    def _get_vscode_settings(self) -> Dict[str, Any]:
+        if sys.platform == "win32":
+            profile = {"terminal.integrated.defaultProfile.windows": "PowerShell"}
+        else:
+            profile = {"terminal.integrated.defaultProfile.linux": "zsh"}
+        return {**profile, "terminal.integrated.fontFamily": self.FONT_NAME}
+
+    def _check_vscode(self) -> List[str]:
+        return [f"set {key}" for key in self.platform.get_pending_vscode_settings(self._get_vscode_settings())]
+
     def _configure_vscode(self) -> None:
         try:
             Logger.info("Updating VS Code terminal settings...")
-            if sys.platform == "win32":
-                self.platform.add_vscode_setting("terminal.integrated.defaultProfile.windows", "PowerShell")
-            else:
-                self.platform.add_vscode_setting("terminal.integrated.defaultProfile.linux", "zsh")
-            
-            self.platform.add_vscode_setting("terminal.integrated.fontFamily", self.FONT_NAME)          
+            with self.platform.vscode_settings() as settings:
+                settings.update(self._get_vscode_settings())
             Logger.ok("VS Code terminal settings updated.")
         except Exception as e:
             Logger.err(f"Failed to update VS Code settings: {e}")
+            raise
+
+    def _get_windows_terminal_updates(self) -> Dict[str, Any]:
+        return {
+            "defaultProfile": "PowerShell",
+            "profiles": {
+                "defaults": {
+                    "colorScheme": self.GRUVBOX_THEME_WIN["name"],
+                    "font": {
+                        "face": self.FONT_NAME
+                    }
+                }
+            },
+            "schemes": [self.GRUVBOX_THEME_WIN]
+        }
+
+    def _get_windows_terminal_shortcut_path(self) -> str:
+        link_directory = os.path.join(self.platform.get_home_dir(), "AppData", "Roaming", "Microsoft", "Windows", "Start Menu", "Programs")
+        return os.path.join(link_directory, "Windows Terminal.lnk")
 
     def _configure_windows_terminal(self) -> None:
         Logger.info("Configuring Windows Terminal...")
@@ -294,22 +384,7 @@ VI_MODE_SET_CURSOR=true
             if settings_path:
                 Logger.info(f"Found Windows Terminal settings at {settings_path}")
                 
-                updates = {
-                    "defaultProfile": "PowerShell",
-                    "profiles": {
-                        "defaults": {
-                            "colorScheme": self.GRUVBOX_THEME_WIN["name"],
-                            "font": {
-                                "face": self.FONT_NAME
-                            }
-                        }
-                    },
-                    "schemes": [self.GRUVBOX_THEME_WIN]
-                }
-                self.platform.update_windows_terminal_settings(updates)
-                
-                if hasattr(self.platform, "update_windows_terminal_profile"):
-                     self.platform.update_windows_terminal_profile("PowerShell", {"opacity": 95})
+                self.platform.update_windows_terminal_settings(self._get_windows_terminal_updates(), self.WINDOWS_TERMINAL_PROFILES)
 
             else:
                 Logger.warn("Could not find Windows Terminal settings")
@@ -318,8 +393,8 @@ VI_MODE_SET_CURSOR=true
         
         # Shortcut creation
         Logger.info("Creating Windows Terminal shortcut...")
-        link_directory = os.path.join(self.platform.get_home_dir(), "AppData", "Roaming", "Microsoft", "Windows", "Start Menu", "Programs")
-        link_filepath = os.path.join(link_directory, "Windows Terminal.lnk")
+        link_filepath = self._get_windows_terminal_shortcut_path()
+        link_directory = os.path.dirname(link_filepath)
         
         target_path = "wt.exe"
         if hasattr(self.platform, "get_windows_terminal_executable"):
@@ -336,17 +411,18 @@ VI_MODE_SET_CURSOR=true
             hotkey="CTRL+ALT+T"
         )
 
-    def _configure_gnome_terminal(self) -> None:
-        Logger.info("Configuring Gnome Terminal...")
-        
-        theme_data = {
+    def _get_gnome_terminal_theme(self) -> Dict[str, Any]:
+        return {
             "palette": self.GRUVBOX_PALETTE_LINUX,
             "background": "#282828",
             "foreground": "#EBDBB2",
             "font": f"{self.FONT_NAME} 12",
             "transparency_percent": 5
         }
+
+    def _configure_gnome_terminal(self) -> None:
+        Logger.info("Configuring Gnome Terminal...")
         
         if hasattr(self.platform, "configure_gnome_terminal"):
-                self.platform.configure_gnome_terminal(theme_data)
+                self.platform.configure_gnome_terminal(self._get_gnome_terminal_theme())
             
\ No newline at end of file
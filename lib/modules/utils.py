@@ -1,20 +1,16 @@
+from typing import List
 from lib.modules.base import Component
 from lib.core.packages import KnownPackage
-from lib.utils.logger import Logger
+from lib.core.scheduler import Step
 
 class Utils(Component):
-    def install(self) -> None:
-        try:
-            Logger.info("Installing Utilities (Wget, KeePass)...")
-            
-            # 1. Wget
-            self.platform.install_package(KnownPackage.WGET)
-            
-            # 2. KeePass
-            self.platform.install_package(KnownPackage.KEEPASS)
-            
-            Logger.ok("Successfully installed utilities.")
-            
-        except Exception as e:
-            Logger.err(f"Failed to install utilities: {e}")
-            raise
+    name = "utils"
+
+    def packages(self) -> List[KnownPackage]:
+        # 1. Wget
+        # 2. KeePass
+        return [KnownPackage.WGET, KnownPackage.KEEPASS]
+
+    def steps(self) -> List[Step]:
+        # Everything is installed by the shared package transaction
+        return []
@@ -1,74 +1,170 @@
 import os
+import re
 import shutil
 import subprocess
-from typing import Union, Dict, Any
+from typing import Union, Dict, Any, List, Optional, Set, Tuple
 from lib.systems.platform import Platform
 from lib.utils.logger import Logger
 from lib.core.packages import KnownPackage
 
+# PATH entries are collected in one file below the home directory, which the shell rc files source
+ENV_FILE = os.path.join(".config", "devessentials", "env.sh")
+ENV_SOURCE_LINE = '[ -f "$HOME/.config/devessentials/env.sh" ] && . "$HOME/.config/devessentials/env.sh"'
+_ENV_ENTRY = re.compile(r'^case ":\$PATH:" in \*":(.*):"\*\)', re.MULTILINE)
+
 class LinuxPlatform(Platform):
-    def install_package(self, package: Union[str, KnownPackage]) -> None:
+    def __init__(self):
+        super().__init__()
+        self._path_entries: Optional[List[str]] = None
+
+    def get_package_name(self, package: Union[str, KnownPackage]) -> str:
         if isinstance(package, KnownPackage):
-            package_name = package.value.linux
-        else:
-            package_name = package
+            return package.value.linux
+        return package
+
+    def _query_installed_packages(self) -> Set[str]:
+        try:
+            if shutil.which("dpkg-query"):
+                output = subprocess.check_output(
+                    ["dpkg-query", "-W", "-f=${Package} ${db:Status-Abbrev}\n"],
+                    stderr=subprocess.DEVNULL, text=True
+                )
+                # Status 'ii' means desired=install and state=installed
+                return {line.split()[0] for line in output.splitlines() if line.split()[1:2] == ["ii"]}
+            elif shutil.which("pacman"):
+                output = subprocess.check_output(["pacman", "-Qq"], stderr=subprocess.DEVNULL, text=True)
+                return set(output.split())
+        except (OSError, subprocess.CalledProcessError) as e:
+            Logger.warn(f"Could not query installed packages: {e}")
+        return set()
 
+    def _get_install_command(self) -> Tuple[str, List[str]]:
         if shutil.which("apt"):
-            manager = "apt"
-            cmd = ["sudo", "apt", "install", "-y", package_name]
+            return "apt", ["sudo", "apt", "install", "-y"]
         elif shutil.which("pacman"):
-            manager = "pacman"
-            cmd = ["sudo", "pacman", "-S", "--noconfirm", package_name]
+            return "pacman", ["sudo", "pacman", "-S", "--needed", "--noconfirm"]
         else:
             Logger.err("No supported package manager found (apt, pacman).")
             raise NotImplementedError("Package manager not supported.")
 
-        Logger.info(f"Installing {package_name} via {manager}...")
+    def install_packages(self, package_names: List[str]) -> Dict[str, Optional[Exception]]:
+        """Installs all packages in a single apt/pacman transaction.
+        If the transaction fails, the packages are retried one by one to find the failing ones."""
+        manager, cmd = self._get_install_command()
+
+        Logger.info(f"Installing {', '.join(package_names)} via {manager}...")
         try:
-            subprocess.run(cmd, check=True)
-            Logger.ok(f"Successfully installed {package_name}")
+            subprocess.run(cmd + package_names, check=True)
+            for package_name in package_names:
+                Logger.ok(f"Successfully installed {package_name}")
+            return {package_name: None for package_name in package_names}
         except subprocess.CalledProcessError as e:
-            Logger.err(f"Failed to install {package_name}: {e}")
-            raise
+            if len(package_names) == 1:
+                Logger.err(f"Failed to install {package_names[0]}: {e}")
+                return {package_names[0]: e}
+
+        Logger.warn(f"Batched {manager} transaction failed. Retrying packages one by one...")
+        errors: Dict[str, Optional[Exception]] = {}
+        for package_name in package_names:
+            errors.update(self.install_packages([package_name]))
+        return errors
+
+    def _get_env_file(self) -> str:
+        return os.path.join(self.get_home_dir(), ENV_FILE)
+
+    def _get_path_entries(self) -> List[str]:
+        """Returns the PATH entries of the managed env file, including the ones added during this run."""
+        if self._path_entries is None:
+            self._path_entries = []
+            env_file = self._get_env_file()
+            if os.path.exists(env_file):
+                with open(env_file, "r") as f:
+                    self._path_entries = _ENV_ENTRY.findall(f.read())
+        return self._path_entries
+
+    def _get_rc_files_without_env_file(self) -> List[str]:
+        """Returns the existing shell rc files that don't source the managed env file yet."""
+        missing = []
+        for rc_file in [".bashrc", ".zshrc"]:
+            config_path = os.path.join(self.get_home_dir(), rc_file)
+            if os.path.exists(config_path):
+                with open(config_path, "r") as f:
+                    if ENV_SOURCE_LINE not in f.read():
+                        missing.append(rc_file)
+        return missing
+
+    def is_in_path(self, folder_path: str) -> bool:
+        return folder_path in self._get_path_entries() and not self._get_rc_files_without_env_file()
 
     def add_to_path(self, folder_path: str) -> None:
-        home = self.get_home_dir()
-        line_to_add = f'\nexport PATH="$PATH:{folder_path}"\n'
-        
-        targets = [".bashrc", ".zshrc"]
-        updated = []
+        """Adds folder_path to the managed env file, which is written by commit_environment()."""
+        entries = self._get_path_entries()
+        if folder_path not in entries:
+            entries.append(folder_path)
+
+        # Later steps of this run find the new commands without a new shell
+        path = os.environ.get("PATH", "").split(os.pathsep)
+        if folder_path not in path:
+            os.environ["PATH"] = os.pathsep.join(path + [folder_path])
+
+    def get_environment_source_line(self) -> str:
+        return ENV_SOURCE_LINE
+
+    def commit_environment(self) -> None:
+        """Writes the managed env file and sources it from the shell rc files, if anything changed."""
+        entries = self._get_path_entries()
+        if not entries:
+            return
+
+        env_file = self._get_env_file()
+        content = "# Managed by devessentials, changes are overwritten\n"
+        for entry in entries:
+            # Sourcing the file twice (e.g. from a nested shell) doesn't grow PATH
+            content += f'case ":$PATH:" in *":{entry}:"*) ;; *) PATH="$PATH:{entry}" ;; esac\n'
+        content += "export PATH\n"
 
         try:
-            for rc_file in targets:
-                config_path = os.path.join(home, rc_file)
-                if os.path.exists(config_path):
-                    with open(config_path, "r") as f:
-                        content = f.read()
-                        if f"export PATH=\"$PATH:{folder_path}\"" in content:
-                            Logger.warn(f"'{folder_path}' is already in {rc_file}.")
-                            continue
-                    
-                    with open(config_path, "a") as f:
-                        f.write(line_to_add)
-                    updated.append(rc_file)
+            current = None
+            if os.path.exists(env_file):
+                with open(env_file, "r") as f:
+                    current = f.read()
+            if current != content:
+                os.makedirs(os.path.dirname(env_file), exist_ok=True)
+                with open(env_file, "w") as f:
+                    f.write(content)
+                Logger.ok(f"Wrote {len(entries)} PATH entries to {env_file}")
 
+            updated = self._get_rc_files_without_env_file()
+            for rc_file in updated:
+                with open(os.path.join(self.get_home_dir(), rc_file), "a") as f:
+                    f.write(f"\n{ENV_SOURCE_LINE}\n")
             if updated:
-                Logger.ok(f"Added path to {', '.join(updated)}. Restart terminal to apply.")
-            elif not updated:
-                # If no rc files found or all already have it, maybe warn if none found?
-                # But .bashrc almost always exists.
-                pass
-            
+                Logger.ok(f"Sourced {env_file} from {', '.join(updated)}. Restart terminal to apply.")
+
         except Exception as e:
-            Logger.err(f"Failed to add path variable: {e}")
+            Logger.err(f"Failed to write environment file: {e}")
             raise
 
-    def install_vscode_extension(self, extension_id: str) -> None:
-        subprocess.run(["code", "--install-extension", extension_id], check=True, stdout=subprocess.DEVNULL)
+    def run_vscode_cli(self, args: List[str]) -> str:
+        return subprocess.run(["code"] + args, check=True, stdout=subprocess.PIPE, text=True).stdout
 
     def get_home_dir(self) -> str:
         return os.path.expanduser("~")
 
+    def install_font_family(self, archive_path: str, family: str) -> None:
+        from lib.utils.fonts import extract_font_family
+        font_dir = os.path.join(self.get_home_dir(), ".local", "share", "fonts")
+
+        Logger.info(f"Extracting {family} to {font_dir}...")
+        extracted = extract_font_family(archive_path, family, font_dir)
+        if not extracted:
+            Logger.info("All font files are up to date.")
+            return
+
+        Logger.info(f"Updating font cache for {len(extracted)} files...")
+        self.run(["fc-cache", "-f", font_dir], check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        Logger.ok("Successfully installed Nerd Font on Linux.")
+
     def get_vscode_settings_path(self) -> str:
         return os.path.join(self.get_home_dir(), ".config", "Code", "User", "settings.json")
 
@@ -104,6 +200,55 @@ Terminal=false
             Logger.ok(f"Created desktop entry at {shortcut_path}")
         except Exception as e:
             Logger.err(f"Failed to create desktop entry: {e}")
+            raise
+
+    def _get_gnome_terminal_profile_path(self) -> Optional[str]:
+        """Returns the dconf path of the default Gnome Terminal profile."""
+        # Result is usually "'<uuid>'"
+        result = subprocess.check_output(
+            ["gsettings", "get", "org.gnome.Terminal.ProfilesList", "default"], 
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+        profile_uuid = result.strip("'")
+        if not profile_uuid:
+            return None
+        return f"/org/gnome/terminal/legacy/profiles:/:{profile_uuid}/"
+
+    def _get_gnome_terminal_values(self, theme_data: Dict[str, Any]) -> Dict[str, str]:
+        """Maps theme data to dconf keys and values in GVariant text format."""
+        values: Dict[str, str] = {}
+        if "palette" in theme_data:
+            # dconf expects string array like "['#000000', '#ffffff']"
+            values["palette"] = "[" + ", ".join([f"'{c}'" for c in theme_data["palette"]]) + "]"
+        if "background" in theme_data:
+            values["background-color"] = f"'{theme_data['background']}'"
+        if "foreground" in theme_data:
+            values["foreground-color"] = f"'{theme_data['foreground']}'"
+        values["use-theme-colors"] = "false"
+        if "font" in theme_data:
+            values["font"] = f"'{theme_data['font']}'"
+            values["use-system-font"] = "false"
+        # 'transparency_percent' of 5 means 5% transparency
+        if "transparency_percent" in theme_data:
+            values["use-transparent-background"] = "true"
+            values["background-transparency-percent"] = str(theme_data["transparency_percent"])
+        return values
+
+    def _get_gnome_terminal_pending_values(self, dconf_path: str, theme_data: Dict[str, Any]) -> Dict[str, str]:
+        """Returns the dconf keys and values of the theme that differ from the profile."""
+        # 'dconf dump' prints the whole profile as a keyfile with a single '[/]' group
+        dump = subprocess.check_output(["dconf", "dump", dconf_path], stderr=subprocess.DEVNULL, text=True)
+        current = dict(line.split("=", 1) for line in dump.splitlines() if "=" in line)
+        return {key: value for key, value in self._get_gnome_terminal_values(theme_data).items() if current.get(key) != value}
+
+    def get_gnome_terminal_changes(self, theme_data: Dict[str, Any]) -> List[str]:
+        """Returns the dconf keys configure_gnome_terminal() would change."""
+        if not shutil.which("dconf"):
+            return []
+        dconf_path = self._get_gnome_terminal_profile_path()
+        if not dconf_path:
+            return []
+        return [f"set {key}" for key in self._get_gnome_terminal_pending_values(dconf_path, theme_data)]
 
     def configure_gnome_terminal(self, theme_data: Dict[str, Any]) -> None:
         """Configures Gnome Terminal with the given theme data."""
@@ -112,60 +257,30 @@ Terminal=false
             return
 
         try:
-            # Get default profile UUID
-            # gsettings get org.gnome.Terminal.ProfilesList default
-            result = subprocess.check_output(
-                ["gsettings", "get", "org.gnome.Terminal.ProfilesList", "default"], 
-                stderr=subprocess.DEVNULL
-            ).decode().strip()
-            
-            # Result is usually "'<uuid>'"
-            profile_uuid = result.strip("'")
-            if not profile_uuid:
+            dconf_path = self._get_gnome_terminal_profile_path()
+            if not dconf_path:
                 Logger.warn("Could not determine default Gnome Terminal profile.")
                 return
 
-            dconf_path = f"/org/gnome/terminal/legacy/profiles:/:{profile_uuid}/"
-            
-            Logger.info(f"Configuring Gnome Terminal profile {profile_uuid}...")
-
-            # Helper to set dconf value
-            def dconf_write(key, value):
-                subprocess.run(
-                    ["dconf", "write", f"{dconf_path}{key}", str(value)], 
-                    check=True, stderr=subprocess.DEVNULL
-                )
-
-            # Map theme data to dconf keys
-            # Palette
-            if "palette" in theme_data:
-                # dconf expects string array like "['#000000', '#ffffff']"
-                palette_str = "[" + ", ".join([f"'{c}'" for c in theme_data["palette"]]) + "]"
-                dconf_write("palette", palette_str)
+            pending = self._get_gnome_terminal_pending_values(dconf_path, theme_data)
+            if not pending:
+                Logger.info("Gnome Terminal profile is already configured.")
+                return
 
-            if "background" in theme_data:
-                dconf_write("background-color", f"'{theme_data['background']}'")
-            
-            if "foreground" in theme_data:
-                dconf_write("foreground-color", f"'{theme_data['foreground']}'")
+            Logger.info(f"Configuring Gnome Terminal profile {dconf_path} ({len(pending)} keys)...")
 
-            dconf_write("use-theme-colors", "false")
-            
-            # Font
-            if "font" in theme_data:
-                dconf_write("font", f"'{theme_data['font']}'")
-                dconf_write("use-system-font", "false")
-
-            # Transparency
-            # Assuming "opacity" in theme_data means 5% transparency -> value 5? 
-            # Or if key is "transparency_percent"
-            if "transparency_percent" in theme_data:
-                dconf_write("use-transparent-background", "true")
-                dconf_write("background-transparency-percent", str(theme_data["transparency_percent"]))
+            # Applies all keys at once; keys not in the keyfile are left untouched
+            keyfile = "[/]\n" + "".join(f"{key}={value}\n" for key, value in pending.items())
+            subprocess.run(
+                ["dconf", "load", dconf_path], input=keyfile, text=True,
+                check=True, stderr=subprocess.DEVNULL
+            )
 
             Logger.ok("Gnome Terminal configuration applied.")
 
         except subprocess.CalledProcessError as e:
             Logger.warn(f"Failed to configure Gnome Terminal: {e}")
+            raise
         except Exception as e:
             Logger.err(f"An error occurred while configuring Gnome Terminal: {e}")
+            raise
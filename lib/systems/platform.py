@@ -1,30 +1,177 @@
 from abc import ABC, abstractmethod
-from typing import Union, Any, Dict
+from contextlib import contextmanager
+from typing import Union, Any, Dict, Iterator, List, Optional, Set
 import json
 import os
+import shutil
+import subprocess
 from lib.core.packages import KnownPackage
+from lib.utils.logger import Logger
+from lib.utils.json_document import JsonDocument
+from lib.utils.trace import trace_methods
 
+@trace_methods
 class Platform(ABC):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every platform operation shows up in --trace
+        trace_methods(cls)
+
+    def __init__(self):
+        self._package_queue: List[str] = []
+        self._installed_packages: Optional[Set[str]] = None
+        self._vscode_extensions: Optional[Set[str]] = None
+
     @abstractmethod
     def add_to_path(self, folder_path: str) -> None:
         """Adds a folder to the user's PATH persistently."""
         pass
 
+    def commit_environment(self) -> None:
+        """Persists PATH changes that add_to_path() collected so far. Called after a run and after every batch of steps --watch re-applies."""
+        pass
+
+    def get_environment_source_line(self) -> str:
+        """Returns the shell rc line that loads the PATH entries written by commit_environment(), or "" if the platform needs none."""
+        return ""
+
+    def run(self, args: Union[str, List[str]], check: bool = True, **kwargs: Any) -> subprocess.CompletedProcess:
+        """Runs a command like subprocess.run(). Components run their commands through the platform, so a run can be recorded or simulated."""
+        return subprocess.run(args, check=check, **kwargs)
+
+    def which(self, command: str) -> Optional[str]:
+        """Returns the path of a command on PATH, like shutil.which()."""
+        return shutil.which(command)
+
+    def download(self, url: str, filename: str) -> str:
+        """Returns the path of a local copy of url, see DownloadCache.fetch()."""
+        # urllib and http.client are only loaded by runs that download something
+        from lib.utils.download_cache import DownloadCache
+        return DownloadCache.shared().fetch(url, filename)
+
+    def is_in_path(self, folder_path: str) -> bool:
+        """Checks whether add_to_path() would leave the persistent PATH unchanged."""
+        return folder_path in os.environ.get("PATH", "").split(os.pathsep)
+
     @abstractmethod
+    def run_vscode_cli(self, args: List[str]) -> str:
+        """Runs the `code` CLI with the given arguments and returns its output."""
+        pass
+
+    def get_installed_vscode_extensions(self) -> Set[str]:
+        """Returns the lower-cased ids of the installed VS Code extensions. The CLI is only queried once per run."""
+        if self._vscode_extensions is None:
+            try:
+                output = self.run_vscode_cli(["--list-extensions", "--show-versions"])
+            except (OSError, subprocess.CalledProcessError) as e:
+                Logger.warn(f"Could not list installed VS Code extensions: {e}")
+                return set()
+            # Lines look like 'publisher.name@1.2.3'
+            self._vscode_extensions = {line.split("@")[0].strip().lower() for line in output.splitlines() if line.strip()}
+        return self._vscode_extensions
+
+    def get_missing_vscode_extensions(self, extension_ids: List[str]) -> List[str]:
+        installed = self.get_installed_vscode_extensions()
+        return [e for e in extension_ids if e.lower() not in installed]
+
+    def install_vscode_extensions(self, extension_ids: List[str]) -> None:
+        """Installs all missing VS Code extensions with a single CLI invocation."""
+        missing = self.get_missing_vscode_extensions(extension_ids)
+        if not missing:
+            Logger.info(f"VS Code extensions already installed: {', '.join(extension_ids)}")
+            return
+
+        args = []
+        for extension_id in missing:
+            args += ["--install-extension", extension_id]
+        self.run_vscode_cli(args)
+
+        if self._vscode_extensions is not None:
+            self._vscode_extensions.update(e.lower() for e in missing)
+
     def install_vscode_extension(self, extension_id: str) -> None:
         """Installs a VS Code extension."""
+        self.install_vscode_extensions([extension_id])
+
+    @abstractmethod
+    def get_package_name(self, package: Union[str, KnownPackage]) -> str:
+        """Returns the package manager specific name of a package."""
         pass
 
     @abstractmethod
+    def install_packages(self, package_names: List[str]) -> Dict[str, Optional[Exception]]:
+        """Installs packages in as few package manager transactions as possible.
+        Returns the error of every package (None if it was installed)."""
+        pass
+
+    def _query_installed_packages(self) -> Set[str]:
+        """Queries the package database for the names of all installed packages."""
+        return set()
+
+    def get_installed_packages(self) -> Set[str]:
+        """Returns the names of installed packages. The package database is only queried once per run."""
+        if self._installed_packages is None:
+            self._installed_packages = self._query_installed_packages()
+        return self._installed_packages
+
+    def is_package_installed(self, package: Union[str, KnownPackage]) -> bool:
+        return self.get_package_name(package) in self.get_installed_packages()
+
+    def get_missing_packages(self, package_names: List[str]) -> List[str]:
+        return [name for name in dict.fromkeys(package_names) if not self.is_package_installed(name)]
+
+    def _install_missing_packages(self, package_names: List[str]) -> Dict[str, Optional[Exception]]:
+        """Installs the packages that are not installed yet. Returns the error of every package."""
+        missing = self.get_missing_packages(package_names)
+        errors: Dict[str, Optional[Exception]] = {name: None for name in package_names if name not in missing}
+        if errors:
+            Logger.info(f"Already installed: {', '.join(errors)}")
+
+        if missing:
+            errors.update(self.install_packages(missing))
+            self.get_installed_packages().update(name for name in missing if errors[name] is None)
+        return errors
+
     def install_package(self, package: Union[str, KnownPackage]) -> None:
         """Installs a system package."""
-        pass
+        package_name = self.get_package_name(package)
+        error = self._install_missing_packages([package_name]).get(package_name)
+        if error is not None:
+            raise error
+
+    def queue_package(self, package: Union[str, KnownPackage]) -> None:
+        """Queues a system package for the next flush_packages() call."""
+        package_name = self.get_package_name(package)
+        if package_name not in self._package_queue:
+            self._package_queue.append(package_name)
+
+    def flush_packages(self) -> Dict[str, Optional[Exception]]:
+        """Installs all queued packages at once. Returns the error of every package."""
+        package_names, self._package_queue = self._package_queue, []
+        if not package_names:
+            return {}
+        return self._install_missing_packages(package_names)
     
     @abstractmethod
     def get_home_dir(self) -> str:
         """Returns the user's home directory."""
         pass
 
+    def get_local_app_data_dir(self) -> str:
+        """Returns the per-user application data directory of Windows (%LOCALAPPDATA%)."""
+        return os.environ.get("LOCALAPPDATA", os.path.join(self.get_home_dir(), "AppData", "Local"))
+
+    def is_font_family_installed(self, family: str) -> bool:
+        """Checks whether a font family is installed. The result is cached across runs, see lib.utils.fonts."""
+        from lib.core.state import StateCache
+        from lib.utils.fonts import is_font_family_installed
+        return is_font_family_installed(family, StateCache.shared())
+
+    @abstractmethod
+    def install_font_family(self, archive_path: str, family: str) -> None:
+        """Installs the files of one font family from a zip archive."""
+        pass
+
     @abstractmethod
     def get_vscode_settings_path(self) -> str:
         """Returns the path to VS Code settings.json."""
@@ -35,61 +182,67 @@ class Platform(ABC):
         """Returns the path to VS Code keybindings.json."""
         pass
 
-    def _load_vscode_settings(self) -> Dict[str, Any]:
+    def _open_vscode_settings(self) -> JsonDocument:
         path = self.get_vscode_settings_path()
-        if not os.path.exists(path):
-            return {}
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                # Note: standard json module does not support comments (JSONC).
-                # If settings.json has comments, this will fail.
-                return json.load(f)
+            return JsonDocument(path, default={})
         except json.JSONDecodeError as e:
-            raise Exception(f"Failed to parse {path}. It might contain comments or be invalid JSON: {e}")
+            raise Exception(f"Failed to parse {path}. It is not valid JSON: {e}")
 
-    def _save_vscode_settings(self, settings: Dict[str, Any]) -> None:
-        path = self.get_vscode_settings_path()
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=4)
+    @contextmanager
+    def vscode_settings(self) -> Iterator[Dict[str, Any]]:
+        """Loads settings.json once for a batch of updates.
+        The file is replaced atomically when the block exits, and only if a setting changed."""
+        with self._open_vscode_settings() as document:
+            yield document.data
+
+    def get_pending_vscode_settings(self, settings: Dict[str, Any]) -> List[str]:
+        """Returns the keys of the given settings that differ from settings.json."""
+        current = self._open_vscode_settings().data
+        return [key for key, value in settings.items() if key not in current or current[key] != value]
 
-    def _load_vscode_keybindings(self) -> list:
+    def _open_vscode_keybindings(self) -> JsonDocument:
         path = self.get_vscode_keybindings_path()
-        if not os.path.exists(path):
-            return []
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = json.load(f)
-                if isinstance(content, list):
-                    return content
-                return []
+            return JsonDocument(path, default=[])
         except json.JSONDecodeError as e:
             raise Exception(f"Failed to parse {path}: {e}")
 
-    def _save_vscode_keybindings(self, keybindings: list) -> None:
-        path = self.get_vscode_keybindings_path()
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(keybindings, f, indent=4)
-
     def add_vscode_setting(self, key: str, value: Any) -> None:
-        """Adds or updates a VS Code setting."""
-        settings = self._load_vscode_settings()
-        settings[key] = value
-        self._save_vscode_settings(settings)
+        """Adds or updates a VS Code setting. Use vscode_settings() to update several keys."""
+        with self.vscode_settings() as settings:
+            settings[key] = value
 
     def add_vscode_keybinding(self, keybinding: Dict[str, Any]) -> None:
         """Adds a VS Code keybinding if it doesn't already exist."""
-        bindings = self._load_vscode_keybindings()
-        
-        # Check for duplicates based on 'key' and 'command'
-        for b in bindings:
-            if b.get("key") == keybinding.get("key") and b.get("command") == keybinding.get("command"):
-                # Already exists
-                return
-
-        bindings.append(keybinding)
-        self._save_vscode_keybindings(bindings)
+        self.add_vscode_keybindings([keybinding])
+
+    @staticmethod
+    def _keybinding_identity(binding: Dict[str, Any]) -> tuple:
+        # Duplicates are detected on 'key', 'command' and 'when'
+        return (binding.get("key"), binding.get("command"), binding.get("when"))
+
+    def _select_missing_keybindings(self, existing: List[Any], keybindings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        index = {self._keybinding_identity(b) for b in existing if isinstance(b, dict)}
+        missing = []
+        for binding in keybindings:
+            if self._keybinding_identity(binding) in index:
+                continue
+            index.add(self._keybinding_identity(binding))
+            missing.append(binding)
+        return missing
+
+    def get_missing_vscode_keybindings(self, keybindings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the keybindings add_vscode_keybindings() would add."""
+        return self._select_missing_keybindings(self._open_vscode_keybindings().data, keybindings)
+
+    def add_vscode_keybindings(self, keybindings: List[Dict[str, Any]]) -> int:
+        """Merges keybindings that don't already exist in a single pass and write.
+        Returns the number of added keybindings."""
+        with self._open_vscode_keybindings() as document:
+            missing = self._select_missing_keybindings(document.data, keybindings)
+            document.data.extend(missing)
+        return len(missing)
 
     @abstractmethod
     def create_shortcut(self, target_path: str, shortcut_path: str, description: str = "", icon_path: str = "", working_dir: str = "", hotkey: str = "") -> None:
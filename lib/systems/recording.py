@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from typing import Union, Any, Dict, Iterable, List, Optional, Set, Tuple
+from lib.systems.platform import Platform
+from lib.utils.logger import Logger
+from lib.core.packages import KnownPackage
+
+class RecordingPlatform(Platform):
+    """Platform that only pretends to install software, for trying out components and scheduling.
+
+    Every platform call is recorded in `calls`. Package installs, extension installs, commands
+    and downloads sleep for a configurable latency (in seconds, per kind) and fail if their
+    name (package name, extension id, command name or download file name) is in `failures`.
+    Settings, keybindings and other files are written below a temporary home directory, which
+    close() removes unless it was passed as home_dir.
+    """
+
+    DEFAULT_LATENCY: Dict[str, float] = {
+        "package": 0.5,
+        "extension": 0.3,
+        "subprocess": 0.1,
+        "download": 0.2,
+    }
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None, failures: Optional[Iterable[str]] = None,
+                 installed_packages: Optional[Iterable[str]] = None, home_dir: Optional[str] = None,
+                 installed_fonts: Optional[Iterable[str]] = None):
+        super().__init__()
+        self.latency = {**self.DEFAULT_LATENCY, **(latency or {})}
+        self.failures: Set[str] = set(failures or [])
+        self._owns_home_dir = home_dir is None
+        self.home_dir = home_dir or tempfile.mkdtemp(prefix="devessentials-home-")
+        self.calls: List[Tuple[str, Tuple[Any, ...]]] = []
+        self.path: List[str] = []
+        self._preinstalled: Set[str] = set(installed_packages or [])
+        self._extensions: Set[str] = set()
+        self._fonts: Set[str] = set(installed_fonts or [])
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        if self._owns_home_dir:
+            shutil.rmtree(self.home_dir, ignore_errors=True)
+            self._owns_home_dir = False
+
+    def __enter__(self) -> "RecordingPlatform":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _record(self, kind: str, *args: Any) -> None:
+        with self._lock:
+            self.calls.append((kind, args))
+
+    def _simulate(self, kind: str, name: str) -> None:
+        """Records an operation, waits for its latency and raises if it is configured to fail."""
+        self._record(kind, name)
+        time.sleep(self.latency.get(kind, 0.0))
+        if name in self.failures:
+            raise subprocess.CalledProcessError(1, [kind, name], stderr=f"simulated failure of {name}")
+
+    def get_package_name(self, package: Union[str, KnownPackage]) -> str:
+        if isinstance(package, KnownPackage):
+            return package.value.win if sys.platform == "win32" else package.value.linux
+        return package
+
+    def _query_installed_packages(self) -> Set[str]:
+        self._record("query-packages")
+        return set(self._preinstalled)
+
+    def install_packages(self, package_names: List[str]) -> Dict[str, Optional[Exception]]:
+        Logger.info(f"Installing {', '.join(package_names)} (simulated)...")
+        errors: Dict[str, Optional[Exception]] = {}
+        for package_name in package_names:
+            try:
+                self._simulate("package", package_name)
+                errors[package_name] = None
+            except subprocess.CalledProcessError as e:
+                Logger.err(f"Failed to install {package_name}: {e.stderr}")
+                errors[package_name] = e
+        return errors
+
+    def run_vscode_cli(self, args: List[str]) -> str:
+        self._record("vscode-cli", *args)
+        if "--list-extensions" in args:
+            with self._lock:
+                return "".join(f"{extension}@1.0.0\n" for extension in sorted(self._extensions))
+
+        for flag, extension_id in zip(args, args[1:]):
+            if flag == "--install-extension":
+                self._simulate("extension", extension_id)
+                with self._lock:
+                    self._extensions.add(extension_id.lower())
+        return ""
+
+    def run(self, args: Union[str, List[str]], check: bool = True, **kwargs: Any) -> subprocess.CompletedProcess:
+        command = args.split() if isinstance(args, str) else [str(part) for part in args]
+        name = os.path.basename(command[0]) if command else ""
+        try:
+            self._simulate("subprocess", name)
+        except subprocess.CalledProcessError as e:
+            if check:
+                raise subprocess.CalledProcessError(1, args, stderr=e.stderr)
+            return subprocess.CompletedProcess(args, 1, stdout="" if kwargs.get("text") else b"", stderr=e.stderr)
+        # Callers that capture output get an empty result (e.g. git reports a missing checkout)
+        return subprocess.CompletedProcess(args, 0, stdout="" if kwargs.get("text") else b"", stderr="")
+
+    def which(self, command: str) -> Optional[str]:
+        # Every simulated command succeeds, so every command counts as installed
+        return command
+
+    def download(self, url: str, filename: str) -> str:
+        self._simulate("download", filename)
+        path = os.path.join(self.home_dir, ".cache", "downloads", filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+        return path
+
+    def is_in_path(self, folder_path: str) -> bool:
+        with self._lock:
+            return folder_path in self.path
+
+    def add_to_path(self, folder_path: str) -> None:
+        self._record("add-to-path", folder_path)
+        with self._lock:
+            if folder_path not in self.path:
+                self.path.append(folder_path)
+
+    def get_home_dir(self) -> str:
+        return self.home_dir
+
+    def get_local_app_data_dir(self) -> str:
+        return os.path.join(self.home_dir, "AppData", "Local")
+
+    def is_font_family_installed(self, family: str) -> bool:
+        with self._lock:
+            return family in self._fonts
+
+    def install_font_family(self, archive_path: str, family: str) -> None:
+        self._record("install-font", family)
+        with self._lock:
+            self._fonts.add(family)
+
+    def get_vscode_settings_path(self) -> str:
+        return os.path.join(self.home_dir, ".config", "Code", "User", "settings.json")
+
+    def get_vscode_keybindings_path(self) -> str:
+        return os.path.join(self.home_dir, ".config", "Code", "User", "keybindings.json")
+
+    def create_shortcut(self, target_path: str, shortcut_path: str, description: str = "", icon_path: str = "", working_dir: str = "", hotkey: str = "") -> None:
+        self._record("create-shortcut", target_path, shortcut_path)
+
+    def configure_gnome_terminal(self, theme_data: Dict[str, Any]) -> None:
+        self._record("configure-gnome-terminal", sorted(theme_data))
+
+    def summarize(self) -> None:
+        """Logs how many operations of each kind were recorded."""
+        with self._lock:
+            counts = Counter(kind for kind, _ in self.calls)
+        Logger.info(f"Simulated {len(self.calls)} platform operations in {self.home_dir}:")
+        for kind, count in sorted(counts.items()):
+            Logger.info(f"  {kind}: {count}")
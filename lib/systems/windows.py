@@ -1,25 +1,104 @@
 import os
+import sys
+import copy
 import json
 import glob
-try:
-    import winreg
-    from win32com.client import Dispatch
-except ImportError:
-    winreg = None
-    Dispatch = None
 import subprocess
-from typing import Union, Dict, Any
+from contextlib import contextmanager
+from typing import Union, Dict, Any, Iterator, List, Optional
 from lib.systems.platform import Platform
+from lib.systems.windows_path import PathManager, WinregBackend
+from lib.utils import jsonc
+from lib.utils.json_document import JsonDocument
 from lib.utils.logger import Logger
 from lib.core.packages import KnownPackage
 
+# winget exit code for APPINSTALLER_CLI_ERROR_PACKAGE_ALREADY_INSTALLED
+WINGET_ALREADY_INSTALLED = 0x8A15002B
+# winget is resolved through cmd on Windows. POSIX shells would drop the arguments of a list, e.g. for a stubbed winget in tests.
+WINGET_SHELL = sys.platform == "win32"
+
+WINGET_SOURCE = {
+    "Argument": "https://cdn.winget.microsoft.com/cache",
+    "Identifier": "Microsoft.Winget.Source_8wekyb3d8bbwe",
+    "Name": "winget",
+    "Type": "Microsoft.PreIndexed.Package"
+}
+
 class WindowsPlatform(Platform):
-    def install_package(self, package: Union[str, KnownPackage]) -> None:
+    def __init__(self):
+        super().__init__()
+        self._windows_terminal_settings_path: Optional[str] = None
+        # Registry reads are cached, installers invalidate them through refresh_windows_path()
+        self._path = PathManager(WinregBackend())
+
+    def get_package_name(self, package: Union[str, KnownPackage]) -> str:
         if isinstance(package, KnownPackage):
-            package_name = package.value.win
+            return package.value.win
+        return package
+
+    def install_packages(self, package_names: List[str]) -> Dict[str, Optional[Exception]]:
+        """Installs all packages with a single `winget import`.
+        If the import fails, the packages are retried one by one to find the failing ones."""
+        errors: Dict[str, Optional[Exception]] = {}
+        if len(package_names) > 1 and self._winget_import(package_names):
+            errors = {package_name: None for package_name in package_names}
         else:
-            package_name = package
+            for package_name in package_names:
+                try:
+                    self._winget_install(package_name)
+                    errors[package_name] = None
+                except subprocess.CalledProcessError as e:
+                    errors[package_name] = e
+
+        # Installers extend the PATH in the registry, pick up the changes for the following steps
+        self.refresh_windows_path()
+        return errors
+
+    def _write_winget_manifest(self, package_names: List[str], manifest_path: str) -> None:
+        """Writes a `winget export` compatible package manifest."""
+        manifest = {
+            "$schema": "https://aka.ms/winget-packages.schema.2.0.json",
+            "Sources": [{
+                "Packages": [{"PackageIdentifier": package_name, "Scope": "user"} for package_name in package_names],
+                "SourceDetails": WINGET_SOURCE
+            }]
+        }
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+
+    def _winget_import(self, package_names: List[str]) -> bool:
+        """Installs packages in one winget invocation. Returns False if the import failed."""
+        manifest_path = os.path.join(os.getcwd(), "tmp", "winget-import.json")
+        self._write_winget_manifest(package_names, manifest_path)
+
+        Logger.info(f"Installing {', '.join(package_names)} via Winget import...")
+        cmd = [
+            "winget", "import",
+            "--import-file", manifest_path,
+            "--ignore-versions",
+            "--no-upgrade",
+            "--accept-package-agreements",
+            "--accept-source-agreements"
+        ]
+
+        try:
+            subprocess.run(cmd, check=True, shell=WINGET_SHELL)
+        except subprocess.CalledProcessError as e:
+            # Returned when every package of the manifest is already installed
+            if e.returncode != WINGET_ALREADY_INSTALLED:
+                Logger.warn(f"Winget import failed ({e}). Retrying packages one by one...")
+                return False
+        finally:
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+
+        for package_name in package_names:
+            Logger.ok(f"Successfully installed {package_name}")
+        return True
 
+    def _winget_install(self, package_name: str) -> None:
         Logger.info(f"Installing {package_name} via Winget...")
         cmd = [
             "winget", "install", "-e", 
@@ -36,55 +115,46 @@ class WindowsPlatform(Platform):
             # Actually, `winget` is an exe, but `shell=True` helps with path resolution sometimes.
             # I'll try without shell=True first as it's safer, but if it fails I might need it.
             # The bat file uses it directly.
-            subprocess.run(cmd, check=True, shell=True) 
+            subprocess.run(cmd, check=True, shell=WINGET_SHELL) 
             Logger.ok(f"Successfully installed {package_name}")
         except subprocess.CalledProcessError as e:
-            if e.returncode != 0x8A15002B:
+            if e.returncode != WINGET_ALREADY_INSTALLED:
                 Logger.err(f"Failed to install {package_name}: {e}")
                 raise
 
-    def add_to_path(self, folder_path: str) -> None:
-        key_path = r"Environment"
-        try:
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, 
-                                 winreg.KEY_ALL_ACCESS)
-        except FileNotFoundError:
-            key = winreg.CreateKey(winreg.HKEY_CURRENT_USER, key_path)
+    def is_in_path(self, folder_path: str) -> bool:
+        return self._path.contains(folder_path)
 
+    def add_to_path(self, folder_path: str) -> None:
         try:
-            try:
-                current_path_value, _ = winreg.QueryValueEx(key, "Path")
-            except FileNotFoundError:
-                current_path_value = ""
-
-            if folder_path in current_path_value:
+            if not self._path.add(folder_path):
                 Logger.warn(f"'{folder_path}' is already in the PATH.")
                 return
-
-            new_path_value = current_path_value + (";" if current_path_value else "") + folder_path
-
-            winreg.SetValueEx(key, "Path", 0, winreg.REG_EXPAND_SZ, new_path_value)
-            
-            # Update current process environment so subsequent commands work immediately
-            os.environ["PATH"] = new_path_value
-            
             Logger.ok(f"Successfully added '{folder_path}' to User PATH.")
-            
         except Exception as e:
             Logger.err(f"Failed to add path variable: {e}")
             raise
-        
-        finally:
-            winreg.CloseKey(key)
 
-    def install_vscode_extension(self, extension_id: str) -> None:
+    def run_vscode_cli(self, args: List[str]) -> str:
         # Assuming 'code' is in PATH.
         # On Windows, shell=True is often needed for batch files/cmd commands to resolve correctly if not direct executables.
-        subprocess.run(["code", "--install-extension", extension_id], shell=True, check=True, stdout=subprocess.DEVNULL)
+        return subprocess.run(["code"] + args, shell=True, check=True, stdout=subprocess.PIPE, text=True).stdout
 
     def get_home_dir(self) -> str:
         return os.path.expanduser("~")
 
+    def get_local_app_data_dir(self) -> str:
+        return os.environ["LOCALAPPDATA"]
+
+    def install_font_family(self, archive_path: str, family: str) -> None:
+        from lib.utils.fonts import extract_font_family
+        extract_dir = os.path.join(os.getcwd(), "tmp", "CascadiaCode")
+        extract_font_family(archive_path, family, extract_dir)
+
+        Logger.info("Font downloaded. Installing on Windows is complex via script.")
+        Logger.info(f"Please install the fonts in '{extract_dir}' manually (Select all -> Right Click -> Install).")
+        os.startfile(extract_dir)
+
     def get_vscode_settings_path(self) -> str:
         return os.path.join(os.environ["APPDATA"], "Code", "User", "settings.json")
 
@@ -92,9 +162,12 @@ class WindowsPlatform(Platform):
         return os.path.join(os.environ["APPDATA"], "Code", "User", "keybindings.json")
 
     def create_shortcut(self, target_path: str, shortcut_path: str, description: str = "", icon_path: str = "", working_dir: str = "", hotkey: str = "") -> None:
-        if not Dispatch:
+        try:
+            # pywin32 is slow to import and only needed here
+            from win32com.client import Dispatch
+        except ImportError:
             Logger.err("win32com.client not available. Cannot create shortcut.")
-            return
+            raise
 
         try:
             shell = Dispatch('WScript.Shell')
@@ -112,9 +185,14 @@ class WindowsPlatform(Platform):
             Logger.ok(f"Shortcut created at '{shortcut_path}'" + (f" with hotkey '{hotkey}'" if hotkey else ""))
         except Exception as e:
             Logger.err(f"Failed to create shortcut: {e}")
+            raise
 
     def get_windows_terminal_settings_path(self) -> str:
-        """Finds the Windows Terminal settings.json path."""
+        """Finds the Windows Terminal settings.json path. The lookup is done once per run."""
+        if self._windows_terminal_settings_path is not None:
+            return self._windows_terminal_settings_path
+
+        self._windows_terminal_settings_path = ""
         local_app_data = os.environ.get("LOCALAPPDATA")
         if not local_app_data:
             return ""
@@ -130,9 +208,9 @@ class WindowsPlatform(Platform):
             package_dir = matches[0]
             settings_path = os.path.join(package_dir, "LocalState", "settings.json")
             if os.path.exists(settings_path):
-                return settings_path
+                self._windows_terminal_settings_path = settings_path
         
-        return ""
+        return self._windows_terminal_settings_path
 
     def get_windows_terminal_executable(self) -> str:
         """Finds the Windows Terminal executable path."""
@@ -169,124 +247,87 @@ class WindowsPlatform(Platform):
 
         return ""
 
-    def update_windows_terminal_settings(self, updates: Dict[str, Any]) -> None:
-        """Updates Windows Terminal settings.json."""
+    @contextmanager
+    def windows_terminal_settings(self) -> Iterator[Dict[str, Any]]:
+        """Loads the Windows Terminal settings.json once for a batch of updates.
+        The file is replaced atomically when the block exits, and only if something changed."""
         path = self.get_windows_terminal_settings_path()
         if not path:
-            Logger.err("Could not find Windows Terminal settings path.")
-            return
+            raise FileNotFoundError("Could not find Windows Terminal settings path.")
+        with JsonDocument(path, default={}) as document:
+            yield document.data
+
+    def _merge_windows_terminal_settings(self, content: Dict[str, Any], updates: Dict[str, Any], profiles: Dict[str, Dict[str, Any]]) -> None:
+        """Merges updates into the parsed settings.json. Color schemes are added or replaced by name,
+        profiles are looked up by name and updated with their settings."""
+        # Helper to merge dictionaries
+        def deep_merge(target, source):
+            for key, value in source.items():
+                if isinstance(value, dict) and key in target and isinstance(target[key], dict):
+                    deep_merge(target[key], value)
+                else:
+                    target[key] = value
+
+        updates_copy = updates.copy()
+        if isinstance(updates_copy.get("schemes"), list):
+            existing_schemes = content.get("schemes", [])
+            index = {s.get("name"): i for i, s in enumerate(existing_schemes) if isinstance(s, dict)}
+            for scheme in updates_copy.pop("schemes"):
+                position = index.get(scheme.get("name"))
+                if position is None:
+                    index[scheme.get("name")] = len(existing_schemes)
+                    existing_schemes.append(scheme)
+                elif existing_schemes[position] != scheme:
+                    existing_schemes[position] = scheme
+            content["schemes"] = existing_schemes
 
+        deep_merge(content, updates_copy)
+
+        if profiles:
+            # Profiles are either a list or {"defaults": ..., "list": [...]}
+            profile_list = content.get("profiles")
+            if isinstance(profile_list, dict):
+                profile_list = profile_list.get("list")
+            index = {p.get("name"): p for p in profile_list or [] if isinstance(p, dict)}
+            for profile_name, settings in profiles.items():
+                if profile_name in index:
+                    index[profile_name].update(settings)
+                else:
+                    Logger.warn(f"Profile '{profile_name}' not found in Windows Terminal settings.")
+
+    def get_windows_terminal_changes(self, updates: Dict[str, Any], profiles: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+        """Returns the top level settings update_windows_terminal_settings() would change."""
+        path = self.get_windows_terminal_settings_path()
+        if not path:
+            return []
+        content = jsonc.read(path)
+        merged = copy.deepcopy(content)
+        with Logger.capture():
+            self._merge_windows_terminal_settings(merged, updates, profiles or {})
+        return [f"update {key}" for key in merged if merged[key] != content.get(key)]
+
+    def update_windows_terminal_settings(self, updates: Dict[str, Any], profiles: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Updates Windows Terminal settings.json and the settings of named profiles in a single write."""
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                # Use json.load, hoping no comments or valid JSON
-                content = json.load(f)
-            
-            # Helper to merge dictionaries
-            def deep_merge(target, source):
-                for key, value in source.items():
-                    if isinstance(value, dict) and key in target and isinstance(target[key], dict):
-                        deep_merge(target[key], value)
-                    else:
-                        target[key] = value
-
-            # Handle schemes specifically: Append if not exists
-            if "schemes" in updates and isinstance(updates["schemes"], list):
-                existing_schemes = content.get("schemes", [])
-                existing_names = {s.get("name") for s in existing_schemes}
-                
-                for scheme in updates["schemes"]:
-                    if scheme.get("name") not in existing_names:
-                        existing_schemes.append(scheme)
-                        Logger.info(f"Added scheme: {scheme.get('name')}")
-                    else:
-                        # Update existing scheme? For now, we skip or overwrite?
-                        # Let's overwrite/update the existing one with same name
-                        for i, s in enumerate(existing_schemes):
-                            if s.get("name") == scheme.get("name"):
-                                existing_schemes[i] = scheme
-                                Logger.info(f"Updated scheme: {scheme.get('name')}")
-                                break
-                
-                content["schemes"] = existing_schemes
-                # Remove schemes from updates to avoid overwriting with the list again in the loop below if we processed it
-                # But since we're iterating 'updates' next, let's just copy 'updates' and remove 'schemes'
-                updates_copy = updates.copy()
-                del updates_copy["schemes"]
-            else:
-                updates_copy = updates
-
-            # Apply other updates
-            deep_merge(content, updates_copy)
-                
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(content, f, indent=4)
-            
+            with self.windows_terminal_settings() as content:
+                self._merge_windows_terminal_settings(content, updates, profiles or {})
             Logger.ok("Updated Windows Terminal settings.")
-            
+        except FileNotFoundError as e:
+            Logger.err(str(e))
+            raise
         except json.JSONDecodeError:
-            Logger.err(f"Failed to parse {path}. It might contain comments.")
+            Logger.err(f"Failed to parse {self.get_windows_terminal_settings_path()}. It is not valid JSON.")
+            raise
         except Exception as e:
             Logger.err(f"Failed to update Windows Terminal settings: {e}")
+            raise
 
     def update_windows_terminal_profile(self, profile_name: str, settings: Dict[str, Any]) -> None:
-        path = self.get_windows_terminal_settings_path()
-        if not path: return
-        
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = json.load(f)
-            
-            profiles = content.get("profiles")
-            profile_list = []
-            if isinstance(profiles, list):
-                profile_list = profiles
-            elif isinstance(profiles, dict) and "list" in profiles:
-                profile_list = profiles["list"]
-            
-            updated = False
-            for p in profile_list:
-                if p.get("name") == profile_name:
-                    p.update(settings)
-                    updated = True
-                    break
-            
-            if updated:
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(content, f, indent=4)
-                Logger.ok(f"Updated Windows Terminal profile '{profile_name}'")
-            else:
-                Logger.warn(f"Profile '{profile_name}' not found in Windows Terminal settings.")
-                
-        except Exception as e:
-            Logger.err(f"Failed to update profile: {e}")
+        """Updates a single profile. Use update_windows_terminal_settings() to combine it with other updates."""
+        self.update_windows_terminal_settings({}, {profile_name: settings})
 
-    def refresh_windows_path(self):
-        path_keys = [
-            ('SYSTEM', winreg.HKEY_LOCAL_MACHINE, r'SYSTEM\CurrentControlSet\Control\Session Manager\Environment'),
-            ('USER', winreg.HKEY_CURRENT_USER, r'Environment')
-        ]
-
-        new_path_parts = []
-        for name, root, subkey in path_keys:
-            try:
-                with winreg.OpenKey(root, subkey) as key:
-                    raw_value, type_ = winreg.QueryValueEx(key, 'Path')
-
-                    if type_ == winreg.REG_EXPAND_SZ:
-                        expanded_value = winreg.ExpandEnvironmentStrings(raw_value)
-                    else:
-                        expanded_value = raw_value
-                    
-                    if "%" in expanded_value:
-                        Logger.warn(f"[{name}] WARNING: Unexpanded variables remain: {expanded_value}")
-
-                    new_path_parts.append(expanded_value)
-                    
-            except FileNotFoundError:
-                Logger.error(f"[{name}] Key not found.")
-                continue
-
-        if new_path_parts:
-            final_path = ';'.join(new_path_parts)
-            os.environ['PATH'] = final_path
+    def refresh_windows_path(self) -> None:
+        """Picks up PATH changes an installer made in the registry. Entries that only exist in this process are kept."""
+        self._path.invalidate()
+        if self._path.refresh():
             Logger.ok("PATH updated successfully")
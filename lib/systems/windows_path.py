@@ -0,0 +1,141 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+try:
+    import winreg
+except ImportError:
+    winreg = None
+from lib.utils.logger import Logger
+
+SYSTEM = "system"
+USER = "user"
+
+class RegistryBackend(ABC):
+    """Reads and writes the raw `Path` values of the system and user environment."""
+
+    @abstractmethod
+    def read(self, scope: str) -> Optional[Tuple[str, bool]]:
+        """Returns the raw value and whether it contains %VARIABLES% to expand, or None if it is not set."""
+        pass
+
+    @abstractmethod
+    def write(self, scope: str, value: str) -> None:
+        """Replaces the raw value of a scope."""
+        pass
+
+    @abstractmethod
+    def expand(self, value: str) -> str:
+        """Expands the %VARIABLES% of a raw value."""
+        pass
+
+class WinregBackend(RegistryBackend):
+    KEYS = {
+        SYSTEM: (r"SYSTEM\CurrentControlSet\Control\Session Manager\Environment", "HKEY_LOCAL_MACHINE"),
+        USER: (r"Environment", "HKEY_CURRENT_USER"),
+    }
+
+    def _root(self, scope: str) -> Tuple[int, str]:
+        subkey, root = self.KEYS[scope]
+        return getattr(winreg, root), subkey
+
+    def read(self, scope: str) -> Optional[Tuple[str, bool]]:
+        root, subkey = self._root(scope)
+        try:
+            with winreg.OpenKey(root, subkey) as key:
+                value, type_ = winreg.QueryValueEx(key, "Path")
+        except FileNotFoundError:
+            return None
+        return value, type_ == winreg.REG_EXPAND_SZ
+
+    def write(self, scope: str, value: str) -> None:
+        root, subkey = self._root(scope)
+        with winreg.CreateKeyEx(root, subkey, 0, winreg.KEY_ALL_ACCESS) as key:
+            winreg.SetValueEx(key, "Path", 0, winreg.REG_EXPAND_SZ, value)
+
+    def expand(self, value: str) -> str:
+        return winreg.ExpandEnvironmentStrings(value)
+
+def _split(value: str, separator: str = ";") -> List[str]:
+    return [entry for entry in value.split(separator) if entry]
+
+def _identity(entry: str) -> str:
+    """Windows paths compare case-insensitively and with or without a trailing backslash."""
+    return entry.rstrip("\\/").lower()
+
+class PathManager:
+    """Keeps the process PATH in sync with the registry.
+
+    Registry values are read once and cached until invalidate() is called, which the platform does
+    after package installs. Writes through add() update the cache directly. refresh() rebuilds PATH
+    from the system and user values, keeps entries that only exist in this process and drops duplicates.
+    """
+
+    def __init__(self, backend: RegistryBackend, separator: str = os.pathsep):
+        self.backend = backend
+        # Separator of the process PATH, registry values always use ';'
+        self.separator = separator
+        self._values: Dict[str, Optional[Tuple[str, bool]]] = {}
+        # Registry values and process PATH of the last refresh, to skip refreshes that change nothing
+        self._refreshed: Optional[Tuple[Tuple[Optional[Tuple[str, bool]], ...], str]] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Forgets the cached registry values, e.g. after an installer changed them."""
+        with self._lock:
+            self._values.clear()
+
+    def _read(self, scope: str) -> Optional[Tuple[str, bool]]:
+        if scope not in self._values:
+            self._values[scope] = self.backend.read(scope)
+        return self._values[scope]
+
+    def _entries(self, scope: str) -> List[str]:
+        value = self._read(scope)
+        if value is None:
+            return []
+        raw, expandable = value
+        if expandable:
+            raw = self.backend.expand(raw)
+            if "%" in raw:
+                Logger.warn(f"[{scope}] Unexpanded variables remain in PATH: {raw}")
+        return _split(raw)
+
+    def contains(self, folder_path: str) -> bool:
+        """Checks whether folder_path is an entry of the user PATH in the registry."""
+        with self._lock:
+            return _identity(folder_path) in {_identity(entry) for entry in self._entries(USER)}
+
+    def add(self, folder_path: str) -> bool:
+        """Appends folder_path to the user PATH in the registry. Returns False if it was already there."""
+        with self._lock:
+            if _identity(folder_path) in {_identity(entry) for entry in self._entries(USER)}:
+                return False
+            raw, _ = self._read(USER) or ("", True)
+            raw = raw.rstrip(";") + (";" if raw.rstrip(";") else "") + folder_path
+            self.backend.write(USER, raw)
+            # The value was written as REG_EXPAND_SZ
+            self._values[USER] = (raw, True)
+        self.refresh()
+        return True
+
+    def refresh(self) -> bool:
+        """Rebuilds the process PATH from the (cached) registry values. Returns True if PATH changed."""
+        with self._lock:
+            current = os.environ.get("PATH", "")
+            values = tuple(self._read(scope) for scope in (SYSTEM, USER))
+            if self._refreshed == (values, current):
+                return False
+
+            # Entries set up by the parent process (e.g. a venv) come after the registry entries
+            entries: List[str] = []
+            seen = set()
+            for entry in self._entries(SYSTEM) + self._entries(USER) + _split(current, self.separator):
+                if _identity(entry) not in seen:
+                    seen.add(_identity(entry))
+                    entries.append(entry)
+
+            path = self.separator.join(entries)
+            os.environ["PATH"] = path
+            self._refreshed = (values, path)
+            return path != current
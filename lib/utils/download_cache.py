@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import hashlib
+import queue
+import threading
+import http.client
+import urllib.error
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+from lib.utils.downloader import Downloader, DownloadError
+from lib.utils.file_lock import FileLock
+from lib.utils.logger import Logger
+from lib.utils.trace import span
+
+class DownloadCache:
+    """Shared cache for installer downloads, keyed by URL and content hash.
+
+    Layout of the cache directory:
+        urls/<sha256 of url>.json   metadata (ETag, Last-Modified, content hash, file name)
+        urls/<sha256 of url>.lock   lock file, serializes downloads of the same URL across processes
+        urls/<sha256 of url>.download.part  interrupted download, resumed by the next fetch
+        blobs/<sha256>/<file name>  downloaded content
+
+    Cached entries are revalidated with If-None-Match/If-Modified-Since on every fetch.
+    The directory can live on a shared volume.
+
+    prefetch() starts downloads in background threads; fetch() hands over their result.
+    The threads are daemons, so exiting (e.g. after Ctrl+C or a failed step) abandons downloads
+    nobody waits for. Their partial files are resumed by the next run.
+    """
+
+    PREFETCH_WORKERS = 4
+
+    _shared: Optional["DownloadCache"] = None
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_default_dir() -> str:
+        if os.environ.get("DEVESSENTIALS_CACHE_DIR"):
+            return os.environ["DEVESSENTIALS_CACHE_DIR"]
+        if sys.platform == "win32":
+            base_dir = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+            return os.path.join(base_dir, "devessentials", "cache")
+        base_dir = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+        return os.path.join(base_dir, "devessentials")
+
+    @classmethod
+    def configure(cls, cache_dir: Optional[str] = None) -> "DownloadCache":
+        """Sets the cache used by all components."""
+        cls._shared = cls(cache_dir or cls.get_default_dir())
+        return cls._shared
+
+    @classmethod
+    def shared(cls) -> "DownloadCache":
+        if cls._shared is None:
+            cls.configure()
+        return cls._shared
+
+    def _entry_path(self, url: str, extension: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "urls", key + extension)
+
+    def _blob_path(self, digest: str, filename: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", digest, filename)
+
+    def _load_entry(self, url: str) -> Dict[str, Any]:
+        try:
+            with open(self._entry_path(url, ".json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_entry(self, url: str, entry: Dict[str, Any]) -> None:
+        path = self._entry_path(url, ".json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=4)
+        os.replace(tmp_path, path)
+
+    def prefetch(self, downloads: List[Tuple[str, str]]) -> None:
+        """Starts fetching (url, filename) pairs in background threads."""
+        if not downloads:
+            return
+
+        # ThreadPoolExecutor joins its workers at interpreter exit, which would block on running downloads
+        work: "queue.Queue[Tuple[str, str, Future]]" = queue.Queue()
+        with self._lock:
+            for url, filename in downloads:
+                if url not in self._pending:
+                    self._pending[url] = Future()
+                    work.put((url, filename, self._pending[url]))
+
+        for i in range(min(self.PREFETCH_WORKERS, work.qsize())):
+            threading.Thread(target=self._prefetch_worker, args=(work,), name=f"prefetch-{i}", daemon=True).start()
+
+    def _prefetch_worker(self, work: "queue.Queue[Tuple[str, str, Future]]") -> None:
+        while True:
+            try:
+                url, filename, future = work.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._prefetch(url, filename))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _prefetch(self, url: str, filename: str) -> Tuple[str, list]:
+        # Logs are handed to the step that consumes the download
+        with Logger.capture() as logs:
+            path = self._download(url, filename)
+        return path, logs
+
+    def cancel(self) -> None:
+        """Drops prefetches that haven't started yet. Running ones are abandoned when the process exits."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.cancel()
+
+    def fetch(self, url: str, filename: str, sha256: Optional[str] = None) -> str:
+        """Returns the path of a cached copy of url, downloading it if it is missing or outdated.
+        Waits for a running prefetch of the same url. If sha256 is given, the content is verified against it.
+        The returned file must not be modified or deleted."""
+        with span(f"fetch: {filename}", "download", url=url):
+            return self._fetch(url, filename, sha256)
+
+    def _fetch(self, url: str, filename: str, sha256: Optional[str]) -> str:
+        with self._lock:
+            future = self._pending.pop(url, None)
+
+        if future is not None:
+            try:
+                path, logs = future.result()
+                Logger.replay(logs)
+                if not sha256 or os.path.basename(os.path.dirname(path)) == sha256.lower():
+                    return path
+            except Exception as e:
+                Logger.warn(f"Prefetching {url} failed ({e}). Retrying...")
+
+        return self._download(url, filename, sha256)
+
+    def _download(self, url: str, filename: str, sha256: Optional[str] = None) -> str:
+        with FileLock(self._entry_path(url, ".lock")):
+            entry = self._load_entry(url)
+            cached = None
+            if entry.get("sha256") and entry.get("filename"):
+                cached = self._blob_path(entry["sha256"], entry["filename"])
+                if not os.path.exists(cached):
+                    cached = None
+
+            if cached and sha256 and entry["sha256"] == sha256.lower():
+                # Content addressed: a matching hash needs no revalidation
+                return cached
+
+            headers = {}
+            if cached:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            # Partial downloads stay next to the entry, so an interrupted download can be resumed
+            download_path = self._entry_path(url, ".download")
+            try:
+                result = Downloader().download(url, download_path, headers=headers, sha256=sha256, name=filename)
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                if not cached:
+                    raise
+                Logger.warn(f"Could not revalidate {url} ({e}). Using cached {filename}.")
+                return cached
+
+            if result.not_modified and cached:
+                Logger.info(f"Using cached {filename} (not modified).")
+                return cached
+            if result.not_modified:
+                raise DownloadError(f"Server answered 'not modified' for {url}, but nothing is cached.")
+
+            os.chmod(download_path, 0o644)
+            blob_path = self._blob_path(result.sha256, filename)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(download_path, blob_path)
+
+            self._save_entry(url, {
+                "url": url,
+                "filename": filename,
+                "sha256": result.sha256,
+                "etag": result.etag,
+                "last_modified": result.last_modified
+            })
+            return blob_path
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from lib.utils.logger import Logger
+from lib.utils.trace import span
+
+@dataclass
+class DownloadResult:
+    not_modified: bool
+    sha256: Optional[str] = None
+    size: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+class DownloadError(Exception):
+    pass
+
+class Downloader:
+    """HTTP downloader with resume, parallel Range requests and hash verification.
+
+    Partial downloads are kept as '<path>.part' together with '<path>.part.json', which records
+    the validator (ETag/Last-Modified) of the remote file and the finished byte ranges. An
+    interrupted download continues from there on the next attempt or run, as long as the remote
+    file is unchanged. Files of at least PARALLEL_THRESHOLD bytes are fetched in PART_SIZE pieces
+    by several connections if the server supports Range requests.
+    """
+
+    USER_AGENT = "Mozilla/5.0"
+    TIMEOUT = 60
+    RETRIES = 3
+    WORKERS = 4
+    READ_SIZE = 1024 * 1024
+    PART_SIZE = 8 * 1024 * 1024
+    PARALLEL_THRESHOLD = 16 * 1024 * 1024
+
+    def __init__(self, workers: int = WORKERS, timeout: int = TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+
+    def download(self, url: str, path: str, headers: Optional[Dict[str, str]] = None, sha256: Optional[str] = None, name: Optional[str] = None) -> DownloadResult:
+        """Downloads url to path. Extra headers (e.g. If-None-Match) are sent with the first request.
+        Returns a result with not_modified set if the server answered 304."""
+        name = name or os.path.basename(path)
+        with span(f"download: {name}", "download", url=url):
+            return self._download(url, path, headers or {}, sha256, name)
+
+    def _download(self, url: str, path: str, headers: Dict[str, str], sha256: Optional[str], name: str) -> DownloadResult:
+        for attempt in range(1, self.RETRIES + 1):
+            try:
+                return self._attempt(url, path, headers, sha256, name)
+            except urllib.error.HTTPError as e:
+                if e.code < 500 or attempt == self.RETRIES:
+                    raise
+                Logger.warn(f"Download of {name} failed ({e}). Retrying ({attempt}/{self.RETRIES})...")
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                if attempt == self.RETRIES:
+                    raise
+                Logger.warn(f"Download of {name} interrupted ({e}). Resuming ({attempt}/{self.RETRIES})...")
+            time.sleep(attempt)
+        raise DownloadError(f"Failed to download {url}")
+
+    def _open(self, url: str, headers: Dict[str, str]):
+        request = urllib.request.Request(url, headers={"User-Agent": self.USER_AGENT, **headers})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _load_state(self, state_path: str) -> Dict[str, Any]:
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state_path: str, state: Dict[str, Any]) -> None:
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def _attempt(self, url: str, path: str, headers: Dict[str, str], sha256: Optional[str], name: str) -> DownloadResult:
+        part_path = path + ".part"
+        state_path = path + ".part.json"
+        start = time.perf_counter()
+
+        try:
+            response = self._open(url, headers)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return DownloadResult(not_modified=True)
+            raise
+        ttfb = time.perf_counter() - start
+
+        with response:
+            size = int(response.headers["Content-Length"]) if response.headers.get("Content-Length") else None
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            validator = etag or last_modified
+            ranges = bool(size) and bool(validator) and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+
+            state = self._load_state(state_path)
+            resumable = ranges and os.path.exists(part_path) and state.get("url") == url \
+                and state.get("validator") == validator and state.get("size") == size
+            if not resumable:
+                state = {"url": url, "validator": validator, "size": size, "done": []}
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                self._save_state(state_path, state)
+
+            if ranges and size >= self.PARALLEL_THRESHOLD:
+                response.close()
+                digest = self._download_parts(url, part_path, state_path, state, validator, name)
+            else:
+                digest = self._download_stream(url, response, part_path, validator if resumable else None, name)
+
+        received = os.path.getsize(part_path)
+        if size is not None and received != size:
+            # Retried by download(), which resumes from the part file
+            raise ConnectionError(f"Connection closed after {received} of {size} bytes")
+        if sha256 and digest != sha256.lower():
+            os.remove(part_path)
+            os.remove(state_path)
+            raise DownloadError(f"Hash mismatch for {url}: expected {sha256}, got {digest}")
+
+        os.replace(part_path, path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        Logger.info(
+            f"Downloaded {name}: {received / 1e6:.1f} MB in {elapsed:.1f}s "
+            f"({received / elapsed / 1e6:.1f} MB/s, time to first byte {ttfb * 1000:.0f} ms)"
+        )
+        return DownloadResult(not_modified=False, sha256=digest, size=received, etag=etag, last_modified=last_modified)
+
+    def _download_stream(self, url: str, response, part_path: str, validator: Optional[str], name: str) -> str:
+        """Streams a single connection into the part file, continuing a partial file if possible."""
+        digest = hashlib.sha256()
+        offset = os.path.getsize(part_path) if validator and os.path.exists(part_path) else 0
+
+        if offset:
+            # Only ask for the rest if the remote file is still the one we started with
+            resumed = self._open(url, {"Range": f"bytes={offset}-", "If-Range": validator})
+            if resumed.status == 206:
+                response.close()
+                response = resumed
+                with open(part_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(self.READ_SIZE), b""):
+                        digest.update(chunk)
+                Logger.info(f"Resuming {name} at {offset / 1e6:.1f} MB...")
+            else:
+                resumed.close()
+                offset = 0
+
+        with response, open(part_path, 'ab' if offset else 'wb') as out_file:
+            for chunk in iter(lambda: response.read(self.READ_SIZE), b""):
+                digest.update(chunk)
+                out_file.write(chunk)
+        return digest.hexdigest()
+
+    def _download_parts(self, url: str, part_path: str, state_path: str, state: Dict[str, Any], validator: str, name: str) -> str:
+        """Fetches the file in PART_SIZE ranges over several connections.
+        Finished parts are hashed in order while later parts are still downloading."""
+        size = state["size"]
+        count = (size + self.PART_SIZE - 1) // self.PART_SIZE
+        done = set(state["done"])
+        lock = threading.Lock()
+        hasher = _OrderedHasher(part_path, self.PART_SIZE, count)
+
+        if not os.path.exists(part_path):
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+
+        def fetch_part(index: int) -> None:
+            first = index * self.PART_SIZE
+            last = min(first + self.PART_SIZE, size) - 1
+            with self._open(url, {"Range": f"bytes={first}-{last}", "If-Range": validator}) as response:
+                if response.status != 206:
+                    raise DownloadError(f"Server ignored the range request for {url}")
+                with open(part_path, 'r+b') as out_file:
+                    out_file.seek(first)
+                    written = 0
+                    for chunk in iter(lambda: response.read(self.READ_SIZE), b""):
+                        out_file.write(chunk)
+                        written += len(chunk)
+            if written != last - first + 1:
+                raise ConnectionError(f"Connection closed after {written} bytes of range {first}-{last}")
+
+            with lock:
+                done.add(index)
+                state["done"] = sorted(done)
+                self._save_state(state_path, state)
+            hasher.finish(index)
+
+        for index in done:
+            hasher.finish(index)
+
+        missing = [index for index in range(count) if index not in done]
+        if len(missing) < count:
+            Logger.info(f"Resuming {name}: {len(done)}/{count} parts already downloaded.")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download") as executor:
+            for future in [executor.submit(fetch_part, index) for index in missing]:
+                future.result()
+
+        return hasher.hexdigest()
+
+class _OrderedHasher:
+    """Hashes the parts of a file in order as soon as all previous parts are complete."""
+
+    def __init__(self, path: str, part_size: int, count: int):
+        self.path = path
+        self.part_size = part_size
+        self.count = count
+        self._digest = hashlib.sha256()
+        self._finished: List[bool] = [False] * count
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def finish(self, index: int) -> None:
+        with self._lock:
+            self._finished[index] = True
+            with open(self.path, 'rb') as f:
+                while self._next < self.count and self._finished[self._next]:
+                    f.seek(self._next * self.part_size)
+                    self._digest.update(f.read(self.part_size))
+                    self._next += 1
+
+    def hexdigest(self) -> str:
+        if self._next != self.count:
+            raise DownloadError(f"Not all parts of {self.path} were hashed.")
+        return self._digest.hexdigest()
@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+from typing import Dict, Iterable, List, Optional, Set
+
+# inotify(7) flags
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# Editors and JsonDocument replace files by renaming, so the directories are watched rather than the files
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB
+
+_EVENT = struct.Struct("iIII")
+# Fixed read buffer, a burst of events larger than this is read in several passes
+_BUFFER_SIZE = 64 * 1024
+
+def fingerprint(path: str) -> Optional[List[int]]:
+    """Size and modification time of a file or directory, None if it doesn't exist.
+    A list rather than a tuple, so it compares equal to its JSON round trip (see RunJournal)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+class FileWatcher:
+    """Waits until one of a fixed set of files changes.
+
+    On Linux the parent directories are watched with inotify, so waiting costs no CPU.
+    Files whose directory doesn't exist yet, and all files on other systems, are polled
+    every poll_interval seconds by comparing their size and modification time.
+    """
+
+    def __init__(self, paths: Iterable[str], poll_interval: float = 2.0):
+        self.paths = sorted({os.path.abspath(path) for path in paths})
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, str] = {}
+        self._polled: Dict[str, Optional[List[int]]] = {}
+
+        directories = {os.path.dirname(path) for path in self.paths}
+        self._fd = self._init_inotify()
+        for directory in sorted(directories):
+            if self._fd is None or not self._add_watch(directory):
+                for path in self.paths:
+                    if os.path.dirname(path) == directory:
+                        self._polled[path] = fingerprint(path)
+
+    @staticmethod
+    def _libc() -> Optional[ctypes.CDLL]:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        except OSError:
+            return None
+
+    def _init_inotify(self) -> Optional[int]:
+        self._lib = self._libc()
+        if self._lib is None:
+            return None
+        fd = self._lib.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        return fd if fd >= 0 else None
+
+    def _add_watch(self, directory: str) -> bool:
+        if not os.path.isdir(directory):
+            return False
+        wd = self._lib.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._watches[wd] = directory
+        return True
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _read_events(self) -> Set[str]:
+        changed: Set[str] = set()
+        watched = set(self.paths)
+        while True:
+            try:
+                data = os.read(self._fd, _BUFFER_SIZE)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped, report everything that is watched
+                    changed.update(path for path in self.paths if path not in self._polled)
+                elif wd in self._watches:
+                    path = os.path.join(self._watches[wd], os.fsdecode(name))
+                    if path in watched:
+                        changed.add(path)
+
+    def _poll(self) -> Set[str]:
+        changed = set()
+        for path, previous in self._polled.items():
+            current = fingerprint(path)
+            if current != previous:
+                self._polled[path] = current
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> List[str]:
+        """Blocks until files changed and returns them. Returns an empty list after timeout seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            interval = self.poll_interval if self._polled else None
+            if interval is not None and (remaining is None or interval < remaining):
+                remaining = interval
+
+            if self._fd is not None:
+                select.select([self._fd], [], [], remaining)
+                changed = self._read_events()
+            else:
+                time.sleep(remaining if remaining is not None else self.poll_interval)
+                changed = set()
+            changed |= self._poll()
+
+            if changed:
+                return sorted(changed)
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
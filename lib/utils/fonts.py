@@ -0,0 +1,131 @@
+import os
+import re
+import sys
+import zlib
+import shutil
+import zipfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from lib.core.state import StateCache
+
+def get_font_file_prefix(family: str) -> str:
+    """Returns the file name prefix of a font family, e.g. 'Cascadia Mono NF' -> 'CascadiaMonoNF'."""
+    return family.replace(" ", "")
+
+def select_font_members(zip_ref: zipfile.ZipFile, family: str) -> List[zipfile.ZipInfo]:
+    """Returns the font files of a single family ('CascadiaMonoNF.ttf', 'CascadiaMonoNFItalic.ttf', 'CascadiaMonoNF-Bold.otf', ...)."""
+    # The variable fonts name their italic face without a dash
+    pattern = re.compile(re.escape(get_font_file_prefix(family)) + r"(Italic)?(-[^.]*)?\.(ttf|otf)$", re.IGNORECASE)
+    return [info for info in zip_ref.infolist() if not info.is_dir() and pattern.match(os.path.basename(info.filename))]
+
+def _matches_member(path: str, info: zipfile.ZipInfo) -> bool:
+    """Compares an extracted file with the size and CRC from the zip's central directory."""
+    try:
+        if os.path.getsize(path) != info.file_size:
+            return False
+        crc = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc == info.CRC
+    except OSError:
+        return False
+
+def _extract_member(zip_path: str, info: zipfile.ZipInfo, target: str) -> None:
+    # Every worker uses its own handle, ZipFile objects are not meant to be shared between threads
+    tmp_target = target + ".tmp"
+    with zipfile.ZipFile(zip_path, "r") as zip_ref, zip_ref.open(info) as source, open(tmp_target, "wb") as out_file:
+        shutil.copyfileobj(source, out_file)
+    os.replace(tmp_target, target)
+
+def extract_font_family(zip_path: str, family: str, target_dir: str, workers: int = 4) -> List[str]:
+    """Extracts the files of one font family flat into target_dir, in parallel.
+    Files that already match the archive are skipped without decompressing them.
+    Returns the names of the extracted files."""
+    os.makedirs(target_dir, exist_ok=True)
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        members = select_font_members(zip_ref, family)
+    if not members:
+        raise FileNotFoundError(f"No files of font family '{family}' found in {zip_path}")
+
+    pending = []
+    for info in members:
+        target = os.path.join(target_dir, os.path.basename(info.filename))
+        if not _matches_member(target, info):
+            pending.append((info, target))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(_extract_member, zip_path, info, target) for info, target in pending]:
+            future.result()
+
+    return [os.path.basename(target) for _, target in pending]
+
+def get_font_dirs() -> List[str]:
+    """Returns the directories fonts are installed to on this platform."""
+    if sys.platform == "win32":
+        return [
+            os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+            os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts")
+        ]
+    return [
+        os.path.expanduser("~/.local/share/fonts"),
+        os.path.expanduser("~/.fonts"),
+        "/usr/local/share/fonts",
+        "/usr/share/fonts"
+    ]
+
+def _get_font_dirs_mtimes() -> Dict[str, int]:
+    """Returns the modification times of the font directories and, on Linux, their direct subdirectories."""
+    mtimes: Dict[str, int] = {}
+    for directory in get_font_dirs():
+        try:
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+            if sys.platform == "win32":
+                # Windows installs fonts flat into these directories, listing the thousands of files would cost more than the probe
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        mtimes[entry.path] = entry.stat().st_mtime_ns
+        except OSError:
+            continue
+    return mtimes
+
+def _probe_font_family(family: str) -> bool:
+    if sys.platform == "win32":
+        # Font files are named after the family, e.g. 'CascadiaMonoNF-Bold.ttf'
+        prefix = get_font_file_prefix(family).lower()
+        for directory in get_font_dirs():
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.lower().startswith(prefix):
+                            return True
+            except OSError:
+                continue
+        return False
+
+    if not shutil.which("fc-list"):
+        return False
+    # Ask fontconfig for this family only; -q exits with 1 if nothing matched
+    pattern = re.sub(r"([-:,\\])", r"\\\1", family)
+    try:
+        return subprocess.run(["fc-list", "-q", pattern], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+
+def is_font_family_installed(family: str, state: Optional[StateCache] = None) -> bool:
+    """Checks whether a font family is installed.
+    With a state cache, the result of the last probe is reused until a font directory changes."""
+    mtimes = _get_font_dirs_mtimes()
+    key = f"font:{family}"
+    if state is not None:
+        cached = state.get(key)
+        if cached and cached.get("mtimes") == mtimes:
+            return cached["installed"]
+
+    installed = _probe_font_family(family)
+    if state is not None:
+        state.set(key, {"installed": installed, "mtimes": mtimes})
+    return installed
@@ -0,0 +1,127 @@
+import os
+import time
+import hashlib
+import pathlib
+import subprocess
+from typing import Callable, List, Optional
+from lib.utils.file_lock import FileLock
+from lib.utils.logger import Logger
+
+# Runs a command like subprocess.run(), e.g. Platform.run
+Runner = Callable[..., subprocess.CompletedProcess]
+
+def run_git(args: List[str], cwd: str, run: Optional[Runner] = None) -> subprocess.CompletedProcess:
+    # subprocess.run is looked up per call, Tracer.enable() replaces it after this module is imported
+    run = run or subprocess.run
+    return run(["git"] + args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False)
+
+def is_clean_checkout(path: str, run: Optional[Runner] = None) -> bool:
+    """Returns True if path is the top level of an intact git checkout without local changes."""
+    if not os.path.isdir(os.path.join(path, ".git")):
+        return False
+    toplevel = run_git(["rev-parse", "--show-toplevel"], path, run)
+    if toplevel.returncode != 0 or os.path.normcase(os.path.realpath(toplevel.stdout.strip())) != os.path.normcase(os.path.realpath(path)):
+        return False
+    if run_git(["rev-parse", "--verify", "--quiet", "HEAD"], path, run).returncode != 0:
+        return False
+    status = run_git(["status", "--porcelain", "--untracked-files=no"], path, run)
+    return status.returncode == 0 and not status.stdout.strip()
+
+def _check(result: subprocess.CompletedProcess) -> None:
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+
+def update_checkout(path: str, source: Optional[str] = None, run: Optional[Runner] = None) -> bool:
+    """Fetches the upstream branch of a clean checkout and moves it to the fetched commit.
+    The branch is fetched from source (e.g. a local mirror) instead of the remote if given.
+    Returns True if the checkout changed. Raises CalledProcessError if the update failed."""
+    upstream = run_git(["rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}"], path, run)
+    if upstream.returncode == 0 and "/" in upstream.stdout.strip():
+        remote, branch = upstream.stdout.strip().split("/", 1)
+    else:
+        remote, branch = "origin", "HEAD"
+
+    # Shallow clones can't fast-forward across the depth boundary, so fetch with the same depth
+    # and move the (clean) checkout to the fetched commit instead of merging
+    shallow = os.path.exists(os.path.join(path, ".git", "shallow"))
+    _check(run_git(["fetch", "--quiet"] + (["--depth=1"] if shallow else []) + [source or remote, branch], path, run))
+
+    head = run_git(["rev-parse", "HEAD"], path, run).stdout.strip()
+    fetched = run_git(["rev-parse", "FETCH_HEAD"], path, run).stdout.strip()
+    if head == fetched:
+        return False
+
+    if shallow:
+        update = run_git(["reset", "--quiet", "--hard", "FETCH_HEAD"], path, run)
+    else:
+        update = run_git(["merge", "--quiet", "--ff-only", "FETCH_HEAD"], path, run)
+    _check(update)
+    return True
+
+def clone_repository(url: str, path: str, source: Optional[str] = None, run: Optional[Runner] = None) -> None:
+    """Shallow clones url into path. With a source (e.g. a local mirror) the objects are copied
+    from there and origin is pointed back at url afterwards. Raises CalledProcessError on failure."""
+    _check(run_git(["clone", "--quiet", "--depth=1", source or url, path], os.getcwd(), run))
+    if source:
+        _check(run_git(["remote", "set-url", "origin", url], path, run))
+
+class GitMirrorCache:
+    """Local bare mirrors of remote repositories that clones and updates copy their objects from.
+
+    Layout of the cache directory:
+        <sha256 of url>.git      bare mirror
+        <sha256 of url>.lock     lock file, serializes refreshes of the same mirror across processes
+        <sha256 of url>.fetched  touched after every successful refresh
+
+    A mirror is only fetched again when its last refresh is older than MAX_AGE seconds.
+    The directory can live on a shared volume.
+    """
+
+    MAX_AGE = 60 * 60
+
+    _shared: Optional["GitMirrorCache"] = None
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def configure(cls, cache_dir: Optional[str]) -> Optional["GitMirrorCache"]:
+        """Sets the mirror cache used by all components. Mirrors are disabled without a directory."""
+        cls._shared = cls(cache_dir) if cache_dir else None
+        return cls._shared
+
+    @classmethod
+    def shared(cls) -> Optional["GitMirrorCache"]:
+        return cls._shared
+
+    def _path(self, url: str, extension: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + extension)
+
+    def mirror(self, url: str) -> Optional[str]:
+        """Returns a file:// URL of an up to date mirror of url, or None if it could not be created."""
+        mirror_path = self._path(url, ".git")
+        stamp_path = self._path(url, ".fetched")
+
+        with FileLock(self._path(url, ".lock")):
+            try:
+                fresh = time.time() - os.path.getmtime(stamp_path) < self.MAX_AGE
+            except OSError:
+                fresh = False
+
+            exists = os.path.isdir(mirror_path)
+            if not (exists and fresh):
+                if exists:
+                    result = run_git(["remote", "update", "--prune"], mirror_path)
+                else:
+                    result = run_git(["clone", "--quiet", "--mirror", url, mirror_path], self.cache_dir)
+
+                if result.returncode == 0:
+                    pathlib.Path(stamp_path).touch()
+                elif exists:
+                    Logger.warn(f"Could not refresh the mirror of {url}, using the cached copy.")
+                else:
+                    Logger.warn(f"Could not mirror {url}: {result.stderr.strip()}")
+                    return None
+
+        return pathlib.Path(mirror_path).resolve().as_uri()
@@ -0,0 +1,64 @@
+import copy
+import json
+import os
+import tempfile
+from typing import Any
+from lib.utils import jsonc
+
+class JsonDocument:
+    """A JSON file that is loaded once, edited in memory and written back only if it changed.
+
+    Comments and trailing commas are accepted when reading, but not preserved when saving.
+    Use it as a context manager: the file is saved when the block exits without an exception.
+    """
+
+    def __init__(self, path: str, default: Any):
+        self.path = path
+        # The parsed content is shared with the jsonc cache and only used for comparison
+        self._original = self._load(default)
+        self.data = copy.deepcopy(self._original)
+
+    def _load(self, default: Any) -> Any:
+        if not os.path.exists(self.path):
+            return default
+        content = jsonc.read(self.path)
+        if not isinstance(content, type(default)):
+            return default
+        return content
+
+    @property
+    def changed(self) -> bool:
+        return self.data != self._original
+
+    def save(self) -> bool:
+        """Atomically replaces the file if the data changed. Returns True if it was written."""
+        if not self.changed:
+            return False
+
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file with 0600, keep the permissions of the file we replace
+            mode = os.stat(self.path).st_mode & 0o777 if os.path.exists(self.path) else 0o644
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.path)
+            jsonc.forget(self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._original = copy.deepcopy(self.data)
+        return True
+
+    def __enter__(self) -> "JsonDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.save()
@@ -0,0 +1,65 @@
+import os
+import re
+import copy
+import json
+import threading
+from typing import Any, Dict, Tuple
+
+# One alternation, applied in a single left-to-right pass: strings are matched first so that
+# '//' or ',]' inside them is left alone, then comments and commas before a closing bracket.
+_TOKENS = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<line>//[^\n]*)
+  | (?P<block>/\*(?:[^*]|\*(?!/))*\*/)
+  | ,(?P<trailing>(?:\s|//[^\n]*|/\*(?:[^*]|\*(?!/))*\*/)*)(?=[\]}])
+''', re.VERBOSE)
+
+def _replace(match: "re.Match[str]") -> str:
+    if match.group("string") is not None:
+        return match.group("string")
+    if match.group("block") is not None:
+        # Keep line numbers of later errors intact
+        return "\n" * match.group("block").count("\n")
+    if match.group("trailing") is not None:
+        return _TOKENS.sub(_replace, match.group("trailing"))
+    return ""
+
+def strip_jsonc(text: str) -> str:
+    """Turns JSONC (line and block comments, trailing commas) into plain JSON."""
+    return _TOKENS.sub(_replace, text)
+
+def loads(text: str) -> Any:
+    """Parses JSON with comments and trailing commas, as written by VS Code and Windows Terminal."""
+    try:
+        # Most files are plain JSON, which the C parser handles directly
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(strip_jsonc(text))
+
+_cache: Dict[str, Tuple[int, int, Any]] = {}
+_lock = threading.Lock()
+
+def read(path: str) -> Any:
+    """Returns the parsed content of a JSONC file. Files are parsed once per run and again only
+    after their modification time or size changed. The result is shared and must not be modified."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _lock:
+        cached = _cache.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        value = loads(f.read())
+    with _lock:
+        _cache[path] = (stat.st_mtime_ns, stat.st_size, value)
+    return value
+
+def load(path: str) -> Any:
+    """Like read(), but returns a copy that can be modified."""
+    return copy.deepcopy(read(path))
+
+def forget(path: str) -> None:
+    """Drops the cached content of a file, e.g. after writing it."""
+    with _lock:
+        _cache.pop(os.path.abspath(path), None)
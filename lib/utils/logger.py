@@ -1,21 +1,67 @@
-from rich.console import Console
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from rich.console import Console
 
 class Logger:
-    _stdout = Console(stderr=False)
-    _stderr = Console(stderr=True)
+    # Created on first use, importing rich is a large part of the startup time
+    _stdout: Optional["Console"] = None
+    _stderr: Optional["Console"] = None
+    _lock = threading.Lock()
+    _local = threading.local()
+
+    @staticmethod
+    def _console(stderr: bool) -> "Console":
+        console = Logger._stderr if stderr else Logger._stdout
+        if console is None:
+            with Logger._lock:
+                if Logger._stdout is None:
+                    from rich.console import Console
+                    Logger._stdout = Console(stderr=False)
+                    Logger._stderr = Console(stderr=True)
+            console = Logger._stderr if stderr else Logger._stdout
+        return console
+
+    @staticmethod
+    def _print(stderr: bool, msg: str, style: str) -> None:
+        buffer = getattr(Logger._local, "buffer", None)
+        if buffer is not None:
+            buffer.append((stderr, msg, style))
+        else:
+            Logger._console(stderr).print(msg, style=style)
+
+    @staticmethod
+    @contextmanager
+    def capture() -> Iterator[List[Tuple[bool, str, str]]]:
+        """Buffers messages logged by the current thread instead of printing them."""
+        previous = getattr(Logger._local, "buffer", None)
+        records: List[Tuple[bool, str, str]] = []
+        Logger._local.buffer = records
+        try:
+            yield records
+        finally:
+            Logger._local.buffer = previous
+
+    @staticmethod
+    def replay(records: List[Tuple[bool, str, str]]) -> None:
+        """Prints messages previously buffered by capture()."""
+        for stderr, msg, style in records:
+            Logger._print(stderr, msg, style)
 
     @staticmethod
     def info(msg: str):
-        Logger._stdout.print(f"[INFO] {msg}", style="default")
+        Logger._print(False, f"[INFO] {msg}", "default")
 
     @staticmethod
     def ok(msg: str):
-        Logger._stdout.print(f"[OK] {msg}", style="green")
+        Logger._print(False, f"[OK] {msg}", "green")
 
     @staticmethod
     def warn(msg: str):
-        Logger._stdout.print(f"[WARNING] {msg}", style="yellow")
+        Logger._print(False, f"[WARNING] {msg}", "yellow")
 
     @staticmethod
     def err(msg: str):
-        Logger._stderr.print(f"[ERROR] {msg}", style="red")
\ No newline at end of file
+        Logger._print(True, f"[ERROR] {msg}", "red")
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+import subprocess
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from lib.utils.logger import Logger
+
+@dataclass
+class Span:
+    id: int
+    name: str
+    category: str
+    start: float
+    thread_id: int
+    thread_name: str
+    parent: Optional[int] = None
+    end: Optional[float] = None
+    status: str = "ok"  # "ok" or "error"
+    error: Optional[str] = None
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+class Tracer:
+    """Records timing spans of a run. Disabled by default, spans are then close to free.
+
+    Spans nest per thread: a span opened while another one is open on the same thread
+    becomes its child. Spans opened on worker threads without an open span are roots.
+    """
+
+    enabled = False
+    _spans: List[Span] = []
+    _lock = threading.Lock()
+    _local = threading.local()
+    _origin = time.perf_counter()
+    _subprocess_run: Optional[Callable] = None
+
+    @classmethod
+    def enable(cls) -> None:
+        """Starts recording spans, including one for every subprocess.run() call."""
+        cls.enabled = True
+        cls._origin = time.perf_counter()
+        if cls._subprocess_run is None:
+            # check_output() and call sites using subprocess.run() all go through this function
+            cls._subprocess_run = subprocess.run
+            subprocess.run = _traced_subprocess_run
+
+    @classmethod
+    def _stack(cls) -> List[Span]:
+        if not hasattr(cls._local, "stack"):
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    def spans(cls) -> List[Span]:
+        with cls._lock:
+            return list(cls._spans)
+
+    @classmethod
+    def _open(cls, name: str, category: str, args: Dict[str, Any]) -> Span:
+        stack = cls._stack()
+        thread = threading.current_thread()
+        with cls._lock:
+            span = Span(len(cls._spans), name, category, time.perf_counter(), thread.ident or 0, thread.name,
+                        parent=stack[-1].id if stack else None, args=args)
+            cls._spans.append(span)
+        stack.append(span)
+        return span
+
+    @classmethod
+    def _close(cls, span: Span, error: Optional[BaseException]) -> None:
+        span.end = time.perf_counter()
+        if error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+        stack = cls._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+
+    @classmethod
+    def export_chrome(cls, path: str) -> None:
+        """Writes all spans as Chrome trace events (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        threads: Dict[int, str] = {}
+        for span in cls.spans():
+            threads[span.thread_id] = span.thread_name
+            args = {key: str(value) for key, value in span.args.items()}
+            args["status"] = span.status
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - cls._origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args
+            })
+        for thread_id, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}})
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        Logger.info(f"Wrote trace with {len(events)} events to {path}")
+
+    @classmethod
+    def summarize(cls, limit: int = 10) -> None:
+        """Logs the slowest steps (or checks of a --plan run) together with the slowest operation inside each of them."""
+        spans = cls.spans()
+        children: Dict[int, List[Span]] = {}
+        for span in spans:
+            if span.parent is not None:
+                children.setdefault(span.parent, []).append(span)
+
+        def slowest_descendant(span: Span) -> Optional[Span]:
+            best = None
+            for child in children.get(span.id, []):
+                for candidate in [child, slowest_descendant(child)]:
+                    if candidate is not None and (best is None or candidate.duration > best.duration):
+                        best = candidate
+            return best
+
+        steps = sorted((s for s in spans if s.category in ("step", "check")), key=lambda s: s.duration, reverse=True)[:limit]
+        if not steps:
+            return
+
+        width = max(len(s.name) for s in steps)
+        Logger.info(f"Slowest steps:")
+        Logger.info(f"  {'step'.ljust(width)}  {'time':>8}  {'status':<6}  slowest operation")
+        for step in steps:
+            inner = slowest_descendant(step)
+            detail = f"{inner.name} ({inner.duration:.2f}s)" if inner else "-"
+            Logger.info(f"  {step.name.ljust(width)}  {step.duration:>7.2f}s  {step.status:<6}  {detail}")
+
+@contextmanager
+def span(name: str, category: str = "function", **args: Any) -> Iterator[Optional[Span]]:
+    """Records the wall time and outcome of the enclosed block. Exceptions propagate unchanged."""
+    if not Tracer.enabled:
+        yield None
+        return
+
+    current = Tracer._open(name, category, args)
+    try:
+        yield current
+    except BaseException as e:
+        Tracer._close(current, e)
+        raise
+    Tracer._close(current, None)
+
+def traced(name: Optional[str] = None, category: str = "function") -> Callable[[Callable], Callable]:
+    """Decorator recording a span for every call. The name defaults to the function's qualified name."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not Tracer.enabled:
+                return fn(*args, **kwargs)
+            with span(name or fn.__qualname__, category):
+                return fn(*args, **kwargs)
+        wrapper.__traced__ = True
+        return wrapper
+    return decorator
+
+def trace_methods(cls: type, category: str = "platform") -> type:
+    """Wraps the public methods defined on cls with traced(). Context manager methods are left alone,
+    a span would only cover creating the context manager."""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.isfunction(value) or getattr(value, "__traced__", False):
+            continue
+        if getattr(value, "__isabstractmethod__", False) or inspect.isgeneratorfunction(getattr(value, "__wrapped__", None)):
+            continue
+        setattr(cls, attr, traced(category=category)(value))
+    return cls
+
+def _traced_subprocess_run(*popenargs, **kwargs):
+    if not Tracer.enabled:
+        return Tracer._subprocess_run(*popenargs, **kwargs)
+
+    command = popenargs[0] if popenargs else kwargs.get("args", "")
+    if isinstance(command, (list, tuple)):
+        command = " ".join(str(part) for part in command)
+    name = os.path.basename(str(command).split(" ", 1)[0])
+    with span(f"subprocess: {name}", "subprocess", command=command) as current:
+        result = Tracer._subprocess_run(*popenargs, **kwargs)
+        current.args["returncode"] = result.returncode
+        return result
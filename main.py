@@ -1,19 +1,26 @@
 import argparse
 import sys
 import os
-from lib.systems.windows import WindowsPlatform
-from lib.systems.linux import LinuxPlatform
-from lib.modules.default import Default
-from lib.modules.neovim import Neovim
-from lib.modules.terminal import Terminal
-from lib.modules.build_tools import BuildTools
-from lib.modules.utils import Utils
-from lib.utils.logger import Logger
-
-def get_platform():
+import time
+from importlib import import_module
+
+# Modules are imported once a component is selected, so --help and small runs start quickly
+COMPONENTS = [
+    ("terminal", "lib.modules.terminal", "Terminal"),
+    ("neovim", "lib.modules.neovim", "Neovim"),
+    ("build_tools", "lib.modules.build_tools", "BuildTools"),
+    ("utils", "lib.modules.utils", "Utils"),
+]
+
+def get_platform(args):
+    if args.simulate:
+        from lib.systems.recording import RecordingPlatform
+        return RecordingPlatform(failures=args.simulate_fail)
     if sys.platform == "win32":
+        from lib.systems.windows import WindowsPlatform
         return WindowsPlatform()
     elif sys.platform == "linux":
+        from lib.systems.linux import LinuxPlatform
         return LinuxPlatform()
     else:
         raise NotImplementedError(f"OS {sys.platform} not supported!")
@@ -34,32 +41,103 @@ Use command line arguments to specify additional installations (use --help for h
     parser.add_argument("--with-neovim", action="store_true", help="Install Neovim (neovim, vscode-integration)")
     parser.add_argument("--with-build-tools", action="store_true", help="Install posix build tools (gcc, gdb, make, cmake, ...)")
     parser.add_argument("--with-utils", action="store_true", help="Install utilities (wget, keepass, ...)")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Directory for cached downloads, may be shared between machines (default: ~/.cache/devessentials)")
+    parser.add_argument("--git-cache", metavar="DIR", help="Keep bare mirrors of cloned git repositories in DIR and clone from them (default: disabled)")
+    parser.add_argument("--plan", action="store_true", help="Only report what would change, without changing anything (exit code 0: up to date, 2: changes pending)")
+    parser.add_argument("--trace", metavar="FILE", help="Record timings of all steps, platform calls, subprocesses and downloads as a Chrome trace in FILE")
+    parser.add_argument("--simulate", action="store_true", help="Pretend to install everything with simulated latencies in a temporary home directory")
+    parser.add_argument("--simulate-fail", action="append", default=[], metavar="NAME", help="With --simulate, let the package, extension, command or download NAME fail (repeatable)")
+    parser.add_argument("--resume", action="store_true", help="Skip steps that completed in the previous run and whose inputs and outputs are unchanged")
+    parser.add_argument("--watch", action="store_true", help="After the run, keep watching the managed config files and re-apply the steps owning a file that changed")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N", help="Run up to N independent steps in parallel (default: 1)")
     
     args = parser.parse_args()
 
+    from lib.core.state import StateCache
+    from lib.utils.git import GitMirrorCache
+    from lib.utils.logger import Logger
+    from lib.utils.trace import Tracer
+
+    if args.trace:
+        Tracer.enable()
+    # Simulated runs don't clone anything, so they must not fill the mirror cache either
+    GitMirrorCache.configure(None if args.simulate else args.git_cache)
+
     try:
-        platform = get_platform()
+        platform = get_platform(args)
     except NotImplementedError as e:
         Logger.err(str(e))
         sys.exit(1)
 
-    Default(platform).install()
+    # Cached probes of a simulated run must neither come from nor end up in the real state directory,
+    # and --plan reads them without recording new results
+    state_dir = os.path.join(platform.get_home_dir(), ".local", "state", "devessentials") if args.simulate else None
+    StateCache.configure(state_dir, read_only=args.plan)
+
+    from lib.modules.default import Default
+    components = [Default(platform)]
+
+    for flag, module_name, class_name in COMPONENTS:
+        if getattr(args, f"with_{flag}") or args.full:
+            components.append(getattr(import_module(module_name), class_name)(platform))
+
+    try:
+        sys.exit(run(platform, components, args))
+    finally:
+        if args.trace:
+            Tracer.summarize()
+            Tracer.export_chrome(args.trace)
+        if args.simulate:
+            # Removes the temporary home directory
+            platform.close()
+
+def run(platform, components, args) -> int:
+    """Plans or runs the steps of all components. Returns the exit code."""
+    from lib.core.scheduler import Scheduler
+    from lib.modules.base import build_steps
+    from lib.utils.logger import Logger
+
+    steps = build_steps(platform, components)
+    if args.plan:
+        return Scheduler.summarize_plan(Scheduler(steps).plan())
+
+    if args.simulate:
+        start = time.perf_counter()
+        results = Scheduler(steps, jobs=args.jobs).run()
+        platform.summarize()
+        Logger.info(f"Simulated run took {time.perf_counter() - start:.2f}s with {args.jobs} job(s).")
+        return watch_or_exit(platform, steps, results, args)
 
-    if args.with_terminal or args.full:
-        terminal_component = Terminal(platform)
-        terminal_component.install()
-        
-    if args.with_neovim or args.full:
-        neovim_component = Neovim(platform)
-        neovim_component.install()
+    from lib.core.journal import RunJournal
+    from lib.utils.download_cache import DownloadCache
+    DownloadCache.configure(args.cache_dir)
+    journal = RunJournal.shared()
+    if args.resume:
+        # Steps that completed earlier fetch nothing, the remaining ones download on demand
+        Logger.info(f"Resuming from {journal.path}")
+    else:
+        journal.clear()
+        # Downloads overlap with the package installs
+        DownloadCache.shared().prefetch([download for component in components for download in component.downloads()])
+
+    try:
+        results = Scheduler(steps, jobs=args.jobs, journal=journal).run()
+    finally:
+        # PATH changes are written once, also when a step failed
+        platform.commit_environment()
+        # Prefetches of steps that didn't run are not started anymore, running ones don't delay the exit
+        DownloadCache.shared().cancel()
+    return watch_or_exit(platform, steps, results, args)
 
-    if args.with_build_tools or args.full:
-        build_tools_component = BuildTools(platform)
-        build_tools_component.install()
+def watch_or_exit(platform, steps, results, args) -> int:
+    """Summarizes the run and, with --watch, keeps the managed files in shape until interrupted."""
+    from lib.core.scheduler import Scheduler
 
-    if args.with_utils or args.full:
-        utils_component = Utils(platform)
-        utils_component.install()
+    completed = Scheduler.summarize(results)
+    if args.watch:
+        from lib.core.watch import watch
+        return watch(steps, platform, jobs=args.jobs)
+    return 0 if completed else 1
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,25 @@
+import os
+import re
+from typing import Dict, Optional, Tuple
+from lib.systems.windows_path import RegistryBackend
+
+class MemoryBackend(RegistryBackend):
+    """Registry stand-in, so PATH handling can be tested on other systems. Counts the reads."""
+
+    def __init__(self, values: Optional[Dict[str, str]] = None):
+        self.values: Dict[str, str] = dict(values or {})
+        self.reads = 0
+        self.writes = 0
+
+    def read(self, scope: str) -> Optional[Tuple[str, bool]]:
+        self.reads += 1
+        if scope not in self.values:
+            return None
+        return self.values[scope], "%" in self.values[scope]
+
+    def write(self, scope: str, value: str) -> None:
+        self.writes += 1
+        self.values[scope] = value
+
+    def expand(self, value: str) -> str:
+        return re.sub(r"%([^%]+)%", lambda m: os.environ.get(m.group(1), m.group(0)), value)
@@ -0,0 +1,61 @@
+import os
+import pytest
+from lib.core.scheduler import Scheduler
+from lib.modules.base import PACKAGES_STEP, build_steps
+from lib.systems.recording import RecordingPlatform
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ZERO_LATENCY = {kind: 0.0 for kind in RecordingPlatform.DEFAULT_LATENCY}
+
+def components(platform):
+    from lib.modules.default import Default
+    from lib.modules.terminal import Terminal
+    from lib.modules.neovim import Neovim
+    from lib.modules.build_tools import BuildTools
+    from lib.modules.utils import Utils
+    return [Default(platform), Terminal(platform), Neovim(platform), BuildTools(platform), Utils(platform)]
+
+@pytest.fixture(autouse=True)
+def repository_root(monkeypatch):
+    # Components read files/ relative to the working directory
+    monkeypatch.chdir(ROOT)
+
+def run(platform, jobs=1):
+    results = Scheduler(build_steps(platform, components(platform)), jobs=jobs).run()
+    return {result.name: result.status for result in results}
+
+def test_failed_package_only_fails_its_component(tmp_path):
+    platform = RecordingPlatform(latency=ZERO_LATENCY, failures=["keepass2"], home_dir=str(tmp_path))
+
+    statuses = run(platform, jobs=4)
+
+    assert statuses[PACKAGES_STEP] == "ok"
+    assert statuses["packages:utils"] == "failed"
+    assert [name for name, status in statuses.items() if status != "ok"] == ["packages:utils"]
+
+def test_packages_are_installed_in_one_transaction(tmp_path):
+    platform = RecordingPlatform(latency=ZERO_LATENCY, home_dir=str(tmp_path))
+
+    statuses = run(platform)
+
+    assert set(statuses.values()) == {"ok"}
+    installs = [args[0] for kind, args in platform.calls if kind == "package"]
+    assert len(installs) == len(set(installs)) > 1
+
+def test_component_steps_only_wait_for_their_own_packages(tmp_path):
+    platform = RecordingPlatform(latency=ZERO_LATENCY, home_dir=str(tmp_path))
+    steps = {step.name: step for step in build_steps(platform, components(platform))}
+
+    assert steps["terminal.prompt"].deps == ["packages:terminal"]
+    # Neovim declares no packages, so it doesn't wait for the transaction
+    assert steps["packages:neovim"].deps == []
+    assert steps["packages:utils"].deps == [PACKAGES_STEP]
+
+def test_resumed_transaction_retries_failed_packages(tmp_path):
+    platform = RecordingPlatform(latency=ZERO_LATENCY, home_dir=str(tmp_path))
+    step = {step.name: step for step in build_steps(platform, components(platform))}["packages:utils"]
+
+    # The shared step didn't run, e.g. because the journal had it as complete
+    step.action()
+
+    assert {args[0] for kind, args in platform.calls if kind == "package"} == set(step.inputs)
@@ -0,0 +1,274 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from lib.utils import downloader
+from lib.utils.download_cache import DownloadCache
+from lib.utils.downloader import DownloadError
+
+class Server:
+    """Local stand-in for a download server. Serves files[path] with the configured validators and records the requests.
+    Range requests are answered with 206 unless If-Range names an outdated validator. A response is cut off once after
+    interrupts[(path, first byte)] bytes."""
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self.interrupts = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                if self.path not in server.files:
+                    self.send_error(404)
+                    return
+                body, etag, last_modified = server.files[self.path]
+                if (etag and self.headers.get("If-None-Match") == etag) or \
+                        (not etag and last_modified and self.headers.get("If-Modified-Since") == last_modified):
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                first, last = self._range(len(body), etag or last_modified)
+                self.send_response(200 if first is None else 206)
+                if first is None:
+                    first, last = 0, len(body) - 1
+                else:
+                    self.send_header("Content-Range", f"bytes {first}-{last}/{len(body)}")
+                self.send_header("Content-Length", str(last - first + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                if etag:
+                    self.send_header("ETag", etag)
+                if last_modified:
+                    self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                # The client notices the missing bytes when the connection closes
+                sent = server.interrupts.pop((self.path, first), last - first + 1)
+                self.wfile.write(body[first:first + sent])
+
+            def _range(self, size, validator):
+                """Returns the requested (first, last) byte, or (None, None) for the whole file."""
+                requested = self.headers.get("Range")
+                if not requested or self.headers.get("If-Range", validator) != validator:
+                    return None, None
+                first, _, last = requested[len("bytes="):].partition("-")
+                return int(first), min(int(last), size - 1) if last else size - 1
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}{path}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+@pytest.fixture
+def server():
+    server = Server()
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Failed requests are retried after a pause
+    monkeypatch.setattr(downloader.time, "sleep", lambda seconds: None)
+    return DownloadCache(str(tmp_path / "cache"))
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_stores_downloads_by_content_hash(server, cache):
+    server.files["/vscode.deb"] = (b"deb v1", '"v1"', None)
+
+    path = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    assert read(path) == b"deb v1"
+    assert path == os.path.join(cache.cache_dir, "blobs", sha256(b"deb v1"), "vscode.deb")
+
+def test_revalidates_with_etag(server, cache):
+    server.files["/vscode.deb"] = (b"deb v1", '"v1"', None)
+    first = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    second = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    assert second == first
+    assert server.requests[-1][1].get("If-None-Match") == '"v1"'
+
+def test_revalidates_with_last_modified(server, cache):
+    last_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+    server.files["/font.zip"] = (b"zip", None, last_modified)
+    first = cache.fetch(server.url("/font.zip"), "CascadiaCode.zip")
+
+    second = cache.fetch(server.url("/font.zip"), "CascadiaCode.zip")
+
+    assert second == first
+    assert server.requests[-1][1].get("If-Modified-Since") == last_modified
+
+def test_changed_content_gets_a_new_blob(server, cache):
+    server.files["/vscode.deb"] = (b"deb v1", '"v1"', None)
+    first = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+    server.files["/vscode.deb"] = (b"deb v2", '"v2"', None)
+
+    second = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    assert second != first
+    assert read(second) == b"deb v2"
+    # The old blob stays valid for processes still using it
+    assert read(first) == b"deb v1"
+
+def test_matching_hash_skips_revalidation(server, cache):
+    server.files["/install.sh"] = (b"#!/bin/sh", '"a"', None)
+    path = cache.fetch(server.url("/install.sh"), "install.sh")
+    requests = len(server.requests)
+
+    assert cache.fetch(server.url("/install.sh"), "install.sh", sha256=sha256(b"#!/bin/sh")) == path
+    assert len(server.requests) == requests
+
+def test_hash_mismatch_is_rejected(server, cache):
+    server.files["/install.sh"] = (b"tampered", '"a"', None)
+
+    with pytest.raises(DownloadError):
+        cache.fetch(server.url("/install.sh"), "install.sh", sha256=sha256(b"expected"))
+    assert not os.path.exists(os.path.join(cache.cache_dir, "blobs"))
+
+def test_uses_cached_copy_if_server_is_unreachable(server, cache):
+    server.files["/vscode.deb"] = (b"deb v1", '"v1"', None)
+    url = server.url("/vscode.deb")
+    path = cache.fetch(url, "vscode.deb")
+    server.stop()
+
+    assert cache.fetch(url, "vscode.deb") == path
+
+    # Stopped servers can't be stopped again by the fixture
+    server.stop = lambda: None
+
+def test_shared_between_cache_instances(server, cache):
+    server.files["/vscode.deb"] = (b"deb v1", '"v1"', None)
+    path = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    other = DownloadCache(cache.cache_dir)
+
+    assert other.fetch(server.url("/vscode.deb"), "vscode.deb") == path
+    assert server.requests[-1][1].get("If-None-Match") == '"v1"'
+
+def test_concurrent_fetches_download_once(server, cache):
+    server.files["/vscode.deb"] = (b"deb v1", '"v1"', None)
+    url = server.url("/vscode.deb")
+    paths = []
+
+    threads = [threading.Thread(target=lambda: paths.append(DownloadCache(cache.cache_dir).fetch(url, "vscode.deb"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(paths)) == 1
+    # Everyone after the first download only revalidates
+    assert sum(1 for _, headers in server.requests if "If-None-Match" not in headers) == 1
+
+def test_prefetch_hands_over_to_fetch(server, cache):
+    server.files["/font.zip"] = (b"zip", '"z"', None)
+    url = server.url("/font.zip")
+
+    cache.prefetch([(url, "CascadiaCode.zip")])
+    path = cache.fetch(url, "CascadiaCode.zip")
+
+    assert read(path) == b"zip"
+    assert len(server.requests) == 1
+
+def test_prefetch_threads_do_not_block_exit(server, cache, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def download(url, filename, sha256=None):
+        started.set()
+        release.wait(5)
+        return filename
+
+    monkeypatch.setattr(cache, "_download", download)
+    cache.PREFETCH_WORKERS = 1
+
+    cache.prefetch([(server.url("/a"), "a"), (server.url("/b"), "b")])
+    started.wait(5)
+    workers = [thread for thread in threading.enumerate() if thread.name.startswith("prefetch-")]
+    pending = dict(cache._pending)
+    cache.cancel()
+    release.set()
+
+    assert workers and all(thread.daemon for thread in workers)
+    # The running download finishes, the queued one never starts
+    assert pending[server.url("/a")].result(5)[0] == "a"
+    assert pending[server.url("/b")].cancelled()
+
+@pytest.fixture
+def parts(monkeypatch):
+    # Splits files of 16 bytes and more into 4 byte parts, read in 2 byte chunks
+    monkeypatch.setattr(downloader.Downloader, "PARALLEL_THRESHOLD", 16)
+    monkeypatch.setattr(downloader.Downloader, "PART_SIZE", 4)
+    monkeypatch.setattr(downloader.Downloader, "READ_SIZE", 2)
+
+def ranges(server):
+    return [headers["Range"] for _, headers in server.requests if "Range" in headers]
+
+def test_large_files_are_fetched_in_parts(server, cache, parts):
+    body = bytes(range(30))
+    server.files["/vscode.deb"] = (body, '"v1"', None)
+
+    path = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    assert read(path) == body
+    assert path == os.path.join(cache.cache_dir, "blobs", sha256(body), "vscode.deb")
+    assert sorted(ranges(server)) == sorted(f"bytes={first}-{min(first + 3, 29)}" for first in range(0, 30, 4))
+    assert all(headers.get("If-Range") == '"v1"' for _, headers in server.requests if "Range" in headers)
+
+def test_interrupted_part_is_fetched_again(server, cache, parts):
+    body = bytes(range(30))
+    server.files["/vscode.deb"] = (body, '"v1"', None)
+    server.interrupts[("/vscode.deb", 8)] = 2
+
+    path = cache.fetch(server.url("/vscode.deb"), "vscode.deb")
+
+    assert read(path) == body
+    # The finished parts are kept, only the interrupted one is requested again
+    assert ranges(server).count("bytes=8-11") == 2
+    assert len(ranges(server)) == 9
+
+def test_interrupted_download_resumes(server, cache, parts):
+    body = b"0123456789"
+    server.files["/install.sh"] = (body, '"v1"', None)
+    server.interrupts[("/install.sh", 0)] = 6
+
+    path = cache.fetch(server.url("/install.sh"), "install.sh")
+
+    assert read(path) == body
+    assert path == os.path.join(cache.cache_dir, "blobs", sha256(body), "install.sh")
+    assert ranges(server) == ["bytes=6-"]
+    assert server.requests[-1][1].get("If-Range") == '"v1"'
+
+def test_changed_etag_restarts_the_download(server, cache, parts, monkeypatch):
+    server.files["/install.sh"] = (b"0123456789", '"v1"', None)
+    server.interrupts[("/install.sh", 0)] = 6
+    # The file changes on the server before the retry
+    monkeypatch.setattr(downloader.time, "sleep", lambda seconds: server.files.update({"/install.sh": (b"abcdefghij", '"v2"', None)}))
+
+    path = cache.fetch(server.url("/install.sh"), "install.sh")
+
+    assert read(path) == b"abcdefghij"
+    assert path == os.path.join(cache.cache_dir, "blobs", sha256(b"abcdefghij"), "install.sh")
+    # The interrupted download and a complete new one, nothing of the old file is reused
+    assert len(server.requests) == 2
+    assert ranges(server) == []
+    assert not [name for _, _, names in os.walk(cache.cache_dir) for name in names if ".part" in name]
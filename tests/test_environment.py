@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import pytest
+from lib.modules.base import Component
+from lib.systems.linux import ENV_SOURCE_LINE, LinuxPlatform
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", os.environ["PATH"])
+    (tmp_path / ".bashrc").write_text("# user config\n")
+    return tmp_path
+
+class Tool(Component):
+    """Component whose install step adds a folder to PATH."""
+    name = "tool"
+
+    def __init__(self, platform, folder, fail=False):
+        super().__init__(platform)
+        self.folder = folder
+        self.fail = fail
+
+    def steps(self):
+        return [self.step("install", self._install)]
+
+    def _install(self):
+        self.platform.add_to_path(self.folder)
+        if self.fail:
+            raise RuntimeError("installer failed")
+
+def test_component_install_commits_the_environment(home):
+    Tool(LinuxPlatform(), "/opt/tool/bin").install()
+
+    assert "/opt/tool/bin" in (home / ".config" / "devessentials" / "env.sh").read_text()
+    assert ENV_SOURCE_LINE in (home / ".bashrc").read_text()
+
+def test_component_install_commits_the_environment_of_failed_steps(home):
+    with pytest.raises(RuntimeError):
+        Tool(LinuxPlatform(), "/opt/tool/bin", fail=True).install()
+
+    assert "/opt/tool/bin" in (home / ".config" / "devessentials" / "env.sh").read_text()
+
+def test_zshrc_sources_the_environment_of_the_platform(home):
+    from lib.modules.terminal import Terminal
+    terminal = Terminal(LinuxPlatform())
+
+    terminal._write_zshrc()
+
+    assert (home / ".zshrc").read_text().endswith(ENV_SOURCE_LINE + "\n")
+    assert terminal._check_zshrc() == []
+
+def test_terminal_does_not_load_other_platforms():
+    code = "import sys, lib.modules.terminal; print(sorted(m for m in sys.modules if m.startswith('lib.systems.')))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True).stdout
+    assert output.strip() == "['lib.systems.platform']"
@@ -0,0 +1,86 @@
+import os
+import zipfile
+from lib.core.state import StateCache
+from lib.utils.fonts import extract_font_family, is_font_family_installed, select_font_members
+
+# Laid out like the Cascadia Code release archive
+RELEASE_MEMBERS = [
+    "ttf/CascadiaCode.ttf",
+    "ttf/CascadiaCodeNF.ttf",
+    "ttf/CascadiaMonoNF.ttf",
+    "ttf/CascadiaMonoNFItalic.ttf",
+    "ttf/CascadiaMonoNFPL.ttf",
+    "ttf/CascadiaMonoNFPLItalic.ttf",
+    "ttf/static/CascadiaMonoNF-Bold.ttf",
+    "ttf/static/CascadiaMonoNF-BoldItalic.ttf",
+    "otf/static/CascadiaMonoNF-Regular.otf",
+    "woff2/CascadiaMonoNF.woff2",
+]
+
+def _write_release_zip(path):
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        for name in RELEASE_MEMBERS:
+            zip_ref.writestr(name, f"font data of {name}")
+
+def test_selects_only_the_configured_family_including_italics(tmp_path):
+    zip_path = tmp_path / "CascadiaCode.zip"
+    _write_release_zip(zip_path)
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        names = sorted(os.path.basename(info.filename) for info in select_font_members(zip_ref, "Cascadia Mono NF"))
+    assert names == [
+        "CascadiaMonoNF-Bold.ttf",
+        "CascadiaMonoNF-BoldItalic.ttf",
+        "CascadiaMonoNF-Regular.otf",
+        "CascadiaMonoNF.ttf",
+        "CascadiaMonoNFItalic.ttf",
+    ]
+
+def test_extraction_skips_files_that_match_the_archive(tmp_path):
+    zip_path = tmp_path / "CascadiaCode.zip"
+    _write_release_zip(zip_path)
+    target = tmp_path / "fonts"
+
+    assert len(extract_font_family(str(zip_path), "Cascadia Mono NF", str(target))) == 5
+    (target / "CascadiaMonoNFItalic.ttf").write_text("damaged")
+    assert extract_font_family(str(zip_path), "Cascadia Mono NF", str(target)) == ["CascadiaMonoNFItalic.ttf"]
+    assert (target / "CascadiaMonoNFItalic.ttf").read_text() == "font data of ttf/CascadiaMonoNFItalic.ttf"
+
+def test_font_dir_mtimes_only_stat_the_directories_on_windows(tmp_path, monkeypatch):
+    from lib.utils import fonts
+    (tmp_path / "Fonts" / "sub").mkdir(parents=True)
+    monkeypatch.setattr(fonts, "get_font_dirs", lambda: [str(tmp_path / "Fonts")])
+    monkeypatch.setattr(fonts.os, "scandir", lambda path: (_ for _ in ()).throw(AssertionError("scandir called")))
+
+    monkeypatch.setattr(fonts.sys, "platform", "win32")
+    assert list(fonts._get_font_dirs_mtimes()) == [str(tmp_path / "Fonts")]
+
+def test_read_only_state_is_used_but_not_written(tmp_path, monkeypatch):
+    from lib.utils import fonts
+    monkeypatch.setattr(fonts, "_get_font_dirs_mtimes", lambda: {"/usr/share/fonts": 1})
+    probes = []
+    monkeypatch.setattr(fonts, "_probe_font_family", lambda family: probes.append(family) or True)
+    path = tmp_path / "state.json"
+
+    # --plan probes, but leaves the state directory alone
+    assert is_font_family_installed("Cascadia Mono NF", StateCache(str(path), read_only=True))
+    assert not path.exists()
+
+    state = StateCache(str(path))
+    assert is_font_family_installed("Cascadia Mono NF", state)
+    assert probes == ["Cascadia Mono NF", "Cascadia Mono NF"]
+    content = path.read_text()
+
+    assert is_font_family_installed("Cascadia Mono NF", StateCache(str(path), read_only=True))
+    assert is_font_family_installed("Fira Code", StateCache(str(path), read_only=True))
+    assert probes == ["Cascadia Mono NF", "Cascadia Mono NF", "Fira Code"]
+    assert path.read_text() == content
+
+def test_read_only_state_keeps_a_corrupt_file(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+
+    state = StateCache(str(path), read_only=True)
+    state.set("font:Fira Code", {"installed": True})
+
+    assert state.get("font:Fira Code") is None
+    assert path.read_text() == "{not json"
@@ -0,0 +1,168 @@
+import os
+import pathlib
+import subprocess
+import pytest
+from lib.utils.git import GitMirrorCache, clone_repository, is_clean_checkout, update_checkout
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch):
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+
+def git(*args, cwd):
+    return subprocess.run(["git"] + list(args), cwd=cwd, check=True, stdout=subprocess.PIPE, text=True).stdout.strip()
+
+class Remote:
+    """Local bare repository standing in for a plugin repository on GitHub."""
+
+    def __init__(self, root: pathlib.Path, name: str):
+        self.bare = root / f"{name}.git"
+        self.work = root / f"{name}-work"
+        git("init", "--quiet", "--bare", str(self.bare), cwd=root)
+        git("clone", "--quiet", str(self.bare), str(self.work), cwd=root)
+        self.commit("initial")
+        git("push", "--quiet", "origin", "HEAD", cwd=self.work)
+
+    @property
+    def url(self) -> str:
+        # file:// keeps --depth working, git ignores it for plain local paths
+        return self.bare.as_uri()
+
+    def commit(self, content: str) -> str:
+        (self.work / "plugin.zsh").write_text(content)
+        git("add", "plugin.zsh", cwd=self.work)
+        git("commit", "--quiet", "-m", content, cwd=self.work)
+        return git("rev-parse", "HEAD", cwd=self.work)
+
+    def push(self, content: str) -> str:
+        commit = self.commit(content)
+        git("push", "--quiet", "origin", "HEAD", cwd=self.work)
+        return commit
+
+@pytest.fixture
+def remote(tmp_path):
+    return Remote(tmp_path, "zsh-autosuggestions")
+
+def test_clone_is_shallow(remote, tmp_path):
+    remote.push("second")
+    path = tmp_path / "plugins" / "zsh-autosuggestions"
+
+    clone_repository(remote.url, str(path))
+
+    assert (path / "plugin.zsh").read_text() == "second"
+    assert git("rev-list", "--count", "HEAD", cwd=path) == "1"
+    assert is_clean_checkout(str(path))
+
+def test_clone_from_mirror_points_origin_at_the_remote(remote, tmp_path):
+    mirror = GitMirrorCache(str(tmp_path / "mirrors")).mirror(remote.url)
+    path = tmp_path / "plugins" / "zsh-autosuggestions"
+
+    clone_repository(remote.url, str(path), mirror)
+
+    assert (path / "plugin.zsh").read_text() == "initial"
+    assert git("remote", "get-url", "origin", cwd=path) == remote.url
+
+def test_update_checkout_follows_the_remote(remote, tmp_path):
+    path = tmp_path / "plugins" / "zsh-autosuggestions"
+    clone_repository(remote.url, str(path))
+
+    assert not update_checkout(str(path))
+    latest = remote.push("second")
+    assert update_checkout(str(path))
+    assert git("rev-parse", "HEAD", cwd=path) == latest
+    assert is_clean_checkout(str(path))
+
+def test_update_checkout_from_mirror(remote, tmp_path):
+    mirrors = GitMirrorCache(str(tmp_path / "mirrors"))
+    path = tmp_path / "plugins" / "zsh-autosuggestions"
+    clone_repository(remote.url, str(path), mirrors.mirror(remote.url))
+    latest = remote.push("second")
+    # Force a refresh of the mirror
+    mirrors.MAX_AGE = 0
+
+    assert update_checkout(str(path), mirrors.mirror(remote.url))
+    assert git("rev-parse", "HEAD", cwd=path) == latest
+
+def test_local_changes_are_not_clean(remote, tmp_path):
+    path = tmp_path / "plugins" / "zsh-autosuggestions"
+    clone_repository(remote.url, str(path))
+
+    (path / "plugin.zsh").write_text("edited")
+
+    assert not is_clean_checkout(str(path))
+    assert not is_clean_checkout(str(path / "missing"))
+
+def test_mirror_is_only_refreshed_when_stale(remote, tmp_path):
+    mirrors = GitMirrorCache(str(tmp_path / "mirrors"))
+    mirror = mirrors.mirror(remote.url)
+    mirror_path = pathlib.Path(mirrors._path(remote.url, ".git"))
+    latest = remote.push("second")
+
+    assert mirrors.mirror(remote.url) == mirror
+    assert git("rev-parse", "HEAD", cwd=mirror_path) != latest
+
+    stamp = mirrors._path(remote.url, ".fetched")
+    os.utime(stamp, (0, 0))
+    assert mirrors.mirror(remote.url) == mirror
+    assert git("rev-parse", "HEAD", cwd=mirror_path) == latest
+
+def test_mirror_falls_back_to_the_cached_copy(remote, tmp_path):
+    mirrors = GitMirrorCache(str(tmp_path / "mirrors"))
+    mirror = mirrors.mirror(remote.url)
+    os.utime(mirrors._path(remote.url, ".fetched"), (0, 0))
+    remote.bare.rename(tmp_path / "gone.git")
+
+    assert mirrors.mirror(remote.url) == mirror
+
+def test_unreachable_remote_has_no_mirror(tmp_path):
+    mirrors = GitMirrorCache(str(tmp_path / "mirrors"))
+    os.makedirs(mirrors.cache_dir)
+
+    assert mirrors.mirror((tmp_path / "missing.git").as_uri()) is None
+
+@pytest.fixture
+def terminal(tmp_path):
+    from lib.modules.terminal import Terminal
+    from lib.systems.linux import LinuxPlatform
+    terminal = Terminal(LinuxPlatform())
+    terminal.ZSH_PLUGINS = [
+        (Remote(tmp_path, "powerlevel10k").url, "themes/powerlevel10k"),
+        (Remote(tmp_path, "zsh-autosuggestions").url, "plugins/zsh-autosuggestions"),
+    ]
+    yield terminal
+    GitMirrorCache.configure(None)
+
+def test_plugins_are_cloned_through_the_mirror_cache(terminal, tmp_path):
+    GitMirrorCache.configure(str(tmp_path / "mirrors"))
+    custom_dir = tmp_path / "custom"
+
+    terminal._sync_plugins(str(custom_dir))
+
+    for url, relative_path in terminal.ZSH_PLUGINS:
+        assert git("remote", "get-url", "origin", cwd=custom_dir / relative_path) == url
+        assert is_clean_checkout(str(custom_dir / relative_path))
+    assert len(list((tmp_path / "mirrors").glob("*.git"))) == 2
+
+    # A second run updates the checkouts in place
+    terminal._sync_plugins(str(custom_dir))
+
+def test_failed_plugin_does_not_stop_the_others(terminal, tmp_path):
+    terminal.ZSH_PLUGINS.insert(0, ((tmp_path / "missing.git").as_uri(), "plugins/missing"))
+    custom_dir = tmp_path / "custom"
+
+    with pytest.raises(subprocess.CalledProcessError):
+        terminal._sync_plugins(str(custom_dir))
+
+    assert is_clean_checkout(str(custom_dir / "themes" / "powerlevel10k"))
+    assert is_clean_checkout(str(custom_dir / "plugins" / "zsh-autosuggestions"))
+
+def test_runs_git_through_the_current_subprocess_run(remote, tmp_path, monkeypatch):
+    calls = []
+    run = subprocess.run
+    # Like Tracer.enable(), which patches subprocess.run after lib.utils.git is imported
+    monkeypatch.setattr(subprocess, "run", lambda args, **kwargs: calls.append(args) or run(args, **kwargs))
+
+    clone_repository(remote.url, str(tmp_path / "plugin"))
+
+    assert calls and calls[0][:2] == ["git", "clone"]
@@ -0,0 +1,99 @@
+import json
+import subprocess
+import os
+import pytest
+from lib.systems.linux import LinuxPlatform
+
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+PROFILE = "b1dcc9dd-5262-4d8d-a863-c897e6d979b9"
+PROFILE_PATH = f"/org/gnome/terminal/legacy/profiles:/:{PROFILE}/"
+
+THEME = {
+    "palette": ["#282828", "#CC241D"],
+    "background": "#282828",
+    "foreground": "#EBDBB2",
+    "font": "Cascadia Mono NF 12",
+    "transparency_percent": 5,
+}
+
+class Dconf:
+    """Database and call log of the dconf stub."""
+
+    def __init__(self, tmp_path):
+        self.db_path = tmp_path / "dconf.json"
+        self.log_path = tmp_path / "dconf.log"
+
+    def set(self, values):
+        self.db_path.write_text(json.dumps({PROFILE_PATH: values}))
+
+    def values(self):
+        return json.loads(self.db_path.read_text()).get(PROFILE_PATH, {})
+
+    def calls(self):
+        if not self.log_path.exists():
+            return []
+        return [json.loads(line) for line in self.log_path.read_text().splitlines()]
+
+@pytest.fixture
+def dconf(tmp_path, monkeypatch):
+    dconf = Dconf(tmp_path)
+    monkeypatch.setenv("PATH", STUBS + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("DCONF_STUB_DB", str(dconf.db_path))
+    monkeypatch.setenv("DCONF_STUB_LOG", str(dconf.log_path))
+    monkeypatch.setenv("GSETTINGS_STUB_PROFILE", PROFILE)
+    return dconf
+
+def test_applies_theme_with_a_single_load(dconf):
+    LinuxPlatform().configure_gnome_terminal(THEME)
+
+    assert [call["args"][0] for call in dconf.calls()] == ["dump", "load"]
+    assert dconf.calls()[1]["args"] == ["load", PROFILE_PATH]
+    assert dconf.values() == {
+        "palette": "['#282828', '#CC241D']",
+        "background-color": "'#282828'",
+        "foreground-color": "'#EBDBB2'",
+        "use-theme-colors": "false",
+        "font": "'Cascadia Mono NF 12'",
+        "use-system-font": "false",
+        "use-transparent-background": "true",
+        "background-transparency-percent": "5",
+    }
+
+def test_only_changed_keys_are_loaded(dconf):
+    dconf.set({"background-color": "'#282828'", "foreground-color": "'#FFFFFF'", "visible-name": "'Default'"})
+
+    LinuxPlatform().configure_gnome_terminal({"background": "#282828", "foreground": "#EBDBB2"})
+
+    assert dconf.calls()[1]["input"] == "[/]\nforeground-color='#EBDBB2'\nuse-theme-colors=false\n"
+    # Keys outside the theme are left alone
+    assert dconf.values()["visible-name"] == "'Default'"
+
+def test_configured_profile_is_not_loaded_again(dconf):
+    platform = LinuxPlatform()
+    platform.configure_gnome_terminal(THEME)
+
+    assert platform.get_gnome_terminal_changes(THEME) == []
+    platform.configure_gnome_terminal(THEME)
+
+    assert [call["args"][0] for call in dconf.calls()] == ["dump", "load", "dump", "dump"]
+
+def test_reports_pending_keys(dconf):
+    dconf.set({"background-color": "'#282828'", "use-theme-colors": "false"})
+
+    changes = LinuxPlatform().get_gnome_terminal_changes({"background": "#282828", "foreground": "#EBDBB2"})
+
+    assert changes == ["set foreground-color"]
+
+def test_without_default_profile(dconf, monkeypatch):
+    monkeypatch.setenv("GSETTINGS_STUB_PROFILE", "")
+    platform = LinuxPlatform()
+
+    assert platform.get_gnome_terminal_changes(THEME) == []
+    platform.configure_gnome_terminal(THEME)
+    assert dconf.calls() == []
+
+def test_failed_load_fails_the_step(dconf, monkeypatch):
+    monkeypatch.setenv("DCONF_STUB_FAIL", "1")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        LinuxPlatform().configure_gnome_terminal(THEME)
@@ -0,0 +1,32 @@
+import pytest
+from lib.core.journal import RunJournal
+from lib.utils.file_watcher import fingerprint
+
+@pytest.fixture
+def journal(tmp_path):
+    return RunJournal(str(tmp_path / "journal.json"))
+
+def test_completed_step_survives_a_reload(journal, tmp_path):
+    output = tmp_path / "settings.json"
+    output.write_text("{}")
+    journal.record("default.vscode-settings", {"editor.minimap.enabled": False}, [str(output)])
+
+    # Fingerprints are compared after a JSON round trip
+    reloaded = RunJournal(journal.path)
+
+    assert reloaded.is_complete("default.vscode-settings", {"editor.minimap.enabled": False}, [str(output)])
+
+def test_changed_output_invalidates_the_step(journal, tmp_path):
+    output = tmp_path / "settings.json"
+    output.write_text("{}")
+    journal.record("default.vscode-settings", None, [str(output)])
+    before = fingerprint(str(output))
+
+    output.write_text('{"editor.minimap.enabled": true}')
+
+    assert fingerprint(str(output)) != before
+    assert not journal.is_complete("default.vscode-settings", None, [str(output)])
+
+def test_missing_output_has_no_fingerprint(tmp_path):
+    assert fingerprint(str(tmp_path / "missing")) is None
+    assert fingerprint(str(tmp_path)) is not None
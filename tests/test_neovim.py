@@ -0,0 +1,50 @@
+import os
+import pytest
+from lib.modules.neovim import Neovim
+from lib.systems.recording import RecordingPlatform
+
+@pytest.fixture
+def platform(tmp_path):
+    return RecordingPlatform(latency={"download": 0.0, "subprocess": 0.0}, home_dir=str(tmp_path))
+
+def install_nvim(neovim):
+    path = neovim._get_nvim_executable()
+    os.makedirs(os.path.dirname(path))
+    open(path, "w").close()
+
+def test_installs_neovim_via_bob(platform):
+    Neovim(platform)._install_neovim()
+
+    kinds = [kind for kind, _ in platform.calls]
+    assert "download" in kinds and "subprocess" in kinds
+
+def test_installed_neovim_only_gets_missing_path_entries(platform):
+    neovim = Neovim(platform)
+    install_nvim(neovim)
+    present, *missing = neovim._get_path_entries()[::-1]
+    platform.add_to_path(present)
+    platform.calls.clear()
+
+    neovim._install_neovim()
+
+    assert platform.calls == [("add-to-path", (folder,)) for folder in neovim._get_path_entries() if folder in missing]
+    assert neovim._check_neovim() == []
+
+def test_installed_neovim_with_path_is_skipped(platform):
+    neovim = Neovim(platform)
+    install_nvim(neovim)
+    for folder in neovim._get_path_entries():
+        platform.add_to_path(folder)
+    platform.calls.clear()
+
+    neovim._install_neovim()
+
+    assert platform.calls == []
+
+def test_downloads_only_while_neovim_is_missing(platform):
+    neovim = Neovim(platform)
+    assert neovim.downloads() == [neovim._get_bob_install_script()]
+
+    install_nvim(neovim)
+
+    assert neovim.downloads() == []
@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+from lib.core.scheduler import PACKAGE_MANAGER, Scheduler, Step
+from lib.utils.logger import Logger
+
+def statuses(results):
+    return {result.name: result.status for result in results}
+
+def fail():
+    raise RuntimeError("broken")
+
+def test_failure_skips_dependants_only():
+    ran = []
+    steps = [
+        Step("packages", fail),
+        Step("zshrc", lambda: ran.append("zshrc"), deps=["packages"]),
+        Step("prompt", lambda: ran.append("prompt"), deps=["zshrc"]),
+        Step("settings", lambda: ran.append("settings")),
+    ]
+
+    results = Scheduler(steps, jobs=2).run()
+
+    assert statuses(results) == {"packages": "failed", "zshrc": "skipped", "prompt": "skipped", "settings": "ok"}
+    assert ran == ["settings"]
+    assert str(results[1].error) == "dependency 'packages' did not complete"
+    assert str(results[2].error) == "dependency 'zshrc' did not complete"
+
+def test_steps_sharing_a_resource_never_overlap():
+    lock = threading.Lock()
+    active, overlaps = [0], []
+
+    def install():
+        with lock:
+            active[0] += 1
+            overlaps.append(active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    # Both unrelated steps have to be running at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    steps = [Step(f"install-{i}", install, resources=[PACKAGE_MANAGER]) for i in range(4)]
+    steps += [Step("settings", barrier.wait), Step("keybindings", barrier.wait)]
+
+    results = Scheduler(steps, jobs=4).run()
+
+    assert set(statuses(results).values()) == {"ok"}
+    assert max(overlaps) == 1
+
+def test_captured_logs_are_replayed_in_step_order():
+    slow_started = threading.Event()
+
+    def slow():
+        Logger.info("slow")
+        slow_started.set()
+        time.sleep(0.05)
+
+    def fast():
+        slow_started.wait(5)
+        Logger.info("fast")
+
+    with Logger.capture() as logs:
+        Scheduler([Step("slow", slow), Step("fast", fast), Step("failing", fail)], jobs=3).run()
+
+    assert [message for _, message, _ in logs] == ["[INFO] slow", "[INFO] fast", "[ERROR] Step 'failing' failed: broken"]
+
+def test_cycles_are_rejected():
+    steps = [Step("a", lambda: None, deps=["c"]), Step("b", lambda: None, deps=["a"]), Step("c", lambda: None, deps=["b"])]
+
+    with pytest.raises(ValueError, match="Dependency cycle: a -> c -> b -> a"):
+        Scheduler(steps)
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(ValueError, match="unique"):
+        Scheduler([Step("a", lambda: None), Step("a", lambda: None)])
+
+def test_unknown_dependencies_are_ignored():
+    # Components can be scheduled without the steps of other components
+    results = Scheduler([Step("neovim.install", lambda: None, deps=["packages:neovim"])]).run()
+
+    assert statuses(results) == {"neovim.install": "ok"}
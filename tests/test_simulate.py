@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+import main
+from lib.core.state import StateCache
+from lib.systems.recording import RecordingPlatform
+from lib.utils import git
+from lib.utils.git import GitMirrorCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(autouse=True)
+def simulation(monkeypatch):
+    # Components read files/ relative to the working directory
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(RecordingPlatform, "DEFAULT_LATENCY", {kind: 0.0 for kind in RecordingPlatform.DEFAULT_LATENCY})
+    yield
+    StateCache.configure(None)
+    GitMirrorCache.configure(None)
+
+def simulate(monkeypatch, *args):
+    platforms = []
+
+    class Platform(RecordingPlatform):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            platforms.append(self)
+
+    monkeypatch.setattr("lib.systems.recording.RecordingPlatform", Platform)
+    monkeypatch.setattr(sys, "argv", ["main.py", "--simulate", *args])
+    with pytest.raises(SystemExit) as exit:
+        main.main()
+    return exit.value.code, platforms[0]
+
+def test_temporary_home_is_removed(monkeypatch):
+    code, platform = simulate(monkeypatch, "--with-neovim")
+
+    assert code == 0
+    assert not os.path.exists(platform.home_dir)
+
+def test_given_home_is_kept(tmp_path):
+    with RecordingPlatform(home_dir=str(tmp_path)) as platform:
+        platform.add_vscode_setting("editor.fontSize", 14)
+
+    assert os.path.exists(platform.get_vscode_settings_path())
+
+def test_git_cache_is_not_filled(monkeypatch, tmp_path):
+    run_git = git.run_git
+
+    def simulated_run_git(args, cwd, run=None):
+        # Commands that don't go through the platform would really run
+        assert run is not None, f"git {' '.join(args)} ran outside the simulation"
+        return run_git(args, cwd, run)
+
+    monkeypatch.setattr(git, "run_git", simulated_run_git)
+    code, platform = simulate(monkeypatch, "--full", "--git-cache", str(tmp_path))
+
+    assert code == 0
+    assert GitMirrorCache.shared() is None
+    assert os.listdir(tmp_path) == []
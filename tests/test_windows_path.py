@@ -0,0 +1,85 @@
+import os
+import pytest
+from lib.systems.windows_path import SYSTEM, USER, PathManager
+from memory_registry import MemoryBackend
+
+SYSTEM_PATH = r"C:\Windows\system32;C:\Windows"
+USER_PATH = r"%USERPROFILE%\AppData\Local\Microsoft\WindowsApps;C:\Tools"
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setenv("USERPROFILE", r"C:\Users\dev")
+    monkeypatch.setenv("PATH", "")
+    return MemoryBackend({SYSTEM: SYSTEM_PATH, USER: USER_PATH})
+
+@pytest.fixture
+def manager(backend):
+    # Registry values are split by ';', the process PATH by the separator of the host
+    return PathManager(backend, ";")
+
+def test_registry_is_read_once(manager, backend):
+    manager.refresh()
+    manager.contains(r"C:\Tools")
+    manager.contains(r"C:\Other")
+    manager.refresh()
+
+    assert backend.reads == 2
+
+def test_invalidate_reads_the_registry_again(manager, backend):
+    manager.refresh()
+    backend.values[USER] += r";C:\Installed\bin"
+
+    assert not manager.contains(r"C:\Installed\bin")
+    manager.invalidate()
+    assert manager.contains(r"C:\Installed\bin")
+    # System and user value for the refresh, the user value again after invalidate()
+    assert backend.reads == 3
+
+def test_refresh_builds_path_from_the_registry(manager):
+    assert manager.refresh()
+
+    assert os.environ["PATH"].split(";") == [
+        r"C:\Windows\system32", r"C:\Windows", r"C:\Users\dev\AppData\Local\Microsoft\WindowsApps", r"C:\Tools",
+    ]
+    # Nothing changed since
+    assert not manager.refresh()
+
+def test_refresh_keeps_process_only_entries(manager, monkeypatch):
+    monkeypatch.setenv("PATH", r"C:\venv\Scripts;C:\Windows")
+
+    manager.refresh()
+
+    entries = os.environ["PATH"].split(";")
+    assert entries[-1] == r"C:\venv\Scripts"
+    assert entries.count(r"C:\Windows") == 1
+
+def test_duplicates_ignore_case_and_trailing_separators(manager, backend, monkeypatch):
+    monkeypatch.setenv("PATH", "c:\\tools\\;C:\\WINDOWS\\")
+
+    manager.refresh()
+
+    assert os.environ["PATH"].split(";") == [
+        r"C:\Windows\system32", r"C:\Windows", r"C:\Users\dev\AppData\Local\Microsoft\WindowsApps", r"C:\Tools",
+    ]
+    assert manager.contains("c:\\TOOLS\\")
+    assert not manager.add("c:\\tools\\")
+    assert backend.writes == 0
+
+def test_add_updates_registry_cache_and_process_path(manager, backend):
+    manager.refresh()
+    reads = backend.reads
+
+    assert manager.add(r"C:\Users\dev\AppData\Local\bob\nvim-bin")
+
+    assert backend.values[USER] == USER_PATH + r";C:\Users\dev\AppData\Local\bob\nvim-bin"
+    # The write updated the cache, so the registry isn't read again
+    assert manager.contains(r"C:\Users\dev\AppData\Local\bob\nvim-bin")
+    assert backend.reads == reads
+    assert os.environ["PATH"].split(";")[-1] == r"C:\Users\dev\AppData\Local\bob\nvim-bin"
+
+def test_add_to_empty_user_path(backend, manager):
+    del backend.values[USER]
+
+    assert manager.add(r"C:\Tools")
+
+    assert backend.values[USER] == r"C:\Tools"
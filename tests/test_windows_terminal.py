@@ -0,0 +1,139 @@
+import json
+import os
+import pytest
+from lib.systems import windows
+from lib.systems.windows import WindowsPlatform
+
+SETTINGS = """// Windows Terminal writes comments into a fresh settings.json
+{
+    "$schema": "https://aka.ms/terminal-profiles-schema",
+    "defaultProfile": "{61c54bbd-c2c6-5271-96e7-009a87ff44bf}",
+    "profiles": {
+        "defaults": {},
+        "list": [
+            {"name": "Windows PowerShell", "hidden": false},
+            {"name": "PowerShell", "source": "Windows.Terminal.PowershellCore"},
+        ]
+    },
+    "schemes": [
+        {"name": "Campbell", "background": "#0C0C0C"},
+        {"name": "Gruvbox Dark", "background": "#000000"}
+    ]
+}
+"""
+
+@pytest.fixture
+def settings_path(tmp_path, monkeypatch):
+    """settings.json of a Windows Terminal installation below an overridden LOCALAPPDATA."""
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    path = tmp_path / "Packages" / "Microsoft.WindowsTerminal_8wekyb3d8bbwe" / "LocalState" / "settings.json"
+    path.parent.mkdir(parents=True)
+    path.write_text(SETTINGS, encoding="utf-8")
+    return path
+
+@pytest.fixture
+def platform(settings_path):
+    return WindowsPlatform()
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_locates_settings_once(platform, settings_path, monkeypatch):
+    lookups = []
+    glob = windows.glob.glob
+    monkeypatch.setattr(windows.glob, "glob", lambda pattern: lookups.append(pattern) or glob(pattern))
+
+    assert platform.get_windows_terminal_settings_path() == str(settings_path)
+    platform.update_windows_terminal_settings({"copyOnSelect": True})
+    platform.update_windows_terminal_profile("PowerShell", {"opacity": 95})
+
+    assert len(lookups) == 1
+
+def test_merges_schemes_by_name(platform, settings_path):
+    gruvbox = {"name": "Gruvbox Dark", "background": "#282828"}
+    nord = {"name": "Nord", "background": "#2E3440"}
+
+    platform.update_windows_terminal_settings({"schemes": [gruvbox, nord]})
+
+    assert read(settings_path)["schemes"] == [{"name": "Campbell", "background": "#0C0C0C"}, gruvbox, nord]
+
+def test_updates_settings_and_profiles_in_one_write(platform, settings_path, monkeypatch):
+    writes = []
+    replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: writes.append(dst) or replace(src, dst))
+
+    platform.update_windows_terminal_settings(
+        {"defaultProfile": "PowerShell", "profiles": {"defaults": {"font": {"face": "Cascadia Mono NF"}}}},
+        {"PowerShell": {"opacity": 95}, "Windows PowerShell": {"hidden": True}},
+    )
+
+    content = read(settings_path)
+    assert writes == [str(settings_path)]
+    assert content["defaultProfile"] == "PowerShell"
+    assert content["profiles"]["defaults"] == {"font": {"face": "Cascadia Mono NF"}}
+    assert content["profiles"]["list"] == [
+        {"name": "Windows PowerShell", "hidden": True},
+        {"name": "PowerShell", "source": "Windows.Terminal.PowershellCore", "opacity": 95},
+    ]
+
+def test_profiles_as_plain_list(platform, settings_path):
+    settings_path.write_text(json.dumps({"profiles": [{"name": "PowerShell"}]}), encoding="utf-8")
+
+    platform.update_windows_terminal_profile("PowerShell", {"opacity": 95})
+
+    assert read(settings_path)["profiles"] == [{"name": "PowerShell", "opacity": 95}]
+
+def test_unchanged_settings_are_not_written(platform, settings_path):
+    updates = {"schemes": [{"name": "Campbell", "background": "#0C0C0C"}]}
+    before = os.stat(settings_path)
+
+    assert platform.get_windows_terminal_changes(updates, {"PowerShell": {"source": "Windows.Terminal.PowershellCore"}}) == []
+    platform.update_windows_terminal_settings(updates, {"PowerShell": {"source": "Windows.Terminal.PowershellCore"}})
+
+    after = os.stat(settings_path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    # Comments survive as long as nothing is written
+    assert settings_path.read_text(encoding="utf-8") == SETTINGS
+
+def test_reports_changed_top_level_settings(platform):
+    changes = platform.get_windows_terminal_changes(
+        {"defaultProfile": "PowerShell", "schemes": [{"name": "Nord"}]}, {"PowerShell": {"opacity": 95}}
+    )
+
+    assert sorted(changes) == ["update defaultProfile", "update profiles", "update schemes"]
+
+def test_missing_profile_leaves_the_file_untouched(platform, settings_path):
+    platform.update_windows_terminal_profile("Ubuntu", {"opacity": 95})
+
+    assert settings_path.read_text(encoding="utf-8") == SETTINGS
+
+def test_terminal_component_settings(platform, settings_path):
+    from lib.modules.terminal import Terminal
+    terminal = Terminal(platform)
+    updates = terminal._get_windows_terminal_updates()
+
+    platform.update_windows_terminal_settings(updates, terminal.WINDOWS_TERMINAL_PROFILES)
+
+    content = read(settings_path)
+    assert content["schemes"][-1] == terminal.GRUVBOX_THEME_WIN
+    assert content["profiles"]["defaults"]["colorScheme"] == terminal.GRUVBOX_THEME_WIN["name"]
+    assert platform.get_windows_terminal_changes(updates, terminal.WINDOWS_TERMINAL_PROFILES) == []
+
+def test_without_windows_terminal(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    platform = WindowsPlatform()
+
+    assert platform.get_windows_terminal_settings_path() == ""
+    assert platform.get_windows_terminal_changes({"defaultProfile": "PowerShell"}) == []
+
+def test_invalid_settings_fail_the_update(platform, settings_path):
+    settings_path.write_text("{ not json", encoding="utf-8")
+
+    with pytest.raises(json.JSONDecodeError):
+        platform.update_windows_terminal_settings({"defaultProfile": "PowerShell"})
+
+def test_failed_shortcut_fails_the_step(platform, tmp_path):
+    # pywin32 is missing here, like on a Windows machine without it
+    with pytest.raises(ImportError):
+        platform.create_shortcut("wt.exe", str(tmp_path / "Windows Terminal.lnk"))
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import pytest
+from lib.systems import windows
+from lib.systems.windows import WindowsPlatform, WINGET_ALREADY_INSTALLED
+from lib.systems.windows_path import PathManager
+from memory_registry import MemoryBackend
+
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+
+@pytest.fixture
+def platform(tmp_path, monkeypatch):
+    """WindowsPlatform with the winget stub on PATH and an in-memory registry."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PATH", STUBS + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("WINGET_STUB_LOG", str(tmp_path / "winget.log"))
+    platform = WindowsPlatform()
+    platform._path = PathManager(MemoryBackend())
+    return platform
+
+def winget_calls(tmp_path):
+    log = tmp_path / "winget.log"
+    if not log.exists():
+        return []
+    return [json.loads(line) for line in log.read_text().splitlines()]
+
+def test_installs_all_packages_with_one_import(platform, tmp_path):
+    errors = platform.install_packages(["Git.Git", "Microsoft.VisualStudioCode", "JanDeDobbeleer.OhMyPosh"])
+
+    assert errors == {"Git.Git": None, "Microsoft.VisualStudioCode": None, "JanDeDobbeleer.OhMyPosh": None}
+    calls = winget_calls(tmp_path)
+    assert [call["command"] for call in calls] == ["import"]
+    assert calls[0]["packages"] == ["Git.Git", "Microsoft.VisualStudioCode", "JanDeDobbeleer.OhMyPosh"]
+    assert "--accept-package-agreements" in calls[0]["args"]
+    # The generated manifest is removed again
+    assert not (tmp_path / "tmp" / "winget-import.json").exists()
+
+def test_single_package_is_installed_directly(platform, tmp_path):
+    assert platform.install_packages(["Git.Git"]) == {"Git.Git": None}
+    calls = winget_calls(tmp_path)
+    assert [(call["command"], call["packages"]) for call in calls] == [("install", ["Git.Git"])]
+    assert "--scope" in calls[0]["args"] and "user" in calls[0]["args"]
+
+def test_failed_import_retries_packages_one_by_one(platform, tmp_path, monkeypatch):
+    monkeypatch.setenv("WINGET_STUB_FAIL", "Broken.Package")
+
+    errors = platform.install_packages(["Git.Git", "Broken.Package"])
+
+    assert errors["Git.Git"] is None
+    assert isinstance(errors["Broken.Package"], subprocess.CalledProcessError)
+    calls = winget_calls(tmp_path)
+    assert [(call["command"], call["packages"]) for call in calls] == [
+        ("import", ["Git.Git", "Broken.Package"]),
+        ("install", ["Git.Git"]),
+        ("install", ["Broken.Package"]),
+    ]
+
+def _already_installed_winget(calls):
+    """Exit codes above 255 only exist on Windows, so this case replaces the process instead of the executable."""
+    def run(cmd, check=False, **kwargs):
+        calls.append(cmd)
+        raise subprocess.CalledProcessError(WINGET_ALREADY_INSTALLED, cmd)
+    return run
+
+def test_already_installed_exit_code_counts_as_success_for_imports(platform, monkeypatch):
+    calls = []
+    monkeypatch.setattr(windows.subprocess, "run", _already_installed_winget(calls))
+
+    assert platform.install_packages(["Git.Git", "Microsoft.VisualStudioCode"]) == {"Git.Git": None, "Microsoft.VisualStudioCode": None}
+    assert [cmd[1] for cmd in calls] == ["import"]
+
+def test_already_installed_exit_code_counts_as_success_for_single_installs(platform, monkeypatch):
+    calls = []
+    monkeypatch.setattr(windows.subprocess, "run", _already_installed_winget(calls))
+
+    assert platform.install_packages(["Git.Git"]) == {"Git.Git": None}
+    assert [cmd[1] for cmd in calls] == ["install"]